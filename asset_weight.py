@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Peso reale degli asset
+La HEAD basta solo quando il server dichiara Content-Length senza
+compressione. Negli altri casi (HEAD rifiutata, risposta chunked o
+compressa) il peso si misura con una GET:
+- immagini: la GET parziale che legge già l'intestazione per le dimensioni
+  (image_analysis.read_image_header), la dimensione arriva da Content-Range
+- altrimenti: GET in streaming che conta i byte senza conservare il corpo,
+  fino a un tetto per asset; il corpo decodificato può essere passato a
+  un'altra analisi (scansione dei secrets nei bundle JS) nella stessa lettura
+Si registrano sia i byte trasferiti (compressi) sia quelli decodificati.
+"""
+
+# Budget di peso per tipo di asset e per pagina, in KB trasferiti
+DEFAULT_BUDGETS_KB = {'css': 150, 'js': 400, 'image': 1000}
+# Byte massimi letti per asset durante la misura in streaming
+MAX_ASSET_BYTES = 10 * 1024 * 1024
+
+# Server che non accettano HEAD
+HEAD_REFUSED = (405, 501)
+
+
+def _encoded(headers):
+    encoding = (headers.get('content-encoding') or '').strip().lower()
+    return encoding not in ('', 'identity')
+
+
+def needs_measurement(response):
+    """True se la risposta HEAD non basta a conoscere il peso dell'asset"""
+    if response.status_code in HEAD_REFUSED:
+        return True
+    if response.status_code != 200:
+        return False
+    return 'content-length' not in response.headers or _encoded(response.headers)
+
+
+def weight_from_head(response):
+    size = int(response.headers.get('content-length', 0))
+    return {"transfer_bytes": size, "decoded_bytes": size, "measured": "content-length", "truncated": False}
+
+
+def weight_from_range(header):
+    """
+    Peso da una GET parziale (read_image_header): None se la risposta è
+    compressa o non dichiara la dimensione totale
+    """
+    if header["status"] not in (200, 206) or header["bytes"] is None or header.get("encoded"):
+        return None
+    return {
+        "status": 200,
+        "content_type": header["content_type"],
+        "etag": header.get("etag"),
+        "last_modified": header.get("last_modified"),
+        "transfer_bytes": header["bytes"],
+        "decoded_bytes": header["bytes"],
+        "measured": "range" if header["status"] == 206 else "content-length",
+        "truncated": False
+    }
+
+
+def measure_weight(session, url, max_bytes=MAX_ASSET_BYTES, timeout=5, on_chunk=None):
+    """
+    Misura il peso con una GET in streaming. Restituisce status, content_type,
+    validatori e i byte trasferiti/decodificati (troncati a max_bytes trasferiti).
+    `on_chunk` riceve i blocchi decodificati man mano che arrivano.
+    """
+    with session.get(url, timeout=timeout, stream=True) as response:
+        info = {
+            "status": response.status_code,
+            "content_type": response.headers.get('content-type', ''),
+            "etag": response.headers.get('etag'),
+            "last_modified": response.headers.get('last-modified'),
+            "transfer_bytes": 0,
+            "decoded_bytes": 0,
+            "measured": "stream",
+            "truncated": False
+        }
+        if response.status_code != 200:
+            return info
+
+        # raw.tell() conta i byte letti dalla rete, prima della decompressione
+        raw = response.raw
+        decoded = 0
+        try:
+            for chunk in raw.stream(65536, decode_content=True):
+                decoded += len(chunk)
+                if on_chunk is not None:
+                    on_chunk(chunk)
+                if raw.tell() >= max_bytes:
+                    info["truncated"] = True
+                    break
+        except Exception:
+            # Codifica non supportata (es. br senza brotli): resta solo il peso trasferito
+            for _ in raw.stream(65536, decode_content=False):
+                if raw.tell() >= max_bytes:
+                    info["truncated"] = True
+                    break
+            decoded = None
+        info["transfer_bytes"] = raw.tell()
+        info["decoded_bytes"] = decoded
+        return info
+
+
+def parse_budgets(values):
+    """['css=100', 'js=300'] -> budget per tipo (in KB) a partire da quelli di default"""
+    budgets = dict(DEFAULT_BUDGETS_KB)
+    for value in values or ():
+        asset_type, _, kb = value.partition('=')
+        asset_type = asset_type.strip()
+        if asset_type not in DEFAULT_BUDGETS_KB or not kb:
+            raise ValueError(f"Budget non valido: {value} (formato tipo=KB, tipi: {', '.join(DEFAULT_BUDGETS_KB)})")
+        budgets[asset_type] = float(kb)
+    return budgets
+
+
+def weight_summary(assets_by_type, budgets):
+    """
+    Peso per tipo di asset e sforamenti dei budget.
+    `assets_by_type`: {tipo: [info asset]}; restituisce (weight, violations).
+    """
+    weight, violations = {}, []
+    for asset_type, assets in assets_by_type.items():
+        transfer = sum(asset.get("transfer_kb") or 0 for asset in assets)
+        decoded = sum(asset.get("decoded_kb") or 0 for asset in assets)
+        budget = budgets.get(asset_type)
+        weight[asset_type] = {
+            "count": len(assets),
+            "transfer_kb": round(transfer, 2),
+            "decoded_kb": round(decoded, 2),
+            "budget_kb": budget,
+            "over_budget": budget is not None and transfer > budget
+        }
+        if weight[asset_type]["over_budget"]:
+            violations.append({
+                "type": asset_type,
+                "budget_kb": budget,
+                "transfer_kb": round(transfer, 2),
+                "over_kb": round(transfer - budget, 2)
+            })
+    return weight, violations
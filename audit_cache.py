@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Cache persistente su disco per audit incrementali
+Conserva, per URL, i validatori HTTP (ETag/Last-Modified), i risultati dei
+probe sugli asset e l'output delle sezioni di audit. Le voci scadono dopo
+un TTL e le meno usate vengono rimosse oltre una dimensione massima.
+La dimensione totale è tenuta in memoria e gli accessi in lettura vengono
+scritti su disco a blocchi, non a ogni get().
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from audit_profiler import record
+
+# Accessi in lettura accumulati prima di aggiornare accessed_at su disco
+ACCESS_BATCH = 256
+
+
+class AuditCache:
+    def __init__(self, path, ttl=24 * 3600, max_bytes=200 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # (kind, url) -> ultimo accesso non ancora scritto
+        self._touched = {}
+        self._size = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                kind TEXT NOT NULL,
+                url TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (kind, url)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self.purge_expired()
+
+    def get(self, kind, url):
+        """Restituisce la voce {value, etag, last_modified} se presente e non scaduta"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, value, stored_at FROM entries WHERE kind = ? AND url = ?",
+                (kind, url)
+            ).fetchone()
+            if row is None or time.time() - row[3] > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            record("cache_hits")
+            self._touched[(kind, url)] = time.time()
+            if len(self._touched) >= ACCESS_BATCH:
+                self._flush_touched()
+                self._db.commit()
+        return {"etag": row[0], "last_modified": row[1], "value": json.loads(row[2])}
+
+    def put(self, kind, url, value, etag=None, last_modified=None):
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._touched.pop((kind, url), None)
+            self._size += len(data) - self._stored_size(kind, url)
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, url, etag, last_modified, data, len(data), now, now)
+            )
+            self._flush_touched()
+            if self._size > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def delete(self, kind, url):
+        with self._lock:
+            self._touched.pop((kind, url), None)
+            self._size -= self._stored_size(kind, url)
+            self._db.execute("DELETE FROM entries WHERE kind = ? AND url = ?", (kind, url))
+            self._db.commit()
+
+    def _stored_size(self, kind, url):
+        row = self._db.execute("SELECT size FROM entries WHERE kind = ? AND url = ?", (kind, url)).fetchone()
+        return row[0] if row else 0
+
+    def _flush_touched(self):
+        """Scrive gli accessi accumulati da get() (il commit resta al chiamante)"""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE kind = ? AND url = ?",
+                [(at, kind, url) for (kind, url), at in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def conditional_headers(self, entry):
+        """Header per una richiesta condizionale a partire da una voce in cache"""
+        headers = {}
+        if entry and entry.get("etag"):
+            headers['If-None-Match'] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers['If-Modified-Since'] = entry["last_modified"]
+        return headers
+
+    def purge_expired(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE stored_at < ?", (time.time() - self.ttl,))
+            self._size = self._total_size()
+            self._db.commit()
+
+    def _total_size(self):
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _evict(self):
+        """Rimuove le voci meno usate finché la cache supera max_bytes"""
+        # Il totale viene riallineato al disco solo qui (altri processi possono scrivere la cache)
+        self._size = self._total_size()
+        if self._size <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        rows = self._db.execute("SELECT kind, url, size FROM entries ORDER BY accessed_at")
+        doomed = []
+        for kind, url, size in rows:
+            if self._size <= target:
+                break
+            doomed.append((kind, url))
+            self._size -= size
+        rows.close()
+        self._db.executemany("DELETE FROM entries WHERE kind = ? AND url = ?", doomed)
+
+    def stats(self):
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+            count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {"entries": count, "size_bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+            self._db.close()
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Storico degli audit e delle esecuzioni Lighthouse
+Ogni report (audit.json, JSONL, crawl o sitemap) e ogni LHR diventa una
+serie di campioni (URL, metrica, istante, valore) in un database SQLite;
+URL e nomi delle metriche stanno in tabelle proprie e i campioni sono
+indicizzati per URL e per metrica. Le query danno andamento e percentili;
+`check` confronta le ultime esecuzioni di ogni serie con la baseline mobile
+delle precedenti (mediane e soglie come lighthouse_compare, più un test t)
+e segnala i peggioramenti significativi.
+
+Uso: python audit_history.py ingest audit.json lighthouse-reports/ [--db audit-history.db]
+     python audit_history.py trend --metric total_size_kb [--url URL] [--days 90]
+     python audit_history.py percentiles [--metric lcp] [--days 30]
+     python audit_history.py check [--recent 3] [--baseline 14] [--alpha 0.05]   (exit 1 se ci sono regressioni)
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+from lighthouse_stats import (CATEGORIES, DEFAULT_ALPHA, DEFAULT_THRESHOLDS, _open_binary, compare_metric, percentile,
+                              read_lhr, student_t_test)
+from probe_engine import normalize_url
+
+DEFAULT_DB = 'audit-history.db'
+DAY = 24 * 3600
+
+# Soglie di regressione oltre a quelle Lighthouse: conteggi al primo elemento in più
+THRESHOLDS = dict(
+    DEFAULT_THRESHOLDS,
+    total_size_kb={'abs': 50, 'pct': 10},
+    image_kb={'abs': 50, 'pct': 10},
+    critical_bytes_kb={'abs': 20, 'pct': 10},
+    headers_score={'abs': 5, 'pct': 5},
+    **{f"{category}_score": {'abs': 3, 'pct': 3} for category in CATEGORIES}
+)
+DEFAULT_THRESHOLD = {'abs': 0, 'pct': 0}
+# Metriche per cui un valore più alto è migliore (punteggi); per le altre è un peggioramento
+HIGHER_IS_BETTER = {'headers_score', *(f"{category}_score" for category in CATEGORIES)}
+
+ASSET_CATEGORIES = ('css_files', 'js_files', 'images', 'other_assets')
+
+
+def parse_time(value):
+    """Istante ISO 8601 (audit_date, fetchTime) in secondi epoch; None se non interpretabile"""
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+def _format_time(at):
+    return datetime.fromtimestamp(at, timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+
+def page_metrics(audit, issues=None):
+    """Metriche numeriche di una pagina a partire dalle sezioni di audit"""
+    if issues is None:
+        from website_auditor import count_issues
+        issues = count_issues(audit)
+    metrics = {f"issues_{severity}": count for severity, count in issues.items()}
+    links = audit.get("routes_and_links")
+    if links is not None:
+        metrics["broken_links"] = len(links["broken_links"])
+    assets = audit.get("missing_assets")
+    if assets is not None:
+        metrics["total_size_kb"] = assets["total_size_kb"]
+        metrics["broken_assets"] = sum(1 for category in ASSET_CATEGORIES
+                                       for asset in assets[category] if not asset.get("accessible"))
+    headers = audit.get("response_headers")
+    if headers and headers.get("score") is not None:
+        metrics["headers_score"] = headers["score"]
+    critical = audit.get("critical_path")
+    if critical:
+        metrics["critical_bytes_kb"] = critical["critical_bytes_kb"]
+        metrics["render_blocking"] = len(critical["render_blocking"])
+    images = audit.get("image_optimization")
+    if images:
+        metrics["image_kb"] = images["summary"]["total_kb"]
+    return metrics
+
+
+def report_samples(report):
+    """(url, metrica, valore) di un report di audit singolo o di crawl/sitemap"""
+    if "pages" in report:
+        for page in report["pages"]:
+            if page.get("audit"):
+                for name, value in page_metrics(page["audit"], page.get("issues")).items():
+                    yield page["url"], name, value
+        return
+    audit = {section: data for section, data in report.items() if section != "metadata"}
+    for name, value in page_metrics(audit).items():
+        yield report["metadata"]["url"], name, value
+
+
+def lhr_samples(run):
+    """(url, metrica, valore) di un'esecuzione Lighthouse letta con read_lhr"""
+    for name, value in run["metrics"].items():
+        if value is not None:
+            yield run["url"], name, value
+    for category, score in run["scores"].items():
+        yield run["url"], f"{category}_score", score
+
+
+def _is_lhr(path):
+    """Un LHR si riconosce dalle prime chiavi, senza leggere tutto il file"""
+    with _open_binary(path) as f:
+        head = f.read(2048)
+    return b'"lighthouseVersion"' in head or b'"requestedUrl"' in head
+
+
+def expand_inputs(patterns):
+    """File, glob e directory (ricorsive: report .json/.json.gz e stream .jsonl*), senza duplicati"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(path for suffix in ('*.json', '*.json.gz', '*.jsonl', '*.jsonl.gz', '*.jsonl.zst')
+                             for path in glob.glob(os.path.join(pattern, '**', suffix), recursive=True))
+        else:
+            matches = sorted(glob.glob(pattern)) or [pattern]
+        paths.extend(path for path in matches if path not in paths)
+    return paths
+
+
+def fdr_cutoff(p_values, tests, alpha=DEFAULT_ALPHA):
+    """
+    p-value massimo accettato dalla procedura di Benjamini-Hochberg su
+    `tests` confronti, di cui sono noti solo `p_values` (gli altri non
+    superavano le soglie e contano come non significativi); None se nessuno.
+    """
+    cutoff = None
+    for rank, p_value in enumerate(sorted(p_values), 1):
+        if p_value <= alpha * rank / tests:
+            cutoff = p_value
+    return cutoff
+
+
+class AuditHistory:
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        # WAL: gli inserimenti notturni non bloccano le query e il commit non forza un fsync per pagina
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                key TEXT NOT NULL UNIQUE,
+                at REAL NOT NULL,
+                label TEXT,
+                path TEXT
+            );
+            CREATE TABLE IF NOT EXISTS urls (id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE);
+            CREATE TABLE IF NOT EXISTS metrics (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+            CREATE TABLE IF NOT EXISTS samples (
+                url_id INTEGER NOT NULL,
+                metric_id INTEGER NOT NULL,
+                at REAL NOT NULL,
+                run_id INTEGER NOT NULL,
+                value REAL NOT NULL,
+                PRIMARY KEY (url_id, metric_id, at, run_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS samples_metric ON samples (metric_id, at, value);
+        """)
+        self._load_ids()
+
+    def _load_ids(self):
+        self._urls = dict(self._db.execute("SELECT url, id FROM urls"))
+        self._metrics = dict(self._db.execute("SELECT name, id FROM metrics"))
+
+    def _id(self, table, column, cache, name):
+        index = cache.get(name)
+        if index is None:
+            self._db.execute(f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)", (name,))
+            index = cache[name] = self._db.execute(
+                f"SELECT id FROM {table} WHERE {column} = ?", (name,)).fetchone()[0]
+        return index
+
+    # Inserimento
+
+    def add_run(self, source, key, at, samples, label=None, path=None):
+        """
+        Registra un'esecuzione con i suoi campioni (url, metrica, valore) in
+        una sola transazione; restituisce il numero di campioni, o None se
+        l'esecuzione (stessa chiave) era già presente.
+        """
+        try:
+            with self._db:
+                cursor = self._db.execute("INSERT OR IGNORE INTO runs (source, key, at, label, path) "
+                                          "VALUES (?, ?, ?, ?, ?)", (source, key, at, label, path))
+                if not cursor.rowcount:
+                    return None
+                run_id = cursor.lastrowid
+                rows = [(self._id('urls', 'url', self._urls, normalize_url(url)),
+                         self._id('metrics', 'name', self._metrics, name), at, run_id, float(value))
+                        for url, name, value in samples]
+                # In ordine di chiave primaria gli inserimenti toccano pagine contigue del B-tree
+                rows.sort()
+                self._db.executemany("INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?)", rows)
+        except Exception:
+            # Con il rollback gli id appena assegnati non esistono più
+            self._load_ids()
+            raise
+        return len(rows)
+
+    def ingest_report(self, report, path=None, label=None):
+        metadata = report["metadata"]
+        at = parse_time(metadata.get("audit_date")) or time.time()
+        mode = metadata.get("mode", "page")
+        key = f"audit:{mode}:{normalize_url(metadata['url'])}:{metadata.get('audit_date', at)}"
+        return self.add_run('audit', key, at, report_samples(report), label=label or mode, path=path)
+
+    def ingest_lhr(self, run, path=None, label=None):
+        at = parse_time(run.get("fetch_time")) or (os.path.getmtime(path) if path else time.time())
+        # Stesso istante e stesse metriche: è lo stesso LHR, anche se copiato altrove
+        digest = hashlib.sha1(json.dumps([run["metrics"], run["scores"]], sort_keys=True).encode()).hexdigest()[:16]
+        key = f"lighthouse:{normalize_url(run['url'])}:{run.get('fetch_time') or at}:{digest}"
+        return self.add_run('lighthouse', key, at, lhr_samples(run), label=label, path=path)
+
+    def ingest(self, path, label=None):
+        """Importa un file: LHR, report JSON o stream JSONL; None se già importato o non valido"""
+        if '.jsonl' in os.path.basename(path):
+            from audit_stream import read_stream
+            return self.ingest_report(read_stream(path), path, label)
+        if _is_lhr(path):
+            run = read_lhr(path)
+            if run["error"] or not run["url"]:
+                return None
+            return self.ingest_lhr(run, path, label)
+        with _open_binary(path) as f:
+            report = json.load(f)
+        if "metadata" not in report:
+            raise ValueError("né un report di audit né un LHR")
+        return self.ingest_report(report, path, label)
+
+    # Query
+
+    def _metric_id(self, name):
+        if name not in self._metrics:
+            raise ValueError(f"Metrica sconosciuta: {name} (disponibili: {', '.join(sorted(self._metrics))})")
+        return self._metrics[name]
+
+    def series(self, url, metric, since=None):
+        """[(istante, valore)] di una serie, in ordine di tempo"""
+        url_id = self._urls.get(normalize_url(url))
+        if url_id is None:
+            return []
+        return self._db.execute(
+            "SELECT at, value FROM samples WHERE url_id = ? AND metric_id = ? AND at >= ? ORDER BY at",
+            (url_id, self._metric_id(metric), since or 0)).fetchall()
+
+    def _grouped(self, metric, since=None):
+        """{url: [(istante, valore)]} per una metrica, letto dall'indice per metrica"""
+        names = {index: url for url, index in self._urls.items()}
+        grouped = {}
+        rows = self._db.execute("SELECT url_id, at, value FROM samples WHERE metric_id = ? AND at >= ?",
+                                (self._metric_id(metric), since or 0))
+        for url_id, at, value in rows:
+            grouped.setdefault(names[url_id], []).append((at, value))
+        for points in grouped.values():
+            points.sort()
+        return grouped
+
+    def trend(self, metric, url=None, since=None):
+        """Andamento per URL: mediana, p90, primo/ultimo valore e pendenza giornaliera"""
+        grouped = {url: self.series(url, metric, since)} if url else self._grouped(metric, since)
+        trends = []
+        for page, points in sorted(grouped.items()):
+            if not points:
+                continue
+            values = [value for _, value in points]
+            ordered = sorted(values)
+            slope = None
+            if len(points) > 1 and points[0][0] != points[-1][0]:
+                slope = statistics.linear_regression([at / DAY for at, _ in points], values).slope
+            trends.append({
+                "url": page,
+                "samples": len(points),
+                "first": values[0],
+                "last": values[-1],
+                "median": statistics.median(values),
+                "p90": percentile(ordered, 90),
+                "change_pct": round((values[-1] - values[0]) / values[0] * 100, 2) if values[0] else None,
+                "slope_per_day": round(slope, 4) if slope is not None else None,
+                "since": _format_time(points[0][0]),
+                "until": _format_time(points[-1][0])
+            })
+        return trends
+
+    def percentiles(self, metric=None, since=None, pcts=(50, 90, 99)):
+        """Distribuzione dei valori di ogni metrica (o di una sola) su tutti gli URL"""
+        names = [metric] if metric else sorted(self._metrics)
+        result = {}
+        for name in names:
+            values = sorted(value for (value,) in self._db.execute(
+                "SELECT value FROM samples WHERE metric_id = ? AND at >= ?", (self._metric_id(name), since or 0)))
+            if values:
+                result[name] = dict({"samples": len(values)},
+                                    **{f"p{pct}": percentile(values, pct) for pct in pcts})
+        return result
+
+    def check(self, recent=3, baseline=14, min_baseline=5, since=None, alpha=DEFAULT_ALPHA, thresholds=None):
+        """
+        Per ogni serie confronta gli ultimi `recent` campioni con i `baseline`
+        precedenti: regressione se la variazione delle mediane va nel verso
+        peggiore, supera le soglie ed è significativa (test t).
+        Con migliaia di serie `alpha` è il tasso di falsi positivi tra le
+        regressioni segnalate (Benjamini-Hochberg), non quello per serie.
+        Il test t richiede almeno 2 campioni per parte: ValueError con `recent`
+        o `min_baseline` minori di 2.
+        """
+        if recent < 2 or min_baseline < 2:
+            raise ValueError("--recent e --min-baseline devono essere almeno 2 (il test t richiede 2 campioni per parte)")
+        thresholds = thresholds or THRESHOLDS
+        tested, candidates = 0, []
+        for name in sorted(self._metrics):
+            threshold = thresholds.get(name, DEFAULT_THRESHOLD)
+            worse = "improvement" if name in HIGHER_IS_BETTER else "regression"
+            for page, points in sorted(self._grouped(name, since).items()):
+                values = [value for _, value in points[-(recent + baseline):]]
+                if len(values) < recent + min_baseline:
+                    continue
+                tested += 1
+                # alpha=1: la significatività si decide dopo, su tutte le serie insieme
+                before, after = values[:-recent], values[-recent:]
+                result = compare_metric(before, after, threshold, 1.0)
+                if result["status"] == worse:
+                    # Senza cambiamenti recenti e baseline hanno la stessa distribuzione: test t a varianza
+                    # comune, più affidabile di Welch con 2-3 campioni recenti
+                    p_value = student_t_test(before, after)
+                    candidates.append((p_value, dict(result, status="regression", p_value=round(p_value, 4),
+                                                     url=page, metric=name, since=_format_time(points[-recent][0]))))
+        cutoff = fdr_cutoff([p_value for p_value, _ in candidates], tested, alpha)
+        return [entry for p_value, entry in candidates if cutoff is not None and p_value <= cutoff]
+
+    def stats(self):
+        runs, samples = (self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                         for table in ('runs', 'samples'))
+        return {"runs": runs, "samples": samples, "urls": len(self._urls), "metrics": len(self._metrics)}
+
+    def close(self):
+        self._db.close()
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='audit_history.py',
+        description="Storico di audit e Lighthouse: andamenti, percentili e regressioni"
+    )
+    parser.add_argument('--db', default=DEFAULT_DB, help=f"database SQLite dello storico (default {DEFAULT_DB})")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help="importa report di audit (json/jsonl) e LHR")
+    ingest.add_argument('paths', nargs='+', metavar='FILE', help="file, glob o directory (ricorsive)")
+    ingest.add_argument('--label', help="etichetta dell'esecuzione (es. nightly, staging)")
+
+    for name, help_text in (('trend', "andamento per URL di una metrica"),
+                            ('percentiles', "percentili di ogni metrica su tutti gli URL")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--metric', required=name == 'trend', help="nome della metrica (es. total_size_kb, lcp)")
+        command.add_argument('--days', type=float, default=90, help="finestra in giorni")
+        command.add_argument('--json', action='store_true', help="stampa il risultato in JSON")
+    commands.choices['trend'].add_argument('--url', help="solo questo URL")
+
+    check = commands.add_parser('check', help="regressioni rispetto alla baseline mobile (exit 1 se presenti)")
+    check.add_argument('--recent', type=int, default=3, help="ultime esecuzioni confrontate con la baseline")
+    check.add_argument('--baseline', type=int, default=14, help="esecuzioni precedenti usate come baseline")
+    check.add_argument('--min-baseline', type=int, default=5, help="serie con meno esecuzioni vengono ignorate")
+    check.add_argument('--days', type=float, default=90, help="finestra in giorni")
+    check.add_argument('--alpha', type=float, default=DEFAULT_ALPHA,
+                       help="tasso di falsi positivi ammesso tra le regressioni segnalate (Benjamini-Hochberg)")
+    check.add_argument('--json', action='store_true', help="stampa le regressioni in JSON")
+    return parser
+
+
+def _ingest(history, paths, label=None):
+    totals = {"files": 0, "samples": 0, "skipped": 0}
+    for path in expand_inputs(paths):
+        try:
+            added = history.ingest(path, label)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  {path}: {e}")
+            added = None
+        if added is None:
+            totals["skipped"] += 1
+        else:
+            totals["files"] += 1
+            totals["samples"] += added
+    return totals
+
+
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    history = AuditHistory(args.db)
+    try:
+        if args.command == 'ingest':
+            started = time.perf_counter()
+            totals = _ingest(history, args.paths, args.label)
+            print(f"✅ {totals['files']} file importati ({totals['samples']} campioni, "
+                  f"{totals['skipped']} già presenti o non validi) in {time.perf_counter() - started:.2f}s")
+            return 0
+
+        since = time.time() - args.days * DAY
+        try:
+            if args.command == 'trend':
+                result = history.trend(args.metric, args.url, since)
+            elif args.command == 'percentiles':
+                result = history.percentiles(args.metric, since)
+            else:
+                result = history.check(args.recent, args.baseline, args.min_baseline, since, args.alpha)
+        except ValueError as e:
+            parser.error(str(e))
+
+        if args.json:
+            json.dump(result, sys.stdout, indent=2)
+            print()
+        elif args.command == 'trend':
+            print(f"📈 {args.metric}: {len(result)} URL")
+            for entry in result:
+                slope = f"{entry['slope_per_day']:+.3g}/giorno" if entry["slope_per_day"] is not None else "n/d"
+                print(f"{entry['median']:>10.4g} p90 {entry['p90']:>10.4g}  {entry['first']:.4g} → {entry['last']:.4g}"
+                      f"  {slope}  ({entry['samples']} campioni)  {entry['url']}")
+        elif args.command == 'percentiles':
+            for name, values in result.items():
+                print(f"{name:>22}  p50 {values['p50']:>10.4g}  p90 {values['p90']:>10.4g}  "
+                      f"p99 {values['p99']:>10.4g}  ({values['samples']} campioni)")
+        elif result:
+            print(f"❌ {len(result)} regressioni significative:")
+            for entry in result:
+                print(f"   {entry['metric']:>18}: {entry['before']['median']:.4g} → {entry['after']['median']:.4g}"
+                      f"  p={entry['p_value']}  dal {entry['since']}  {entry['url']}")
+        else:
+            print("✅ Nessuna regressione rispetto alla baseline")
+        return 1 if args.command == 'check' and result else 0
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Strumentazione delle sezioni di audit
+Per ogni sezione misura tempo reale e CPU, richieste HTTP, byte ricevuti,
+cache hit e variazione della memoria residente; i risultati finiscono in
+metadata.timings.
+Opzionalmente profila l'intero audit (cProfile o pyinstrument) ed esporta
+gli intervalli in formato Chrome trace (chrome://tracing, Perfetto).
+
+Richieste, byte e cache hit sono attribuiti alla sezione attiva tramite un
+ContextVar, propagato ai thread di probing: i conteggi restano corretti
+anche quando più sezioni girano in parallelo.
+"""
+
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+_section_counters = contextvars.ContextVar('audit_section_counters', default=None)
+_record_lock = threading.Lock()
+
+
+def record(name, amount=1):
+    """Aggiunge `amount` al contatore `name` della sezione in corso, se ce n'è una"""
+    counters = _section_counters.get()
+    if counters is not None and name in counters:
+        with _record_lock:
+            counters[name] += amount
+
+
+def _peak_rss_kb():
+    """
+    Picco di memoria residente dall'avvio del processo (ru_maxrss è in KB su
+    Linux, in byte su macOS): ha senso per un intero run, non per una sezione
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _current_rss_kb():
+    """Memoria residente attuale da /proc/self/statm (solo Linux, altrimenti None)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+class SectionProfiler:
+    """
+    Misura le sezioni eseguite con measure(). Il tempo CPU è quello del
+    thread della sezione (parsing, regex); l'attesa dei probe è nel tempo reale.
+    rss_delta_kb è la variazione della memoria residente del processo tra
+    inizio e fine della sezione: con sezioni in parallelo si sovrappone.
+    Il picco di tracemalloc è globale al processo: peak_alloc_kb si misura solo
+    per le sezioni del thread che ha chiamato start(), non per quelle di rete
+    nel pool, e con lo scheduler parallelo include comunque le allocazioni
+    delle sezioni di rete in volo (valori esatti con parallel_sections=False).
+    """
+
+    def __init__(self, profile=None, trace_memory=False):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.sections = {}
+        self.events = []
+        self._origin = time.perf_counter()
+        self._profiler = None
+        self._caller = None
+
+    @contextmanager
+    def measure(self, name):
+        trace = self.trace_memory and tracemalloc.is_tracing() and threading.get_ident() == self._caller
+        if trace:
+            tracemalloc.reset_peak()
+        counters = {"requests": 0, "bytes_received": 0, "cache_hits": 0}
+        rss_start = _current_rss_kb()
+        token = _section_counters.set(counters)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            _section_counters.reset(token)
+            entry = dict({
+                "wall_ms": round(wall * 1000, 2),
+                "cpu_ms": round(cpu * 1000, 2),
+            }, **counters)
+            rss_end = _current_rss_kb()
+            entry["rss_delta_kb"] = rss_end - rss_start if rss_start is not None and rss_end is not None else None
+            if trace:
+                entry["peak_alloc_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            self.sections[name] = entry
+            self.events.append({
+                "name": name, "cat": "section", "ph": "X",
+                "ts": round((wall_start - self._origin) * 1e6),
+                "dur": round(wall * 1e6),
+                "pid": os.getpid(), "tid": threading.get_ident(),
+                "args": entry
+            })
+
+    def start(self):
+        """Avvia il tracciamento della memoria e il profiler opzionale"""
+        self._caller = threading.get_ident()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.profile == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+                self._profiler = Profiler()
+            except ImportError:
+                print("⚠️  pyinstrument non installato, uso cProfile")
+                self.profile = 'cprofile'
+        if self.profile == 'cprofile':
+            import cProfile
+            self._profiler = cProfile.Profile()
+        if self.profile == 'pyinstrument':
+            self._profiler.start()
+        elif self._profiler is not None:
+            self._profiler.enable()
+
+    def stop(self):
+        if self.profile == 'pyinstrument':
+            self._profiler.stop()
+        elif self._profiler is not None:
+            self._profiler.disable()
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def report(self):
+        """Tempi per sezione e totali per metadata.timings"""
+        totals = {"wall_ms": 0, "cpu_ms": 0, "requests": 0, "bytes_received": 0, "cache_hits": 0}
+        for entry in self.sections.values():
+            for key in totals:
+                totals[key] += entry[key]
+        totals["wall_ms"] = round(totals["wall_ms"], 2)
+        totals["cpu_ms"] = round(totals["cpu_ms"], 2)
+        slowest = max(self.sections, key=lambda name: self.sections[name]["wall_ms"]) if self.sections else None
+        # Con lo scheduler parallelo le sezioni finiscono in ordine sparso: si riportano per inizio
+        starts = {event["name"]: event["ts"] for event in self.events}
+        sections = {name: self.sections[name] for name in sorted(self.sections, key=lambda n: starts[n])}
+        return {"sections": sections, "total": totals, "slowest": slowest}
+
+    def save_trace(self, path):
+        """Esporta gli intervalli delle sezioni nel formato trace_event di Chrome"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+        print(f"🧭 Trace salvato in {path}")
+
+    def save_profile(self, path):
+        """Salva il profilo: .prof (cProfile, per snakeviz/pstats) o .html (pyinstrument)"""
+        if self._profiler is None:
+            return
+        if self.profile == 'pyinstrument':
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self._profiler.output_html())
+        else:
+            self._profiler.dump_stats(path)
+        print(f"🔬 Profilo salvato in {path}")
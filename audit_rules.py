@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Registro delle regole (regex) usate dalle sezioni di audit
+Le regole sono definite qui come testo e compilate una sola volta, al primo
+uso, invece che a ogni pagina. Un file JSON può estenderle o sostituirle:
+
+    {"placeholder_text": {"extend": ["in arrivo"]},
+     "secrets": {"extend": [["Stripe Key", "sk_live_[0-9a-zA-Z]{24}", "sk_live_"]]},
+     "og_property": ["og:", "twitter:"]}
+
+I pattern personalizzati vengono uniti con '|' in un'unica regex: per questo
+riferimenti all'indietro (\\1, (?P=nome)) e flag inline globali come (?i)
+sono rifiutati al caricamento (i flag con ambito, (?i:...), vanno bene).
+"""
+
+import hashlib
+import json
+import re
+import threading
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+from secret_scanner import SECRET_RULES, SecretScanner
+
+# Nome -> lista di pattern (per "secrets": [tipo, regex, ancora letterale])
+DEFAULT_RULES = {
+    # Testi segnaposto cercati nel testo della pagina
+    "placeholder_text": [
+        r'caricamento\.\.\.?',
+        r'loading\.\.\.?',
+        r'⚠️',
+        r'placeholder',
+        r'lorem ipsum',
+        r'test\s+content',
+        r'coming\s+soon',
+        r'under\s+construction'
+    ],
+    # Note lasciate nel testo pubblicato (todo_items)
+    "todo_marker": [r'\btodo\b', r'\bfixme\b', r'\btbd\b'],
+    # Classi che identificano elementi segnaposto (usate anche dal backend stream)
+    "placeholder_class": [r'(placeholder|loading|todo)'],
+    "console_call": [r'console\.(log|error|warn|debug)\s*\([^)]*\)'],
+    "catch_block": [r'catch\s*\([^)]*\)\s*{[^}]*}'],
+    "og_property": [r'og:'],
+    "secrets": [list(rule) for rule in SECRET_RULES],
+}
+
+# Regole senza distinzione tra maiuscole e minuscole (secrets: vedi secret_scanner)
+IGNORECASE_RULES = {"placeholder_text", "todo_marker", "placeholder_class"}
+
+
+def _compile(name, pattern):
+    try:
+        return re.compile(pattern, re.IGNORECASE if name in IGNORECASE_RULES else 0)
+    except re.error as e:
+        raise ValueError(f"Regola non valida in {name}: {pattern} ({e})")
+
+
+def _walk(items):
+    """Opcode del pattern già analizzato, gruppi e alternative comprese"""
+    for op, av in items:
+        yield op
+        for value in av if isinstance(av, (tuple, list)) else ():
+            for sub in value if isinstance(value, list) else (value,):
+                if isinstance(sub, sre_parse.SubPattern):
+                    yield from _walk(sub)
+
+
+def _check_combinable(name, pattern):
+    """Rifiuta i pattern che cambierebbero significato (o non compilerebbero) dentro una regex combinata"""
+    _compile(name, pattern)
+    parsed = sre_parse.parse(pattern)
+    if parsed.state.flags & ~re.UNICODE:
+        raise ValueError(f"Regola non valida in {name}: {pattern} "
+                         f"(flag inline globali non ammessi, usa la forma con ambito, es. (?i:...))")
+    if any(str(op) in ('GROUPREF', 'GROUPREF_EXISTS') for op in _walk(parsed)):
+        raise ValueError(f"Regola non valida in {name}: {pattern} "
+                         f"(riferimenti all'indietro non ammessi: i pattern vengono combinati)")
+
+
+class RuleMatcher:
+    """
+    Più regole in un'unica regex: ogni pattern diventa un gruppo esterno,
+    così una sola scansione del testo dice anche quale regola ha trovato il match.
+    """
+
+    def __init__(self, rules):
+        parts, self._groups = [], {}
+        group = 1
+        for name, patterns in rules:
+            for pattern in patterns:
+                compiled = _compile(name, pattern)
+                parts.append(f'({pattern})')
+                self._groups[group] = name
+                group += compiled.groups + 1
+        flags = re.IGNORECASE if all(name in IGNORECASE_RULES for name, _ in rules) else 0
+        try:
+            self.regex = re.compile('|'.join(parts), flags) if parts else None
+        except re.error as e:
+            # Es. gruppi con lo stesso nome in due pattern diversi
+            raise ValueError(f"Regole non combinabili ({', '.join(name for name, _ in rules)}): {e}")
+
+    def finditer(self, text):
+        """(match, nome della regola) in ordine di posizione, senza sovrapposizioni"""
+        if self.regex is None:
+            return
+        for match in self.regex.finditer(text):
+            group = next(group for group in self._groups if match.start(group) != -1)
+            yield match, self._groups[group]
+
+
+class RuleRegistry:
+    def __init__(self, overrides=None):
+        self.overrides = overrides or {}
+        self.rules = {name: list(patterns) for name, patterns in DEFAULT_RULES.items()}
+        for name, value in self.overrides.items():
+            if name not in DEFAULT_RULES:
+                raise ValueError(f"Regole sconosciute: {name} (disponibili: {', '.join(DEFAULT_RULES)})")
+            if isinstance(value, dict):
+                self.rules[name] = list(value.get("replace", self.rules[name])) + list(value.get("extend", []))
+            else:
+                self.rules[name] = list(value)
+            # Dei secrets vengono combinate solo le ancore, le regex restano separate
+            for rule in self.rules[name]:
+                _check_combinable(name, rule[2] if name == "secrets" else rule)
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key, build):
+        # Compilazione al primo uso, una volta sola anche con sezioni in parallelo
+        with self._lock:
+            if key not in self._compiled:
+                self._compiled[key] = build()
+            return self._compiled[key]
+
+    def compiled(self, name):
+        """Regex compilate della regola, nell'ordine di definizione"""
+        return self._get(name, lambda: [_compile(name, pattern) for pattern in self.rules[name]])
+
+    def regex(self, name):
+        """Un'unica regex che accetta uno qualsiasi dei pattern della regola"""
+        def build():
+            patterns = self.rules[name]
+            if len(patterns) == 1:
+                return _compile(name, patterns[0])
+            return _compile(name, '|'.join(f'(?:{pattern})' for pattern in patterns))
+        return self._get(('regex', name), build)
+
+    def matcher(self, *names):
+        """RuleMatcher sulle regole indicate, nell'ordine: a parità di posizione vince la prima"""
+        return self._get(('matcher',) + names, lambda: RuleMatcher([(name, self.rules[name]) for name in names]))
+
+    def secret_scanner(self):
+        """SecretScanner con le regole del registro (quelle di default sono già compilate all'import)"""
+        def build():
+            if self.rules["secrets"] == DEFAULT_RULES["secrets"]:
+                return SecretScanner()
+            for secret_type, pattern, anchor in self.rules["secrets"]:
+                _compile("secrets", pattern)
+                _compile("secrets", anchor)
+            return SecretScanner([tuple(rule) for rule in self.rules["secrets"]])
+        return self._get('secret_scanner', build)
+
+    def validate(self):
+        """Compila subito tutte le regole: errori di sintassi come ValueError"""
+        for name in self.rules:
+            if name == "secrets":
+                self.secret_scanner()
+            else:
+                self.compiled(name)
+        return self
+
+    def fingerprint(self):
+        """Impronta delle personalizzazioni (None con le regole di default), per la cache degli audit"""
+        if not self.overrides:
+            return None
+        encoded = json.dumps(self.rules, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+def load_rules(path):
+    """Registro con le personalizzazioni del file JSON `path`, già validate"""
+    with open(path, encoding='utf-8') as f:
+        return RuleRegistry(json.load(f)).validate()
+
+
+# Registro condiviso da tutti gli auditor che non ne ricevono uno proprio
+RULES = RuleRegistry()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Servizio di audit sempre attivo
+Un processo che resta in ascolto su un'API HTTP/JSON locale ed esegue gli
+audit da una coda limitata con un pool di worker. Session (pool di
+connessioni keep-alive), cache DNS, regole compilate e cache persistente
+restano calde tra un job e l'altro: un audit non paga più avvio
+dell'interprete, import e handshake TLS.
+
+API:
+  POST /jobs                 {"url": ..., "sections": [...], "parser": ..., "scan_external_js": true, "cache": true}
+  GET  /jobs/<id>            stato del job
+  GET  /jobs/<id>/result     report (202 finché non è pronto; ?wait=30 attende fino a 30 secondi)
+  GET  /metrics              coda, latenze (p50/p90/p99) e throughput
+  GET  /health
+
+Uso: python audit_service.py [--port 8765] [--workers 4] [--queue 100] [--cache audit-cache.db]
+"""
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from audit_rules import RULES, load_rules
+from html_parsing import BACKENDS, resolve_backend
+from http_transport import HttpTransport
+from lighthouse_stats import percentile
+from probe_engine import ProbeEngine
+from section_scheduler import select_sections
+from transport_args import add_transport_arguments, transport_options
+from website_auditor import AUDIT_SECTIONS, USER_AGENT, WebsiteAuditor, count_issues
+
+DEFAULT_PORT = 8765
+# Job conclusi conservati (con il report) prima di scartare i più vecchi
+MAX_FINISHED_JOBS = 500
+# Campioni usati per percentili e throughput
+LATENCY_WINDOW = 1000
+THROUGHPUT_WINDOW_S = 60
+MAX_WAIT_S = 60
+MAX_BODY_BYTES = 64 * 1024
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, url, options):
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        self.options = options
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def describe(self):
+        info = {
+            "id": self.id,
+            "url": self.url,
+            "status": self.status,
+            "submitted": datetime.fromtimestamp(self.submitted).isoformat(),
+            "queue_ms": round(((self.started or time.time()) - self.submitted) * 1000, 1),
+        }
+        if self.started is not None:
+            info["run_ms"] = round(((self.finished or time.time()) - self.started) * 1000, 1)
+        if self.error:
+            info["error"] = self.error
+        if self.result is not None:
+            info["issues"] = count_issues(self.result)
+        return info
+
+
+class ServiceStats:
+    """Contatori e latenze degli ultimi job, sicuri tra thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counts = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.finished_at = deque()
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def job_finished(self, job):
+        with self._lock:
+            self.counts["completed" if job.status == "done" else "failed"] += 1
+            self.latencies.append((job.started - job.submitted, job.finished - job.started,
+                                   job.finished - job.submitted))
+            self.finished_at.append(job.finished)
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            while self.finished_at and now - self.finished_at[0] > THROUGHPUT_WINDOW_S:
+                self.finished_at.popleft()
+            recent = len(self.finished_at)
+            samples = list(self.latencies)
+            counts = dict(self.counts)
+
+        def summary(values):
+            values = sorted(values)
+            return {f"p{pct}": round(percentile(values, pct) * 1000, 1) if values else None
+                    for pct in (50, 90, 99)}
+
+        uptime = now - self.started
+        return {
+            "uptime_s": round(uptime, 1),
+            "jobs": counts,
+            "latency_ms": {
+                "queue": summary(sample[0] for sample in samples),
+                "run": summary(sample[1] for sample in samples),
+                "total": summary(sample[2] for sample in samples),
+            },
+            "throughput": {
+                # Job conclusi nell'ultimo minuto (o dall'avvio, se più recente)
+                "jobs_per_min": round(recent * 60 / min(uptime, THROUGHPUT_WINDOW_S), 2) if uptime else 0.0,
+                "window_s": THROUGHPUT_WINDOW_S
+            }
+        }
+
+
+class AuditService:
+    """Coda limitata di audit eseguiti da worker che condividono session, regole e cache"""
+
+    def __init__(self, workers=4, max_queue=100, max_workers=16, per_host_limit=4, parser='html.parser',
+                 transport=None, cache=None, rules=None, max_finished=MAX_FINISHED_JOBS):
+        self.workers = max(1, workers)
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.parser = resolve_backend(parser)
+        self.cache = cache
+        self.rules = rules or RULES
+        self.max_finished = max_finished
+        # Un solo trasporto e una sola Session: connessioni keep-alive e DNS restano caldi tra i job
+        self.transport = transport or HttpTransport(pool_size=max_workers * self.workers)
+        self.session = self.transport.create_session(USER_AGENT)
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.jobs = OrderedDict()
+        self.stats = ServiceStats()
+        self._lock = threading.Lock()
+        self._threads = []
+        self.running = 0
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'audit-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        """Fa terminare i worker dopo il job in corso; i job ancora in coda falliscono subito"""
+        while True:
+            try:
+                job = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job.status, job.error = "failed", "servizio arrestato"
+                job.done.set()
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def validate(self, payload):
+        """URL e opzioni del job; ValueError se non validi"""
+        url = payload.get("url") if isinstance(payload, dict) else None
+        if not isinstance(url, str) or urlparse(url).scheme not in ('http', 'https') or not urlparse(url).netloc:
+            raise ValueError("'url' deve essere un URL http(s) assoluto")
+        options = {
+            "sections": payload.get("sections"),
+            "parser": payload.get("parser") or self.parser,
+            "scan_external_js": payload.get("scan_external_js", True),
+            "cache": payload.get("cache", True)
+        }
+        for name in ("scan_external_js", "cache"):
+            if not isinstance(options[name], bool):
+                raise ValueError(f"'{name}' deve essere true o false")
+        if options["sections"] is not None:
+            if not isinstance(options["sections"], list) or not all(isinstance(name, str) for name in options["sections"]):
+                raise ValueError("'sections' deve essere una lista di nomi di sezione")
+            select_sections(AUDIT_SECTIONS, options["sections"])
+        if options["parser"] not in BACKENDS:
+            raise ValueError(f"Parser sconosciuto: {options['parser']} (disponibili: {', '.join(BACKENDS)})")
+        return url, options
+
+    def submit(self, payload):
+        url, options = self.validate(payload)
+        job = Job(url, options)
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            self.stats.count("rejected")
+            raise QueueFull(f"coda piena ({self.queue.maxsize} job)")
+        with self._lock:
+            self.jobs[job.id] = job
+        self.stats.count("submitted")
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            with self._lock:
+                self.running += 1
+            job.status = "running"
+            job.started = time.time()
+            try:
+                job.result = self.run_job(job)
+                if job.result is None:
+                    job.status, job.error = "failed", "download fallito"
+                else:
+                    job.status = "done"
+            except Exception as e:
+                job.status, job.error = "failed", str(e)
+            job.finished = time.time()
+            self.stats.job_finished(job)
+            with self._lock:
+                self.running -= 1
+                self._forget_old_jobs()
+            job.done.set()
+
+    def run_job(self, job):
+        """
+        Un audit con la Session condivisa; la cache dei probe è del job, così i risultati sono attuali.
+        La cache persistente (--cache) serve invece tutte le sezioni di una pagina invariata,
+        comprese link e asset: con "cache": false nel payload il job la ignora.
+        """
+        probe = ProbeEngine(self.session, max_workers=self.max_workers, per_host_limit=self.per_host_limit)
+        try:
+            auditor = WebsiteAuditor(job.url, session=self.session, probe=probe, transport=self.transport,
+                                     parser=job.options["parser"], rules=self.rules,
+                                     cache=self.cache if job.options["cache"] else None,
+                                     scan_external_js=job.options["scan_external_js"],
+                                     sections=job.options["sections"])
+            return auditor.run_full_audit()
+        finally:
+            probe.close()
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+
+    def metrics(self):
+        report = self.stats.snapshot()
+        with self._lock:
+            running = self.running
+        report["queue"] = {"depth": self.queue.qsize(), "capacity": self.queue.maxsize,
+                           "running": running, "workers": self.workers}
+        report["transport"] = self.transport.report()
+        if self.cache is not None:
+            report["cache"] = self.cache.stats()
+        return report
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """API JSON del servizio (self.server.service è l'AuditService)"""
+    server_version = 'WebAuditorService/1.0'
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message, headers=None):
+        self._send(status, {"error": message}, headers)
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/jobs':
+            return self._error(404, "risorsa sconosciuta")
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            return self._error(413, "richiesta troppo grande")
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            job = self.server.service.submit(payload)
+        except (ValueError, UnicodeDecodeError) as e:
+            return self._error(400, str(e))
+        except QueueFull as e:
+            return self._error(429, str(e), {'Retry-After': '5'})
+        self._send(202, dict(job.describe(), links={"status": f"/jobs/{job.id}",
+                                                   "result": f"/jobs/{job.id}/result"}),
+                   {'Location': f"/jobs/{job.id}"})
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        parts = [part for part in parsed.path.split('/') if part]
+        service = self.server.service
+        if parts == ['health']:
+            return self._send(200, {"status": "ok"})
+        if parts == ['metrics']:
+            return self._send(200, service.metrics())
+        if len(parts) in (2, 3) and parts[0] == 'jobs' and (len(parts) == 2 or parts[2] == 'result'):
+            job = service.get(parts[1])
+            if job is None:
+                return self._error(404, "job sconosciuto o scaduto")
+            if len(parts) == 2:
+                return self._send(200, job.describe())
+            try:
+                wait = float(parse_qs(parsed.query).get('wait', ['0'])[0])
+            except ValueError:
+                return self._error(400, "'wait' deve essere un numero di secondi")
+            job.done.wait(min(max(wait, 0), MAX_WAIT_S))
+            if job.status == "done":
+                return self._send(200, job.result)
+            if job.status == "failed":
+                return self._send(502, job.describe())
+            return self._send(202, job.describe(), {'Retry-After': '1'})
+        return self._error(404, "risorsa sconosciuta")
+
+    def log_message(self, *args):
+        pass
+
+
+def create_server(service, host='127.0.0.1', port=DEFAULT_PORT):
+    httpd = ThreadingHTTPServer((host, port), ServiceHandler)
+    httpd.daemon_threads = True
+    httpd.service = service
+    return httpd
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servizio di audit con API HTTP/JSON locale")
+    parser.add_argument('--host', default='127.0.0.1', help="indirizzo di ascolto (default solo locale)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=4, help="audit eseguiti in parallelo")
+    parser.add_argument('--queue', type=int, default=100, help="job in attesa oltre i quali le richieste sono rifiutate (429)")
+    parser.add_argument('--probe-workers', type=int, default=16, help="richieste di probing in parallelo per audit")
+    parser.add_argument('--per-host', type=int, default=4, help="richieste in parallelo per host")
+    parser.add_argument('--parser', choices=BACKENDS, default='html.parser', help="backend di parsing di default")
+    parser.add_argument('--cache', metavar='FILE', help="cache persistente (SQLite) condivisa dai job")
+    parser.add_argument('--cache-ttl', type=float, default=24, help="validità delle voci in cache, in ore")
+    parser.add_argument('--rules', metavar='FILE', help="regole JSON che estendono i pattern di default")
+    add_transport_arguments(parser)
+    args = parser.parse_args(argv)
+    args.workers = max(1, args.workers)
+    try:
+        rules = load_rules(args.rules) if args.rules else None
+    except (OSError, ValueError) as e:
+        parser.error(f"--rules: {e}")
+
+    cache = None
+    if args.cache:
+        from audit_cache import AuditCache
+        cache = AuditCache(args.cache, ttl=args.cache_ttl * 3600)
+
+    options = transport_options(args)
+    # Il pool di connessioni deve bastare a tutti i worker insieme
+    options["pool_size"] = args.pool_size or args.probe_workers * args.workers
+    service = AuditService(workers=args.workers, max_queue=args.queue, max_workers=args.probe_workers,
+                           per_host_limit=args.per_host, parser=args.parser,
+                           transport=HttpTransport(**options), cache=cache, rules=rules).start()
+    httpd = create_server(service, args.host, args.port)
+    print(f"🚀 Servizio di audit su http://{args.host}:{httpd.server_address[1]} "
+          f"({service.workers} worker, coda {args.queue})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("⏹️  Arresto del servizio...")
+    finally:
+        httpd.server_close()
+        service.stop(timeout=30)
+        if cache is not None:
+            cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Output in streaming (JSON Lines) per audit e crawl
+Ogni sezione viene scritta appena completata: un record "finding" per ogni
+elemento delle sue liste e un record "section" con i campi restanti.
+read_stream() ricostruisce la stessa struttura di audit.json.
+
+Uso: python audit_stream.py audit.jsonl.gz -o audit.json
+"""
+
+import argparse
+import gzip
+import io
+import json
+import sys
+import threading
+
+
+def _zstd_module():
+    """zstd dalla libreria standard (Python 3.14+) o dal pacchetto zstandard"""
+    try:
+        from compression import zstd
+        return 'stdlib', zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        return 'zstandard', zstandard
+    except ImportError:
+        raise RuntimeError("Compressione zstd non disponibile: installa con pip install zstandard")
+
+
+def compression_for(path, compression=None):
+    """Compressione esplicita oppure dedotta dall'estensione del file"""
+    if compression:
+        return compression
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        return 'zstd'
+    return None
+
+
+def open_text(path, mode, compression=None):
+    """Apre un file JSONL, eventualmente compresso, in modalità testo ('r' o 'w')"""
+    compression = compression_for(path, compression)
+    if compression == 'gzip':
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if compression == 'zstd':
+        flavour, zstd = _zstd_module()
+        if flavour == 'stdlib':
+            return zstd.open(path, mode + 't', encoding='utf-8')
+        raw = open(path, mode + 'b')
+        if mode == 'w':
+            stream = zstd.ZstdCompressor().stream_writer(raw, closefd=True)
+        else:
+            stream = zstd.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    if compression is not None:
+        raise ValueError(f"Compressione sconosciuta: {compression}")
+    return open(path, mode, encoding='utf-8')
+
+
+class JsonlSink:
+    """Scrive record JSON uno per riga; sicuro da usare da più thread (crawl)"""
+
+    def __init__(self, path, compression=None):
+        self.path = path
+        self.records = 0
+        self._lock = threading.Lock()
+        self._file = open_text(path, 'w', compression)
+
+    def write(self, record):
+        """Scrive un record (inizio, pagina, riepilogo) e lo porta subito su disco"""
+        self._write_lines([json.dumps(record, ensure_ascii=False)])
+
+    def _write_lines(self, lines):
+        # Un solo flush per blocco: i record di una sezione restano anche contigui tra i thread
+        with self._lock:
+            self._file.write('\n'.join(lines) + '\n')
+            self._file.flush()
+            self.records += len(lines)
+
+    def write_section(self, page, section, data):
+        """Una sezione completata: prima i singoli finding, poi il record della sezione, con un solo flush"""
+        lines, fields, scalars, counts = [], [], {}, {}
+        for field, value in data.items():
+            fields.append(field)
+            if isinstance(value, list):
+                counts[field] = len(value)
+                for item in value:
+                    lines.append(json.dumps({"type": "finding", "page": page, "section": section,
+                                             "field": field, "data": item}, ensure_ascii=False))
+            else:
+                scalars[field] = value
+        lines.append(json.dumps({"type": "section", "page": page, "section": section,
+                                 "fields": fields, "counts": counts, "data": scalars}, ensure_ascii=False))
+        self._write_lines(lines)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_records(path, compression=None):
+    with open_text(path, 'r', compression) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _in_section_order(sections):
+    """Sezioni nell'ordine di AUDIT_SECTIONS (sul file sono nell'ordine di completamento)"""
+    from website_auditor import AUDIT_SECTIONS
+
+    order = {spec.name: index for index, spec in enumerate(AUDIT_SECTIONS)}
+    names = sorted(sections, key=lambda name: order.get(name, len(order)))
+    return {name: sections[name] for name in names}
+
+
+def read_stream(path, compression=None):
+    """Ricostruisce il report (audit singolo o crawl) dal file JSONL, con le sezioni nell'ordine di un run normale"""
+    mode = 'page'
+    metadata, summary = {}, None
+    findings = {}
+    sections = {}
+    pages, skipped = [], []
+
+    for record in read_records(path, compression):
+        kind = record["type"]
+        if kind == "start":
+            mode = record.get("mode", "page")
+            metadata.update(record["metadata"])
+        elif kind == "metadata":
+            metadata.update(record["metadata"])
+        elif kind == "finding":
+            key = (record["page"], record["section"], record["field"])
+            findings.setdefault(key, []).append(record["data"])
+        elif kind == "section":
+            page, section = record["page"], record["section"]
+            rebuilt = {}
+            for field in record["fields"]:
+                if field in record["counts"]:
+                    rebuilt[field] = findings.pop((page, section, field), [])
+                else:
+                    rebuilt[field] = record["data"][field]
+            sections.setdefault(page, {})[section] = rebuilt
+        elif kind == "page":
+            page = dict(record["page"])
+            page["audit"] = _in_section_order(sections.pop(page["url"], {}))
+            pages.append(page)
+        elif kind == "skipped":
+            skipped.append(record["data"])
+        elif kind == "summary":
+            summary = record["data"]
+
+    if mode in ("crawl", "sitemap"):
+        return {"metadata": metadata, "summary": summary, "pages": pages, "skipped": skipped}
+
+    report = {"metadata": metadata}
+    for page_sections in sections.values():
+        report.update(_in_section_order(page_sections))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ricostruisce audit.json da un file JSONL in streaming")
+    parser.add_argument('input', help="file .jsonl (anche .jsonl.gz / .jsonl.zst)")
+    parser.add_argument('-o', '--output', help="file JSON di destinazione (default: stdout)")
+    parser.add_argument('--compression', choices=['gzip', 'zstd'], help="forza il formato di compressione")
+    args = parser.parse_args(argv)
+
+    report = read_stream(args.input, args.compression)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"✅ Report ricostruito in {args.output}")
+    else:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
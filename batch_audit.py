@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Audit in batch di molti URL su un pool di processi
+Ogni processo crea una sola Session e un solo pool di probing e li riusa per
+tutti gli URL che gli vengono assegnati (connessioni TLS già aperte, cache
+dei probe condivisa tra le pagine). L'indice results.jsonl viene aggiornato
+dopo ogni URL: se il batch si interrompe, rilanciandolo riparte dagli URL
+non ancora completati.
+
+Uso: python batch_audit.py urls.txt -o batch-audit --processes 8
+     cat urls.txt | python batch_audit.py - -o batch-audit
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from audit_rules import load_rules
+from html_parsing import BACKENDS
+from probe_engine import ProbeEngine
+from transport_args import add_transport_arguments, transport_options
+from website_auditor import USER_AGENT, WebsiteAuditor, count_issues
+
+INDEX_FILE = 'results.jsonl'
+SUMMARY_FILE = 'summary.json'
+REPORTS_DIR = 'reports'
+# Dopo quante pagine un processo svuota la cache dei probe (limita la memoria)
+PROBE_RECYCLE_PAGES = 200
+
+# Stato del processo worker, creato una volta da _init_worker
+_worker = None
+
+
+def read_urls(source):
+    """URL da un file (o '-' per stdin): una per riga, ignora righe vuote, commenti e duplicati"""
+    if source == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+    urls, seen = [], set()
+    for line in lines:
+        url = line.strip()
+        if not url or url.startswith('#') or url in seen:
+            continue
+        seen.add(url)
+        urls.append(url)
+    return urls
+
+
+def report_name(url):
+    """Nome del file di report di un URL, stabile tra un'esecuzione e l'altra"""
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + '.json'
+
+
+def _terminate_last_line(path):
+    """Chiude con un a capo l'eventuale riga troncata, così i nuovi record restano validi"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b'\n':
+            f.write(b'\n')
+
+
+def load_index(path):
+    """Ultimo esito registrato per ogni URL; ignora una riga finale troncata da un crash"""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            entries[entry["url"]] = entry
+    return entries
+
+
+class _WorkerState:
+    def __init__(self, options):
+        self.options = options
+        # Il registro delle regole non si trasferisce tra processi: ogni worker rilegge il file
+        self.rules = load_rules(options["rules"]) if options.get("rules") else None
+        # Il contatore delle connessioni riusate è cumulativo per processo
+        from http_transport import HttpTransport
+        self.transport = HttpTransport(**options["transport"])
+        self.session = self.transport.create_session(USER_AGENT)
+        self.probe = None
+        self.pages = 0
+        self.recycle_probe()
+
+    def recycle_probe(self):
+        if self.probe is not None:
+            self.probe.close()
+        self.probe = ProbeEngine(self.session, max_workers=self.options["max_workers"],
+                                 per_host_limit=self.options["per_host_limit"])
+        self.pages = 0
+
+
+def _init_worker(options):
+    global _worker
+    _worker = _WorkerState(options)
+
+
+def _audit_url(url, reports_dir):
+    """Eseguito nel processo worker: audit di un URL e salvataggio del suo report"""
+    state = _worker
+    if state.pages >= PROBE_RECYCLE_PAGES:
+        state.recycle_probe()
+    state.pages += 1
+
+    entry = {"url": url, "report": None, "issues": None, "error": None}
+    try:
+        auditor = WebsiteAuditor(url, session=state.session, probe=state.probe, transport=state.transport,
+                                 parser=state.options["parser"],
+                                 scan_external_js=state.options["scan_external_js"], rules=state.rules)
+        results = auditor.run_full_audit()
+    except Exception as e:
+        entry.update(status="error", error=str(e))
+        return entry
+    if not results:
+        entry.update(status="error", error="download fallito")
+        return entry
+
+    # Scrittura atomica: un report a metà non sopravvive a un crash
+    name = report_name(url)
+    path = os.path.join(reports_dir, name)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+    entry.update(status="ok", report=os.path.join(REPORTS_DIR, name), issues=count_issues(results))
+    return entry
+
+
+def summarize(entries, total):
+    """Riepilogo aggregato a partire dall'indice dei risultati"""
+    issues = {"critical": 0, "high": 0, "medium": 0, "low": 0}
+    audited = [entry for entry in entries if entry["status"] == "ok"]
+    for entry in audited:
+        for severity, count in entry["issues"].items():
+            issues[severity] += count
+    worst = sorted(audited, key=lambda e: (-e["issues"]["critical"], -e["issues"]["high"],
+                                           -e["issues"]["medium"], e["url"]))
+    return {
+        "generated": datetime.now().isoformat(),
+        "urls": total,
+        "audited": len(audited),
+        "failed": [{"url": e["url"], "error": e["error"]} for e in entries if e["status"] != "ok"],
+        "issues": issues,
+        "worst_pages": [{"url": e["url"], "issues": e["issues"], "report": e["report"]} for e in worst[:20]]
+    }
+
+
+class BatchAuditor:
+    def __init__(self, urls, output_dir, processes=None, max_workers=16, per_host_limit=4,
+                 parser='html.parser', scan_external_js=True, retry_failed=False, transport=None, rules=None):
+        self.urls = urls
+        self.output_dir = output_dir
+        self.processes = processes or os.cpu_count() or 1
+        self.retry_failed = retry_failed
+        self.options = {
+            "max_workers": max_workers,
+            "per_host_limit": per_host_limit,
+            "parser": parser,
+            "scan_external_js": scan_external_js,
+            "transport": transport or {"pool_size": max_workers},
+            "rules": rules
+        }
+
+    def pending(self, done):
+        """URL ancora da fare: mai registrati, oppure falliti se retry_failed"""
+        todo = []
+        for url in self.urls:
+            entry = done.get(url)
+            if entry is None or (self.retry_failed and entry["status"] != "ok"):
+                todo.append(url)
+        return todo
+
+    def run(self):
+        reports_dir = os.path.join(self.output_dir, REPORTS_DIR)
+        os.makedirs(reports_dir, exist_ok=True)
+        index_path = os.path.join(self.output_dir, INDEX_FILE)
+        done = load_index(index_path)
+        _terminate_last_line(index_path)
+        todo = self.pending(done)
+        if len(todo) < len(self.urls):
+            print(f"↩️  Ripresa: {len(self.urls) - len(todo)} URL già completati")
+        print(f"🚀 Audit di {len(todo)} URL su {self.processes} processi...")
+
+        if todo:
+            with open(index_path, 'a', encoding='utf-8') as index, \
+                    ProcessPoolExecutor(max_workers=min(self.processes, len(todo)),
+                                        initializer=_init_worker,
+                                        initargs=(self.options,)) as pool:
+                futures = {pool.submit(_audit_url, url, reports_dir): url for url in todo}
+                try:
+                    for count, future in enumerate(as_completed(futures), 1):
+                        try:
+                            entry = future.result()
+                        except Exception as e:
+                            # Processo worker terminato in modo anomalo
+                            entry = {"url": futures[future], "status": "error", "report": None,
+                                     "issues": None, "error": str(e)}
+                        index.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                        index.flush()
+                        done[entry["url"]] = entry
+                        mark = "✅" if entry["status"] == "ok" else "❌"
+                        print(f"{mark} [{count}/{len(todo)}] {entry['url']}")
+                except KeyboardInterrupt:
+                    print("⏹️  Interrotto: rilancia lo stesso comando per riprendere")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+
+        entries = [done[url] for url in self.urls if url in done]
+        summary = summarize(entries, len(self.urls))
+        with open(os.path.join(self.output_dir, SUMMARY_FILE), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audit in batch di una lista di URL")
+    parser.add_argument('urls', help="file con un URL per riga ('-' per stdin)")
+    parser.add_argument('-o', '--output', default='batch-audit', help="cartella dei risultati")
+    parser.add_argument('--processes', type=int, help="processi worker (default: numero di CPU)")
+    parser.add_argument('--workers', type=int, default=16, help="richieste di probing in parallelo per processo")
+    parser.add_argument('--per-host', type=int, default=4, help="richieste in parallelo per host")
+    parser.add_argument('--parser', choices=BACKENDS, default='html.parser', help="backend di parsing HTML")
+    parser.add_argument('--no-js-scan', action='store_true', help="non scarica i bundle JS esterni")
+    parser.add_argument('--retry-failed', action='store_true', help="ripete anche gli URL falliti in precedenza")
+    parser.add_argument('--rules', metavar='FILE', help="regole JSON che estendono i pattern di default")
+    add_transport_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.rules:
+        try:
+            load_rules(args.rules)
+        except (OSError, ValueError) as e:
+            parser.error(f"--rules: {e}")
+
+    urls = read_urls(args.urls)
+    if not urls:
+        print("❌ Nessun URL da analizzare")
+        return 1
+
+    summary = BatchAuditor(urls, args.output, processes=args.processes, max_workers=args.workers,
+                           per_host_limit=args.per_host, parser=args.parser,
+                           scan_external_js=not args.no_js_scan,
+                           retry_failed=args.retry_failed, transport=transport_options(args),
+                           rules=args.rules).run()
+
+    print("\n" + "="*50)
+    print("📊 BATCH SUMMARY")
+    print("="*50)
+    print(f"🌐 URL: {summary['urls']} ({summary['audited']} analizzati, {len(summary['failed'])} falliti)")
+    print(f"🚨 CRITICI: {summary['issues']['critical']}")
+    print(f"⚠️  ALTI: {summary['issues']['high']}")
+    print(f"📋 MEDI: {summary['issues']['medium']}")
+    print(f"💡 BASSI: {summary['issues']['low']}")
+    print(f"\n✅ Risultati in {args.output}/")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark: run_full_audit e singole sezioni su siti sintetici serviti in locale
+Per ogni scenario misura tempo reale e richieste al secondo, totali e per
+sezione, il picco di RSS del run e la variazione di RSS di ogni sezione, e li
+confronta con una baseline salvata.
+
+Uso: python benchmarks/bench_auditor.py [--scenarios small deep_dom] [--repeat 3]
+     python benchmarks/bench_auditor.py --save-baseline benchmarks/baseline.json
+     python benchmarks/bench_auditor.py --baseline benchmarks/baseline.json   (exit 1 se regredisce)
+
+Fanno fallire il confronto solo i totali di ogni scenario (tempo di
+run_full_audit, richieste/s, picco di RSS); i tempi CPU delle singole sezioni
+sono pochi millisecondi, rumorosi e legati all'hardware, e danno solo un avviso.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixture_site import SCENARIOS, FixtureSite
+
+# Sotto questa differenza assoluta un tempo non conta come regressione (rumore)
+MIN_DELTA_MS = 25
+# Per le sezioni (solo avviso) la soglia è più alta: pochi ms di CPU raddoppiano facilmente
+MIN_SECTION_DELTA_MS = 100
+
+
+def _audit_once(url, parser, parallel_sections):
+    """Eseguito in un processo nuovo, così il picco di RSS riguarda solo questo audit"""
+    from audit_profiler import _peak_rss_kb
+    from website_auditor import WebsiteAuditor
+
+    auditor = WebsiteAuditor(url, parser=parser, parallel_sections=parallel_sections)
+    started = time.perf_counter()
+    results = auditor.run_full_audit()
+    wall = time.perf_counter() - started
+    if not results:
+        raise RuntimeError(f"audit fallito su {url}")
+
+    timings = results["metadata"]["timings"]
+    requests = results["metadata"]["transport"]["requests"]
+    return {
+        "wall_ms": round(wall * 1000, 2),
+        "requests": requests,
+        "requests_per_s": round(requests / wall, 1) if wall else 0,
+        "peak_rss_kb": _peak_rss_kb(),
+        "sections": {name: {key: entry[key] for key in ("wall_ms", "cpu_ms", "requests", "rss_delta_kb")}
+                     for name, entry in timings["sections"].items()}
+    }
+
+
+def run_scenario(name, repeat=3, parser='html.parser', parallel_sections=True):
+    """Mediana dei tempi e massimo della memoria su `repeat` esecuzioni"""
+    runs = []
+    with FixtureSite(SCENARIOS[name]) as site:
+        for _ in range(repeat):
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                runs.append(pool.submit(_audit_once, site.base_url, parser, parallel_sections).result())
+
+    sections = {}
+    for section in runs[0]["sections"]:
+        entries = [run["sections"][section] for run in runs]
+        sections[section] = {
+            "wall_ms": round(statistics.median(e["wall_ms"] for e in entries), 2),
+            "cpu_ms": round(statistics.median(e["cpu_ms"] for e in entries), 2),
+            "requests": entries[0]["requests"],
+            "rss_delta_kb": max(e["rss_delta_kb"] or 0 for e in entries)
+        }
+    return {
+        "wall_ms": round(statistics.median(run["wall_ms"] for run in runs), 2),
+        "requests": runs[0]["requests"],
+        "requests_per_s": round(statistics.median(run["requests_per_s"] for run in runs), 1),
+        "peak_rss_kb": max(run["peak_rss_kb"] or 0 for run in runs),
+        "sections": sections
+    }
+
+
+def compare(baseline, current, tolerance=0.25, rss_tolerance=0.2):
+    """
+    Confronto con la baseline: (regressioni, avvisi). Regressioni sono i totali
+    dello scenario oltre la tolleranza, avvisi le sezioni più lente.
+    """
+    regressions, warnings = [], []
+
+    def slower(found, label, before, after, min_delta=MIN_DELTA_MS):
+        if after > before * (1 + tolerance) and after - before > min_delta:
+            found.append(f"{label}: {before:.0f} ms -> {after:.0f} ms (+{(after / before - 1) * 100:.0f}%)")
+
+    for name, result in current.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        slower(regressions, f"{name} run_full_audit", reference["wall_ms"], result["wall_ms"])
+        # Con le sezioni in parallelo il tempo reale di una sezione include l'attesa dei probe
+        # avviati da altre: per le sezioni si confronta il tempo CPU, che è solo loro
+        for section, entry in result["sections"].items():
+            if section in reference["sections"]:
+                slower(warnings, f"{name} {section} (cpu)", reference["sections"][section]["cpu_ms"], entry["cpu_ms"],
+                       MIN_SECTION_DELTA_MS)
+        if result["requests_per_s"] < reference["requests_per_s"] * (1 - tolerance):
+            regressions.append(f"{name} richieste/s: {reference['requests_per_s']} -> {result['requests_per_s']}")
+        if reference["peak_rss_kb"] and result["peak_rss_kb"] > reference["peak_rss_kb"] * (1 + rss_tolerance):
+            regressions.append(f"{name} picco RSS: {reference['peak_rss_kb']} KB -> {result['peak_rss_kb']} KB")
+    return regressions, warnings
+
+
+def print_table(results):
+    print(f"{'scenario':>14} {'sezione':>24} {'ms':>9} {'cpu ms':>9} {'req':>5} {'RSS MB':>7}")
+    for name, result in results.items():
+        print(f"{name:>14} {'run_full_audit':>24} {result['wall_ms']:>9.1f} {'':>9} {result['requests']:>5} "
+              f"{result['peak_rss_kb'] / 1024:>7.1f}  ({result['requests_per_s']} req/s)")
+        for section, entry in result["sections"].items():
+            print(f"{'':>14} {section:>24} {entry['wall_ms']:>9.1f} {entry['cpu_ms']:>9.1f} {entry['requests']:>5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--parser', default='html.parser')
+    parser.add_argument('--serial-sections', action='store_true')
+    parser.add_argument('--baseline', help="baseline JSON da confrontare (exit 1 se ci sono regressioni)")
+    parser.add_argument('--save-baseline', metavar='FILE', help="salva i risultati come nuova baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="peggioramento ammesso sui tempi (0.25 = 25%%)")
+    parser.add_argument('--rss-tolerance', type=float, default=0.2, help="aumento ammesso del picco di RSS")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.scenarios:
+        print(f"⏱️  {name}...", flush=True)
+        results[name] = run_scenario(name, args.repeat, args.parser, not args.serial_sections)
+    print_table(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "parser": args.parser,
+                "scenarios": results
+            }, f, indent=2)
+        print(f"💾 Baseline salvata in {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)["scenarios"]
+        regressions, warnings = compare(baseline, results, args.tolerance, args.rss_tolerance)
+        if warnings:
+            print("\n⚠️  Sezioni più lente della baseline (solo avviso):")
+            for line in warnings:
+                print(f"   - {line}")
+        if regressions:
+            print("\n❌ Regressioni rispetto alla baseline:")
+            for line in regressions:
+                print(f"   - {line}")
+            return 1
+        print("\n✅ Nessuna regressione rispetto alla baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
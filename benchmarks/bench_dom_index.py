@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ricerche ripetute con soup.find_all contro DocumentIndex
+Uso: python benchmarks/bench_dom_index.py [--sizes 1 2 5] [--repeat 3]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from dom_index import DocumentIndex
+from synthetic import synthetic_page
+
+
+PLACEHOLDER_CLASS = re.compile(r'(placeholder|loading|todo)', re.I)
+OG_PROPERTY = re.compile(r'og:')
+
+
+def legacy_queries(soup):
+    """Le ricerche che run_full_audit eseguiva direttamente sull'albero"""
+    soup.find_all('a', href=True)
+    soup.find_all('a')
+    set(elem.get('id') for elem in soup.find_all() if elem.get('id'))
+    soup.find_all(['button', 'input'])
+    soup.find_all('form')
+    soup.find_all('link', rel='stylesheet')
+    soup.find_all('script', src=True)
+    soup.find_all('img', src=True)
+    soup.find_all('script')
+    soup.find_all('script')
+    soup.find_all(attrs={'class': PLACEHOLDER_CLASS})
+    soup.find_all('a', href=True)
+    soup.find('title')
+    soup.find('meta', attrs={'name': 'description'})
+    soup.find_all('h1')
+    soup.find_all('meta', property=OG_PROPERTY)
+    soup.find_all('script', type='application/ld+json')
+
+
+def indexed_queries(soup):
+    """Le stesse ricerche servite da un DocumentIndex costruito in una visita"""
+    dom = DocumentIndex(soup)
+    dom.with_attr('a', 'href')
+    dom.tags('a')
+    dom.ids
+    dom.tags('button', 'input')
+    dom.tags('form')
+    dom.with_attr('link', 'rel', 'stylesheet')
+    dom.with_attr('script', 'src')
+    dom.with_attr('img', 'src')
+    dom.scripts
+    dom.scripts
+    dom.with_class_matching(PLACEHOLDER_CLASS)
+    dom.with_attr('a', 'href')
+    dom.first('title')
+    next((m for m in dom.tags('meta') if m.get('name') == 'description'), None)
+    dom.tags('h1')
+    [m for m in dom.tags('meta') if OG_PROPERTY.search(m.get('property') or '')]
+    dom.with_attr('script', 'type', 'application/ld+json')
+
+
+def best_of(func, soup, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(soup)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 2, 5], help="dimensioni pagina in MB")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'MB':>5} {'elementi':>9} {'parse s':>8} {'find_all s':>11} {'indice s':>9} {'speedup':>8}")
+    for size_mb in args.sizes:
+        html = synthetic_page(int(size_mb * 1_000_000))
+        start = time.perf_counter()
+        soup = BeautifulSoup(html, 'html.parser')
+        parse_time = time.perf_counter() - start
+
+        legacy = best_of(legacy_queries, soup, args.repeat)
+        indexed = best_of(indexed_queries, soup, args.repeat)
+        elements = len(DocumentIndex(soup))
+        print(f"{size_mb:>5g} {elements:>9} {parse_time:>8.2f} {legacy:>11.3f} {indexed:>9.3f} {legacy / indexed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
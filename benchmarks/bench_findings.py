@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memoria dei risultati per pagina in un crawl di grandi dimensioni
+Confronta la lista di dizionari (come oggi) con finding_store.FindingStore,
+con e senza spostamento su SQLite, su pagine sintetiche con la stessa forma
+del report di SiteCrawler: link, asset, selettori e snippet si ripetono tra
+le pagine come su un sito reale (header, footer, template comuni).
+
+Uso: python benchmarks/bench_findings.py [--pages 20000] [--spill-mb 4]
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from finding_store import FindingStore, write_report
+
+BASE = "https://shop.example.com"
+SNIPPETS = [f'<div class="card loading skeleton-{i}">Lorem ipsum dolor sit amet {i}</div>' for i in range(40)]
+
+
+def synthetic_page(i, rng):
+    """Pagina del crawl: JSON decodificato da capo, quindi stringhe nuove anche se ripetute"""
+    links = [{"url": path, "full_url": BASE + path, "text": path.strip('/').title()}
+             for path in ('/', '/privacy', '/terms', '/cookie', '/cart')]
+    links += [{"url": f"/product/{n}", "full_url": f"{BASE}/product/{n}", "text": f"Prodotto {n}"}
+              for n in rng.sample(range(5000), 20)]
+    assets = [{"url": f"{BASE}/img/{n}.jpg", "status": 200, "size_kb": round(rng.uniform(5, 300), 2),
+               "accessible": True} for n in rng.sample(range(5000), 12)]
+    snippets = rng.sample(SNIPPETS, 4)
+    page = {
+        "url": f"{BASE}/product/{i}",
+        "depth": 2,
+        "status": 200,
+        "issues": {"critical": 0, "high": 0, "medium": rng.randint(0, 3), "low": 4},
+        "audit": {
+            "routes_and_links": {"internal_links": links, "external_links": [], "broken_links": []},
+            "missing_assets": {"css_files": [], "js_files": [], "images": assets, "other_assets": [],
+                               "total_size_kb": round(sum(a["size_kb"] for a in assets), 2)},
+            "placeholder_content": {
+                "placeholder_texts": ["Lorem ipsum dolor sit amet"],
+                "placeholder_locations": [{"text": "Lorem ipsum", "tag": "div",
+                                           "selector": f"main > div.card:nth-of-type({n})", "context": snippet}
+                                          for n, snippet in enumerate(snippets)],
+                "todo_items": [],
+                "warning_elements": snippets,
+                "selectors": ["div.card.loading", "div.skeleton"]
+            },
+            "seo_analysis": {"meta_title": {"content": f"Prodotto {i} | Shop", "length": 18},
+                             "meta_description": {"content": None, "length": 0}}
+        }
+    }
+    return json.loads(json.dumps(page))
+
+
+def measure(label, pages, collect):
+    """Picco e memoria residua (MB) di `collect` durante l'aggiunta delle pagine"""
+    rng = random.Random(42)
+    tracemalloc.start()
+    started = time.perf_counter()
+    kept = collect(synthetic_page(i, rng) for i in range(pages))
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>22} {current / 2**20:>10.1f} {peak / 2**20:>10.1f} {elapsed:>8.2f}")
+    return kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=20000)
+    parser.add_argument('--spill-mb', type=float, default=4, help="soglia di memoria per il caso con SQLite")
+    args = parser.parse_args()
+
+    def store_with(max_bytes):
+        def collect(pages):
+            store = FindingStore(max_memory_bytes=max_bytes)
+            for page in pages:
+                store.add(page)
+            return store
+        return collect
+
+    print(f"📦 {args.pages} pagine sintetiche")
+    print(f"{'':>22} {'residua MB':>10} {'picco MB':>10} {'secondi':>8}")
+    plain = measure("lista di dizionari", args.pages, list)
+    store = measure("FindingStore", args.pages, store_with(2**40))
+    spilled = measure("FindingStore + SQLite", args.pages, store_with(int(args.spill_mb * 2**20)))
+
+    # Stessi dati in uscita: il JSON scritto pagina per pagina coincide con quello di oggi
+    for candidate in (store, spilled):
+        output = io.StringIO()
+        write_report({"pages": candidate}, output)
+        assert json.loads(output.getvalue()) == {"pages": plain}
+    print(f"\n✅ Report identici; {json.dumps(spilled.stats())}")
+    store.close()
+    spilled.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
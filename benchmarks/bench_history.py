@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: storico degli audit (audit_history) su anni di run notturni
+Inserisce un run al giorno per `--days` giorni con `--urls` pagine e le
+metriche di un audit completo, misurando il tempo di inserimento man mano
+che il database cresce, poi il tempo di trend, percentili e check.
+
+Uso: python benchmarks/bench_history.py [--days 365] [--urls 2000] [--db /tmp/storico.db]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audit_history import AuditHistory
+
+DAY = 24 * 3600
+METRICS = ('total_size_kb', 'broken_links', 'broken_assets', 'headers_score', 'critical_bytes_kb',
+           'render_blocking', 'issues_critical', 'issues_high', 'issues_medium', 'issues_low')
+
+
+def nightly_samples(urls, day, rng):
+    for n in range(urls):
+        url = f"https://shop.example.com/product/{n}"
+        for name in METRICS:
+            yield url, name, rng.gauss(100 + n % 50, 5) + (day * 0.05 if name == 'total_size_kb' else 0)
+
+
+def timed(label, function):
+    started = time.perf_counter()
+    result = function()
+    print(f"{label:>32} {(time.perf_counter() - started) * 1000:>10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--urls', type=int, default=2000)
+    parser.add_argument('--db', help="database da usare (default file temporaneo)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='history-'), 'storico.db')
+    history = AuditHistory(path)
+    rng = random.Random(42)
+    start = time.time() - args.days * DAY
+    print(f"🗃️  {args.days} run × {args.urls} URL × {len(METRICS)} metriche in {path}")
+
+    checkpoints = {1, args.days // 4, args.days // 2, args.days}
+    total = 0.0
+    for day in range(1, args.days + 1):
+        started = time.perf_counter()
+        history.add_run('bench', f"run-{day}", start + day * DAY, nightly_samples(args.urls, day, rng))
+        elapsed = time.perf_counter() - started
+        total += elapsed
+        if day in checkpoints:
+            print(f"   run {day:>5}: {elapsed * 1000:>8.1f} ms  ({args.urls * len(METRICS) / elapsed:,.0f} campioni/s)")
+    print(f"   totale {total:.1f} s, {os.path.getsize(path) / 2**20:.1f} MB, {history.stats()['samples']:,} campioni\n")
+
+    since = time.time() - 90 * DAY
+    timed("serie di un URL (tutta)", lambda: history.series("https://shop.example.com/product/7", 'total_size_kb'))
+    timed("trend di una metrica (90 giorni)", lambda: history.trend('total_size_kb', since=since))
+    timed("percentili (90 giorni)", lambda: history.percentiles(since=since))
+    regressions = timed("check (90 giorni)", lambda: history.check(since=since))
+    print(f"\n✅ {len(regressions)} regressioni segnalate (attese 0: solo rumore e una crescita lenta)")
+    history.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
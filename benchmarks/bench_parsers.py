@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tempo di parsing + indicizzazione e picco di memoria per backend
+Uso: python benchmarks/bench_parsers.py [--sizes 1 5] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_parsing import available_backends, parse_document
+from synthetic import synthetic_page
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 5], help="dimensioni pagina in MB")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    backends = [name for name in ('html.parser', 'lxml', 'selectolax', 'stream') if name in available_backends()]
+    print(f"{'MB':>5} {'backend':>12} {'s':>7} {'elementi':>9} {'picco MB':>9}")
+    for size_mb in args.sizes:
+        html = synthetic_page(int(size_mb * 1_000_000))
+        for backend in backends:
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                _, dom = parse_document(html, backend)
+                timings.append(time.perf_counter() - start)
+                del dom
+
+            # Memoria misurata a parte: tracemalloc rallenta il parsing
+            tracemalloc.start()
+            _, dom = parse_document(html, backend)
+            peak = tracemalloc.get_traced_memory()[1] / 1_000_000
+            tracemalloc.stop()
+            print(f"{size_mb:>5g} {backend:>12} {min(timings):>7.2f} {len(dom):>9} {peak:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
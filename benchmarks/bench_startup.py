@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tempo di avvio di website_auditor
+Misura in processi nuovi l'import del modulo e `website_auditor.py --help`,
+verifica che requests e bs4 non vengano importati finché non servono e
+mostra i moduli più lenti secondo `python -X importtime`.
+
+Uso: python benchmarks/bench_startup.py [--repeat 10] [--top 10]
+     python benchmarks/bench_startup.py --save-baseline benchmarks/startup.json
+     python benchmarks/bench_startup.py --baseline benchmarks/startup.json   (exit 1 se regredisce)
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Moduli pesanti che l'avvio non deve caricare
+HEAVY_MODULES = ('requests', 'urllib3', 'bs4')
+# Sotto questa differenza assoluta il peggioramento è rumore
+MIN_DELTA_MS = 15
+
+SCENARIOS = {
+    "import": [sys.executable, '-c', 'import website_auditor'],
+    "help": [sys.executable, os.path.join(ROOT, 'website_auditor.py'), '--help'],
+    "interpreter": [sys.executable, '-c', 'pass'],
+}
+
+
+def time_command(cmd, repeat):
+    """Mediana e minimo in ms su `repeat` processi nuovi"""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        runs.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(runs), 2), "min_ms": round(min(runs), 2)}
+
+
+def heavy_imports():
+    """Moduli pesanti presenti in sys.modules dopo `import website_auditor`"""
+    code = ("import sys, website_auditor; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return [name for name in output.stdout.strip().split(',') if name]
+
+
+def import_profile(top=10):
+    """Moduli con il tempo cumulativo di import più alto (-X importtime)"""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import website_auditor'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    # I figli precedono il modulo che li importa: si raccolgono quelli di primo livello
+    children, entries = [], []
+    for line in output.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0:
+            if name.strip() == 'website_auditor':
+                entries = children + [(int(cumulative) / 1000, 'website_auditor')]
+            children = []
+        elif depth == 1:
+            children.append((int(cumulative) / 1000, name.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+def compare(baseline, current, tolerance=0.2):
+    regressions = []
+    for name, result in current.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        before, after = reference["median_ms"], result["median_ms"]
+        if after > before * (1 + tolerance) and after - before > MIN_DELTA_MS:
+            regressions.append(f"{name}: {before:.0f} ms -> {after:.0f} ms (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10, help="moduli mostrati da -X importtime")
+    parser.add_argument('--baseline', help="baseline JSON da confrontare (exit 1 se ci sono regressioni)")
+    parser.add_argument('--save-baseline', metavar='FILE', help="salva i risultati come nuova baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="peggioramento ammesso (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = {}
+    for name, cmd in SCENARIOS.items():
+        print(f"⏱️  {name}...", flush=True)
+        results[name] = time_command(cmd, args.repeat)
+
+    base = results["interpreter"]["median_ms"]
+    print(f"{'scenario':>12} {'mediana ms':>11} {'min ms':>8} {'oltre python':>13}")
+    for name, result in results.items():
+        print(f"{name:>12} {result['median_ms']:>11.1f} {result['min_ms']:>8.1f} {result['median_ms'] - base:>13.1f}")
+
+    print("\n📦 Import più lenti (ms cumulativi):")
+    for ms, name in import_profile(args.top):
+        print(f"{ms:>9.1f}  {name}")
+
+    heavy = heavy_imports()
+    if heavy:
+        print(f"\n⚠️  Importati all'avvio: {', '.join(heavy)}")
+    else:
+        print(f"\n✅ Nessun modulo pesante all'avvio ({', '.join(HEAVY_MODULES)})")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "scenarios": results}, f, indent=2)
+        print(f"💾 Baseline salvata in {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)["scenarios"]
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions:
+            print("\n❌ Regressioni rispetto alla baseline:")
+            for line in regressions:
+                print(f"   - {line}")
+            return 1
+        print("\n✅ Nessuna regressione rispetto alla baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
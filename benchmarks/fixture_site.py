@@ -0,0 +1,178 @@
+"""
+Sito sintetico servito in locale per i benchmark dell'auditor
+La pagina principale contiene N link, M asset, script inline enormi e un DOM
+profondo a piacere. Link e asset possono puntare a host "lenti" (risposte
+ritardate) o "guasti" (500 oppure porta chiusa): ogni host è un server
+separato su una porta diversa, quindi l'auditor lo vede come un host distinto.
+"""
+
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from synthetic import product_card
+
+
+class SiteSpec:
+    def __init__(self, links=50, assets=20, slow_links=0, slow_assets=0, failing_links=0,
+                 refused_links=0, slow_delay=0.2, inline_scripts=0, script_kb=0,
+                 dom_depth=0, cards=0, seed=42):
+        self.links = links
+        self.assets = assets
+        self.slow_links = slow_links
+        self.slow_assets = slow_assets
+        self.failing_links = failing_links
+        self.refused_links = refused_links
+        self.slow_delay = slow_delay
+        self.inline_scripts = inline_scripts
+        self.script_kb = script_kb
+        self.dom_depth = dom_depth
+        self.cards = cards
+        self.seed = seed
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, with_body):
+        site = self.server.site
+        site.count_request()
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        path = self.path.split('?', 1)[0]
+        if self.server.failing:
+            status, body, content_type = 500, b'errore', 'text/plain'
+        elif path == '/':
+            status, body, content_type = 200, site.page, 'text/html; charset=utf-8'
+        elif path.endswith('.css'):
+            status, body, content_type = 200, b'body{margin:0}' * 64, 'text/css'
+        elif path.endswith('.js'):
+            status, body, content_type = 200, b'console.log("bundle");' * 256, 'application/javascript'
+        elif path.endswith('.png'):
+            status, body, content_type = 200, b'\x89PNG' + b'0' * 4096, 'image/png'
+        elif path.startswith('/missing'):
+            status, body, content_type = 404, b'not found', 'text/html'
+        else:
+            status, body, content_type = 200, b'<html><body>ok</body></html>', 'text/html'
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if with_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply(True)
+
+    def do_HEAD(self):
+        self._reply(False)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self._reply(True)
+
+    def log_message(self, *args):
+        pass
+
+
+def _closed_port():
+    """Porta locale su cui nessuno ascolta: le connessioni vengono rifiutate subito"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class FixtureSite:
+    """Avvia host principale, host lento e host guasto; usare come context manager"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._servers = []
+        self.base_url = self._start()
+        self.slow_url = self._start(delay=spec.slow_delay)
+        self.failing_url = self._start(failing=True)
+        self.refused_url = f"http://127.0.0.1:{_closed_port()}/"
+        self.page = self.build_page().encode('utf-8')
+
+    def _start(self, delay=0, failing=False):
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        httpd.daemon_threads = True
+        httpd.site = self
+        httpd.delay = delay
+        httpd.failing = failing
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        self._servers.append(httpd)
+        return f"http://127.0.0.1:{httpd.server_address[1]}/"
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def build_page(self):
+        spec = self.spec
+        rng = random.Random(spec.seed)
+        parts = ['<!DOCTYPE html><html lang="it"><head><title>Benchmark</title>',
+                 '<meta name="description" content="Sito sintetico per benchmark">']
+
+        # Asset: css, js e immagini a rotazione, i primi `slow_assets` sull'host lento
+        body_assets = []
+        for i in range(spec.assets):
+            host = self.slow_url if i < spec.slow_assets else self.base_url
+            kind = i % 3
+            if kind == 0:
+                parts.append(f'<link rel="stylesheet" href="{host}static/{i}.css">')
+            elif kind == 1:
+                parts.append(f'<script src="{host}static/{i}.js"></script>')
+            else:
+                body_assets.append(f'<img src="{host}static/{i}.png" alt="img {i}">')
+
+        filler = 'var data = "' + 'x' * 1000 + '"; console.log(data);\n'
+        for i in range(spec.inline_scripts):
+            repeat = max(1, spec.script_kb * 1024 // len(filler))
+            parts.append(f'<script>var token_{i} = "abc";\n{filler * repeat}</script>')
+        parts.append('</head><body><nav>')
+
+        # Link: prima quelli verso host lenti/guasti, così rientrano nei 20 sondati
+        links = []
+        links += [f'{self.slow_url}page/{i}' for i in range(spec.slow_links)]
+        links += [f'{self.failing_url}page/{i}' for i in range(spec.failing_links)]
+        links += [f'{self.refused_url}page/{i}' for i in range(spec.refused_links)]
+        for i in range(spec.links - len(links)):
+            links.append(f'/missing/{i}' if i % 10 == 9 else f'/page/{i}')
+        parts.extend(f'<a href="{href}">Link {i}</a>' for i, href in enumerate(links))
+        parts.append('<a href="/privacy">Privacy</a></nav><main>')
+
+        parts.extend(body_assets)
+        parts.extend(product_card(i, rng) for i in range(spec.cards))
+        parts.append('<div class="deep">' * spec.dom_depth)
+        parts.append('<span class="loading">Caricamento...</span>')
+        parts.append('</div>' * spec.dom_depth)
+        parts.append('</main></body></html>')
+        return ''.join(parts)
+
+    def close(self):
+        for httpd in self._servers:
+            httpd.shutdown()
+            httpd.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Scenari del benchmark: nome -> parametri del sito
+SCENARIOS = {
+    'small': SiteSpec(links=50, assets=20, cards=50),
+    'many_assets': SiteSpec(links=200, assets=300, cards=200),
+    'slow_hosts': SiteSpec(links=40, assets=30, slow_links=10, slow_assets=10, slow_delay=0.2),
+    'failing_hosts': SiteSpec(links=40, assets=10, failing_links=8, refused_links=8),
+    'huge_scripts': SiteSpec(links=20, assets=5, inline_scripts=4, script_kb=1024),
+    'deep_dom': SiteSpec(links=20, assets=5, dom_depth=400, cards=500),
+}
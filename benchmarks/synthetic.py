@@ -0,0 +1,48 @@
+"""
+Generatore di pagine HTML sintetiche per i benchmark
+Simula un listing e-commerce: card prodotto con link, immagini, bottoni e
+classi ripetute, più script inline.
+"""
+
+import random
+
+
+def product_card(i, rng):
+    classes = rng.choice(['card', 'card featured', 'card loading', 'card sale'])
+    return (
+        f'<div class="{classes}" id="product-{i}">'
+        f'<a href="/product/{i}"><img src="/img/{i}.jpg" alt="Prodotto {i}" width="300" height="300"></a>'
+        f'<h2 class="title">Prodotto {i}</h2>'
+        f'<p class="description">Descrizione del prodotto {i} con dettagli e caratteristiche.</p>'
+        f'<span class="price">{rng.randint(5, 500)},99 €</span>'
+        f'<button class="btn add-to-cart" data-id="{i}">Aggiungi</button>'
+        f'<a href="#reviews-{i}">Recensioni</a>'
+        f'</div>'
+    )
+
+
+def synthetic_page(target_bytes=2_000_000, seed=42):
+    """Restituisce una pagina HTML di circa `target_bytes` byte"""
+    rng = random.Random(seed)
+    head = (
+        '<!DOCTYPE html><html lang="it"><head><title>Catalogo</title>'
+        '<meta name="description" content="Catalogo prodotti">'
+        '<meta property="og:title" content="Catalogo">'
+        '<link rel="stylesheet" href="/css/main.css">'
+        '<script src="/js/app.js"></script>'
+        '<script>console.log("init"); try { boot(); } catch (e) { report(e); }</script>'
+        '</head><body><header><a href="/">Home</a><a href="/privacy">Privacy</a></header>'
+        '<main class="grid">'
+    )
+    tail = '</main><footer><a href="/terms">Termini e condizioni</a><a href="/cookie">Cookie</a></footer></body></html>'
+
+    parts = [head]
+    size = len(head) + len(tail)
+    i = 0
+    while size < target_bytes:
+        card = product_card(i, rng)
+        parts.append(card)
+        size += len(card)
+        i += 1
+    parts.append(tail)
+    return ''.join(parts)
@@ -0,0 +1,82 @@
+"""
+Fixture condivise per i test Python: un piccolo server HTTP locale
+che risponde secondo una tabella di route.
+"""
+
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class RouteHandler(BaseHTTPRequestHandler):
+    """Risponde con (status, body, content_type[, header aggiuntivi]) dalla tabella server.routes"""
+
+    def _reply(self, with_body):
+        self.server.hits.append((self.command, self.path))
+        delay = self.server.delays.get(self.path)
+        if delay:
+            time.sleep(delay)
+        status, body, content_type, *extra = self.server.routes.get(
+            self.path, (404, 'not found', 'text/html'))
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        if self.server.etags and status == 200:
+            etag = '"%s"' % hashlib.md5(data).hexdigest()
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (extra[0] if extra else {}).items():
+            self.send_header(name, value)
+        if self.server.etags and status == 200:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        if with_body:
+            self.wfile.write(data)
+
+    def do_GET(self):
+        self._reply(True)
+
+    def do_HEAD(self):
+        self._reply(False)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self._reply(True)
+
+    def log_message(self, *args):
+        pass
+
+
+class KeepAliveRouteHandler(RouteHandler):
+    """Come RouteHandler ma con connessioni persistenti (HTTP/1.1)"""
+    protocol_version = 'HTTP/1.1'
+
+
+@pytest.fixture
+def http_site():
+    """Avvia un server locale; restituisce una funzione (routes, delays) -> base URL"""
+    servers = []
+
+    def start(routes, delays=None, etags=False, keep_alive=False):
+        handler = KeepAliveRouteHandler if keep_alive else RouteHandler
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        httpd.routes = routes
+        httpd.delays = delays or {}
+        httpd.etags = etags
+        httpd.hits = []
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        httpd.base_url = f"http://127.0.0.1:{httpd.server_address[1]}/"
+        return httpd
+
+    yield start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
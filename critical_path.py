@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Catena delle richieste critiche, ricostruita staticamente dal DOM
+Sono critiche le risorse che bloccano il primo rendering: script esterni
+nell'<head> senza async/defer e fogli di stile senza un media non applicabile,
+più i CSS che questi importano con @import. I preload anticipano la scoperta
+di una risorsa, i preconnect la connessione al suo host. Byte e round trip
+sono stime: slow start TCP con finestra iniziale di 10 segmenti, nessuna perdita.
+"""
+
+import math
+import re
+from urllib.parse import urljoin, urlparse
+
+# Profondità massima di @import seguiti a partire da un foglio di stile della pagina
+MAX_IMPORT_DEPTH = 3
+# Finestra iniziale di congestione TCP (10 segmenti da 1460 byte)
+INITIAL_WINDOW_BYTES = 14600
+# Oltre questa dimensione una risorsa bloccante va anche ridotta o divisa
+LARGE_BLOCKING_KB = 50
+
+# Media che non si applicano allo schermo: il foglio di stile non blocca il rendering
+NON_BLOCKING_MEDIA = {'print', 'speech'}
+JS_TYPES = {'', 'text/javascript', 'application/javascript', 'application/ecmascript', 'text/ecmascript'}
+
+_import_re = re.compile(r'@import\s+(?:url\(\s*)?["\']?([^"\')\s;]+)["\']?\s*\)?([^;]*);', re.I)
+_comment_re = re.compile(r'/\*.*?\*/', re.S)
+
+SUGGESTIONS = {
+    'script': 'Aggiungere defer (o async se lo script non dipende dal DOM) oppure spostarlo in fondo al <body>',
+    'stylesheet': 'Inserire inline il CSS critico e caricare il resto in modo asincrono '
+                  '(rel="preload" as="style" oppure media="print" con onload)',
+    'import': 'Sostituire @import con un <link rel="stylesheet"> o includerlo nel bundle: ogni livello aggiunge un round trip',
+    'large': 'Ridurre la risorsa (minificazione, rimozione del codice inutilizzato, suddivisione)',
+    'preconnect': 'Aggiungere <link rel="preconnect" href="{origin}"> per aprire prima la connessione',
+}
+
+
+def _values(element, attr):
+    value = element.get(attr)
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [v.lower() for v in value]
+    return value.lower().split()
+
+
+def _in_head(element):
+    # Senza <head> esplicito vale tutto ciò che non è nel <body>
+    return element.find_parent('head') is not None or element.find_parent('body') is None
+
+
+def origin(url):
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc.lower()}"
+
+
+def find_critical_resources(dom, base_url):
+    """
+    Risorse bloccanti dichiarate nella pagina, in ordine di documento, più gli
+    hint: restituisce (risorse, url con preload, origini con preconnect).
+    """
+    resources, preload, preconnect = [], set(), set()
+    for element in dom.tags('link', 'script'):
+        if element.name == 'link':
+            rel = _values(element, 'rel')
+            href = element.get('href')
+            if not href:
+                continue
+            url = urljoin(base_url, href)
+            if 'preload' in rel or 'modulepreload' in rel:
+                preload.add(url)
+            if 'preconnect' in rel:
+                preconnect.add(origin(url))
+            if 'stylesheet' not in rel or 'alternate' in rel or element.get('disabled') is not None:
+                continue
+            media = (element.get('media') or 'all').strip().lower()
+            if media in NON_BLOCKING_MEDIA or not _in_head(element):
+                continue
+            resources.append({"url": url, "type": "stylesheet", "reason": "stylesheet senza media non applicabile"})
+        else:
+            src = element.get('src')
+            script_type = (element.get('type') or '').strip().lower()
+            if not src or script_type not in JS_TYPES or not _in_head(element):
+                continue
+            if element.get('async') is not None or element.get('defer') is not None:
+                continue
+            resources.append({"url": urljoin(base_url, src), "type": "script",
+                              "reason": "script nell'<head> senza async/defer"})
+    return resources, preload, preconnect
+
+
+def css_imports(css_text, base_url):
+    """URL importati con @import (esclusi quelli con media non applicabili)"""
+    imports = []
+    for href, media in _import_re.findall(_comment_re.sub('', css_text)):
+        media = media.strip().lower()
+        if media and all(m.strip() in NON_BLOCKING_MEDIA for m in media.split(',')):
+            continue
+        imports.append(urljoin(base_url, href))
+    return imports
+
+
+def transfer_round_trips(size_bytes):
+    """Round trip per ricevere `size_bytes` con slow start (la finestra raddoppia a ogni giro)"""
+    if not size_bytes:
+        return 1
+    return max(1, math.ceil(math.log2(size_bytes / INITIAL_WINDOW_BYTES + 1)))
+
+
+def connection_round_trips(url):
+    """Apertura di una nuova connessione: TCP, più TLS per https"""
+    return 2 if urlparse(url).scheme == 'https' else 1
+
+
+def build_chain(resources, fetch_css, sizes, preload):
+    """
+    Nodi della catena: le risorse della pagina a profondità 1, gli @import
+    a profondità crescente (1 se l'import ha un preload). `fetch_css(url)`
+    restituisce (testo, byte) di un foglio di stile; `sizes` i byte già noti.
+    """
+    nodes, seen = [], set()
+    level = [(resource, 1, None) for resource in resources]
+    while level:
+        next_level = []
+        for resource, depth, parent in level:
+            url = resource["url"]
+            if url in seen:
+                continue
+            seen.add(url)
+            node = dict(resource, depth=1 if url in preload else depth, parent=parent,
+                        preloaded=url in preload, size_bytes=sizes.get(url))
+            nodes.append(node)
+            if resource["type"] == "script" or depth > MAX_IMPORT_DEPTH:
+                continue
+            try:
+                text, size = fetch_css(url)
+            except Exception as e:
+                node["error"] = str(e)
+                continue
+            if node["size_bytes"] is None:
+                node["size_bytes"] = size
+            for imported in css_imports(text, url):
+                next_level.append(({"url": imported, "type": "stylesheet", "reason": "@import in un foglio di stile bloccante"},
+                                   depth + 1, url))
+        level = next_level
+    return nodes
+
+
+def analyze_chain(page_url, page_bytes, nodes, preconnect):
+    """Byte e round trip stimati del percorso critico e suggerimenti per ogni risorsa bloccante"""
+    connected = {origin(page_url)}
+    round_trips = connection_round_trips(page_url) + transfer_round_trips(page_bytes)
+    depth = max((node["depth"] for node in nodes), default=0)
+    for current in range(1, depth + 1):
+        # Le risorse dello stesso livello si scaricano in parallelo: conta la più lenta
+        level = [node for node in nodes if node["depth"] == current]
+        slowest = 0
+        for node in level:
+            host = origin(node["url"])
+            setup = 0
+            if host not in connected and host not in preconnect:
+                setup = connection_round_trips(node["url"])
+            slowest = max(slowest, setup + transfer_round_trips(node["size_bytes"]))
+        connected.update(origin(node["url"]) for node in level)
+        round_trips += slowest
+
+    blocking = []
+    for node in nodes:
+        size_kb = round((node["size_bytes"] or 0) / 1024, 2)
+        suggestions = [SUGGESTIONS['import'] if node["parent"] else SUGGESTIONS[node["type"]]]
+        if size_kb > LARGE_BLOCKING_KB:
+            suggestions.append(SUGGESTIONS['large'])
+        host = origin(node["url"])
+        if host != origin(page_url) and host not in preconnect:
+            suggestions.append(SUGGESTIONS['preconnect'].format(origin=host))
+        entry = {"url": node["url"], "type": node["type"], "depth": node["depth"], "parent": node["parent"],
+                 "size_kb": size_kb, "preloaded": node["preloaded"], "reason": node["reason"],
+                 "suggestions": suggestions}
+        if "error" in node:
+            entry["error"] = node["error"]
+        blocking.append(entry)
+
+    critical_bytes = (page_bytes or 0) + sum(node["size_bytes"] or 0 for node in nodes)
+    return {
+        "render_blocking": blocking,
+        "critical_requests": len(nodes) + 1,
+        "chain_depth": depth,
+        "critical_bytes_kb": round(critical_bytes / 1024, 2),
+        "estimated_round_trips": round_trips,
+        "preconnect": sorted(preconnect)
+    }
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Indice del documento HTML costruito con un'unica visita dell'albero
+Raggruppa gli elementi per tag, id e classe, così le sezioni di audit non
+devono ripetere soup.find_all sull'intero documento.
+"""
+
+from collections import defaultdict
+
+
+def attr_contains(element, attr, value):
+    """Confronto come BeautifulSoup: per attributi multi-valore (rel, class) basta un valore"""
+    current = element.get(attr)
+    if current is None:
+        return False
+    if isinstance(current, list):
+        return value in current or ' '.join(current) == value
+    return current == value
+
+
+class DocumentIndex:
+    def __init__(self, soup, elements=None, ids=None):
+        """
+        `elements` permette ai backend senza albero bs4 di fornire direttamente
+        gli elementi in ordine di documento; `ids` gli id di tutto il documento
+        quando gli elementi sono solo una parte (backend stream).
+        """
+        self.soup = soup
+        self.by_tag = defaultdict(list)
+        self.by_id = {}
+        self.by_class = defaultdict(list)
+        self.scripts = []
+        self._position = {}
+        self._extra_ids = ids
+
+        if elements is None:
+            from bs4 import Tag
+            elements = (element for element in soup.descendants if isinstance(element, Tag))
+
+        # Unica visita in ordine di documento
+        for element in elements:
+            self._position[id(element)] = len(self._position)
+            self.by_tag[element.name].append(element)
+
+            element_id = element.get('id')
+            if element_id:
+                self.by_id.setdefault(element_id, element)
+
+            for class_name in element.get('class') or ():
+                self.by_class[class_name].append(element)
+
+            if element.name == 'script' and element.string:
+                self.scripts.append(element)
+
+    def __len__(self):
+        return len(self._position)
+
+    @property
+    def ids(self):
+        if self._extra_ids is not None:
+            return self._extra_ids
+        return self.by_id.keys()
+
+    def _in_order(self, elements):
+        return sorted(elements, key=lambda element: self._position[id(element)])
+
+    def tags(self, *names):
+        """Elementi con uno dei tag indicati, in ordine di documento"""
+        if len(names) == 1:
+            return self.by_tag.get(names[0], [])
+        return self._in_order(element for name in names for element in self.by_tag.get(name, []))
+
+    def first(self, name):
+        elements = self.by_tag.get(name)
+        return elements[0] if elements else None
+
+    def with_attr(self, name, attr, value=None):
+        """Elementi del tag con l'attributo presente (o uguale a `value`)"""
+        if value is None:
+            return [element for element in self.tags(name) if element.get(attr) is not None]
+        return [element for element in self.tags(name) if attr_contains(element, attr, value)]
+
+    def with_class_matching(self, pattern):
+        """Elementi con almeno una classe che soddisfa la regex compilata"""
+        matched = {}
+        for class_name, elements in self.by_class.items():
+            if pattern.search(class_name):
+                for element in elements:
+                    matched[id(element)] = element
+        return self._in_order(matched.values())
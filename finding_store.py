@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Archivio compatto dei risultati per pagina (crawl di grandi siti)
+Ogni pagina viene codificata in un array di interi a 64 bit: stringhe (URL,
+selettori, snippet HTML, testi) e insiemi di chiavi dei dizionari (come id
+di stringa) finiscono in tabelle condivise e compaiono una sola volta per
+tutto il crawl. Oltre una soglia di memoria le tabelle di stringhe e forme e
+gli array delle pagine vengono spostati in un file SQLite (con una LRU per le
+voci più usate);
+to_json/iterazione ricostruiscono i dizionari con la stessa forma di oggi,
+una pagina alla volta.
+"""
+
+import json
+import os
+import sqlite3
+import struct
+import tempfile
+from array import array
+from collections import OrderedDict
+
+# Token: 3 bit di tipo, il resto è il valore (intero, indice o lunghezza)
+_NONE, _FALSE, _TRUE, _INT, _NUMBER, _STR, _LIST, _DICT = range(8)
+_TAG_BITS = 3
+_TAG_MASK = (1 << _TAG_BITS) - 1
+# Interi che entrano nel token senza passare dalla tabella dei numeri
+_MAX_INLINE = (1 << (63 - _TAG_BITS)) - 1
+# Stima dell'ingombro di una stringa nella tabella (oggetto str + voce del dizionario)
+_STRING_OVERHEAD = 120
+# Stima dell'ingombro di una forma (tupla + voce del dizionario) e di ogni sua chiave
+_SHAPE_OVERHEAD = 120
+_SHAPE_KEY_BYTES = 40
+# Stringhe e forme tenute in memoria (LRU) dopo che le tabelle sono passate su SQLite
+STRING_CACHE_SIZE = 20000
+_DOUBLE = struct.Struct('<d')
+_INT64 = struct.Struct('<q')
+
+
+class PageRecord:
+    """Pagina codificata: array di token in memoria, oppure solo l'id della riga SQLite"""
+    __slots__ = ('index', 'tokens')
+
+    def __init__(self, index, tokens):
+        self.index = index
+        self.tokens = tokens
+
+
+class FindingStore:
+    def __init__(self, max_memory_bytes=256 * 1024 * 1024, spill_path=None, string_cache_size=STRING_CACHE_SIZE):
+        self.max_memory_bytes = max_memory_bytes
+        self.spill_path = spill_path
+        self.string_cache_size = string_cache_size
+        self.records = []
+        # Tabella delle stringhe in memoria finché non c'è il primo spill, poi SQLite con una LRU davanti
+        self.strings, self._string_ids = [], {}
+        self._string_count = 0
+        self._ids_lru, self._values_lru = OrderedDict(), OrderedDict()
+        # Forme dei dizionari: tuple di id di stringa delle chiavi, gestite come le stringhe
+        self.shapes, self._shape_ids = [], {}
+        self._shape_count = 0
+        self._shape_ids_lru, self._shapes_lru = OrderedDict(), OrderedDict()
+        # Solo interi oltre i 60 bit: i float stanno nel token successivo
+        self.numbers, self._number_ids = [], {}
+        self.string_bytes = 0
+        self.shape_bytes = 0
+        self.token_bytes = 0
+        self.spilled = 0
+        self.spills = 0
+        # Le pagine prima di questo indice sono già su SQLite
+        self._first_unspilled = 0
+        self._db = None
+        self._temporary = False
+
+    # Tabelle condivise
+
+    def _lru_put(self, lru, key, value):
+        lru[key] = value
+        if len(lru) > self.string_cache_size:
+            lru.popitem(last=False)
+
+    def _string(self, value):
+        if self._db is None:
+            index = self._string_ids.get(value)
+            if index is None:
+                index = self._string_ids[value] = self._string_count
+                self._string_count += 1
+                self.strings.append(value)
+                self.string_bytes += len(value) + _STRING_OVERHEAD
+            return index
+        index = self._ids_lru.get(value)
+        if index is not None:
+            self._ids_lru.move_to_end(value)
+            return index
+        row = self._db.execute("SELECT id FROM strings WHERE value = ?", (value,)).fetchone()
+        if row is None:
+            index = self._string_count
+            self._string_count += 1
+            self._db.execute("INSERT INTO strings VALUES (?, ?)", (index, value))
+        else:
+            index = row[0]
+        self._lru_put(self._ids_lru, value, index)
+        return index
+
+    def _string_value(self, index):
+        if self._db is None:
+            return self.strings[index]
+        value = self._values_lru.get(index)
+        if value is None:
+            value = self._db.execute("SELECT value FROM strings WHERE id = ?", (index,)).fetchone()[0]
+            self._lru_put(self._values_lru, index, value)
+        else:
+            self._values_lru.move_to_end(index)
+        return value
+
+    def _shape(self, keys):
+        keys = tuple(self._string(key) for key in keys)
+        if self._db is None:
+            index = self._shape_ids.get(keys)
+            if index is None:
+                index = self._shape_ids[keys] = self._shape_count
+                self._shape_count += 1
+                self.shapes.append(keys)
+                self.shape_bytes += _SHAPE_OVERHEAD + _SHAPE_KEY_BYTES * len(keys)
+            return index
+        index = self._shape_ids_lru.get(keys)
+        if index is not None:
+            self._shape_ids_lru.move_to_end(keys)
+            return index
+        blob = array('q', keys).tobytes()
+        row = self._db.execute("SELECT id FROM shapes WHERE keys = ?", (blob,)).fetchone()
+        if row is None:
+            index = self._shape_count
+            self._shape_count += 1
+            self._db.execute("INSERT INTO shapes VALUES (?, ?)", (index, blob))
+        else:
+            index = row[0]
+        self._lru_put(self._shape_ids_lru, keys, index)
+        return index
+
+    def _shape_keys(self, index):
+        """Chiavi (stringhe) della forma `index`"""
+        if self._db is None:
+            keys = self.shapes[index]
+        else:
+            keys = self._shapes_lru.get(index)
+            if keys is None:
+                blob = self._db.execute("SELECT keys FROM shapes WHERE id = ?", (index,)).fetchone()[0]
+                keys = array('q')
+                keys.frombytes(blob)
+                keys = tuple(keys)
+                self._lru_put(self._shapes_lru, index, keys)
+            else:
+                self._shapes_lru.move_to_end(index)
+        return [self._string_value(key) for key in keys]
+
+    def _number(self, value):
+        index = self._number_ids.get(value)
+        if index is None:
+            index = self._number_ids[value] = len(self.numbers)
+            self.numbers.append(value)
+        return index
+
+    # Codifica
+
+    def encode(self, value, tokens=None):
+        """Aggiunge a `tokens` (array 'q') la codifica di un valore JSON"""
+        tokens = array('q') if tokens is None else tokens
+        stack = [value]
+        while stack:
+            value = stack.pop()
+            if value is None:
+                tokens.append(_NONE)
+            elif value is True:
+                tokens.append(_TRUE)
+            elif value is False:
+                tokens.append(_FALSE)
+            elif isinstance(value, str):
+                tokens.append(self._string(value) << _TAG_BITS | _STR)
+            elif isinstance(value, int) and -_MAX_INLINE <= value <= _MAX_INLINE:
+                tokens.append(value << _TAG_BITS | _INT)
+            elif isinstance(value, int):
+                # Payload 1+: indice nella tabella dei numeri grandi
+                tokens.append(self._number(value) + 1 << _TAG_BITS | _NUMBER)
+            elif isinstance(value, float):
+                # Payload 0: i bit del double sono nel token successivo
+                tokens.append(_NUMBER)
+                tokens.append(_INT64.unpack(_DOUBLE.pack(value))[0])
+            elif isinstance(value, dict):
+                tokens.append(self._shape(value) << _TAG_BITS | _DICT)
+                stack.extend(reversed(list(value.values())))
+            elif isinstance(value, (list, tuple)):
+                tokens.append(len(value) << _TAG_BITS | _LIST)
+                stack.extend(reversed(value))
+            else:
+                raise TypeError(f"Valore non serializzabile in JSON: {type(value).__name__}")
+        return tokens
+
+    def decode(self, tokens):
+        """Ricostruisce il valore JSON codificato in `tokens`"""
+        position = 0
+
+        def read():
+            nonlocal position
+            token = tokens[position]
+            position += 1
+            tag, payload = token & _TAG_MASK, token >> _TAG_BITS
+            if tag == _STR:
+                return self._string_value(payload)
+            if tag == _INT:
+                return payload
+            if tag == _DICT:
+                return {key: read() for key in self._shape_keys(payload)}
+            if tag == _LIST:
+                return [read() for _ in range(payload)]
+            if tag == _NUMBER:
+                if payload:
+                    return self.numbers[payload - 1]
+                position += 1
+                return _DOUBLE.unpack(_INT64.pack(tokens[position - 1]))[0]
+            return (None, False, True)[tag]
+
+        return read()
+
+    # Pagine
+
+    def add(self, page):
+        """Archivia una pagina (dizionario del report) e restituisce il suo indice"""
+        tokens = self.encode(page)
+        record = PageRecord(len(self.records), tokens)
+        self.records.append(record)
+        self.token_bytes += tokens.itemsize * len(tokens)
+        if self.memory_bytes() > self.max_memory_bytes:
+            self.spill()
+        return record.index
+
+    def memory_bytes(self):
+        """
+        Stima della memoria occupata da tabelle di stringhe e forme e pagine
+        non ancora spostate su disco; dopo il primo spill le tabelle stanno su
+        SQLite e in memoria restano solo le LRU, di dimensione fissa.
+        """
+        return self.string_bytes + self.shape_bytes + self.token_bytes
+
+    def _connect(self):
+        if self._db is None:
+            if self.spill_path is None:
+                handle, self.spill_path = tempfile.mkstemp(prefix='findings-', suffix='.db')
+                os.close(handle)
+                self._temporary = True
+            db = sqlite3.connect(self.spill_path)
+            db.execute("PRAGMA journal_mode=OFF")
+            db.execute("PRAGMA synchronous=OFF")
+            db.execute("DROP TABLE IF EXISTS pages")
+            db.execute("DROP TABLE IF EXISTS strings")
+            db.execute("DROP TABLE IF EXISTS shapes")
+            db.execute("CREATE TABLE pages (id INTEGER PRIMARY KEY, tokens BLOB NOT NULL)")
+            db.execute("CREATE TABLE strings (id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE)")
+            db.execute("CREATE TABLE shapes (id INTEGER PRIMARY KEY, keys BLOB NOT NULL UNIQUE)")
+            db.executemany("INSERT INTO strings VALUES (?, ?)", enumerate(self.strings))
+            db.executemany("INSERT INTO shapes VALUES (?, ?)",
+                           ((index, array('q', keys).tobytes()) for index, keys in enumerate(self.shapes)))
+            self.strings, self._string_ids = [], {}
+            self.shapes, self._shape_ids = [], {}
+            self.string_bytes = self.shape_bytes = 0
+            self._db = db
+        return self._db
+
+    def spill(self):
+        """Sposta su SQLite le pagine ancora in memoria e, la prima volta, le tabelle di stringhe e forme"""
+        db = self._connect()
+        pending = self.records[self._first_unspilled:]
+        db.executemany("INSERT INTO pages VALUES (?, ?)",
+                       ((record.index, record.tokens.tobytes()) for record in pending))
+        db.commit()
+        for record in pending:
+            self.token_bytes -= record.tokens.itemsize * len(record.tokens)
+            record.tokens = None
+        self._first_unspilled = len(self.records)
+        self.spilled += len(pending)
+        self.spills += 1
+
+    def _tokens(self, record):
+        if record.tokens is not None:
+            return record.tokens
+        blob = self._db.execute("SELECT tokens FROM pages WHERE id = ?", (record.index,)).fetchone()[0]
+        tokens = array('q')
+        tokens.frombytes(blob)
+        return tokens
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.decode(self._tokens(self.records[index]))
+
+    def __iter__(self):
+        for record in self.records:
+            yield self.decode(self._tokens(record))
+
+    def stats(self):
+        return {
+            "pages": len(self.records),
+            "spilled_pages": self.spilled,
+            "spills": self.spills,
+            "unique_strings": self._string_count,
+            "shapes": self._shape_count,
+            "memory_bytes": self.memory_bytes()
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+            if self._temporary:
+                os.remove(self.spill_path)
+
+
+def write_report(report, f, indent=2):
+    """
+    Come json.dump(report, f, indent=2), ma le pagine di un FindingStore
+    vengono decodificate e scritte una alla volta.
+    """
+    pad = ' ' * indent
+    f.write('{')
+    for position, (key, value) in enumerate(report.items()):
+        f.write(',' if position else '')
+        f.write(f'\n{pad}{json.dumps(key)}: ')
+        if isinstance(value, FindingStore):
+            if not len(value):
+                f.write('[]')
+                continue
+            f.write('[')
+            for index, page in enumerate(value):
+                f.write(',' if index else '')
+                encoded = json.dumps(page, indent=indent, ensure_ascii=False)
+                f.write('\n' + pad * 2 + encoded.replace('\n', '\n' + pad * 2))
+            f.write(f'\n{pad}]')
+        else:
+            encoded = json.dumps(value, indent=indent, ensure_ascii=False)
+            f.write(encoded.replace('\n', '\n' + pad))
+    f.write('\n}' if report else '}')
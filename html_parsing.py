@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Backend di parsing HTML per WebsiteAuditor
+- html.parser / lxml: alberi BeautifulSoup
+- selectolax: parser lexbor in C, convertito in elementi leggeri
+- stream: estrazione SAX con html.parser della libreria standard, conserva
+  solo gli elementi che servono alle sezioni di audit (mai l'albero intero)
+
+Gli elementi leggeri espongono il sottoinsieme dell'API di bs4 usato dalle
+sezioni (get, get_text, string, find_parent, find_all, str()) con la stessa
+serializzazione di BeautifulSoup, così i report restano identici.
+"""
+
+import importlib.util
+import re
+from html.parser import HTMLParser
+
+
+from dom_index import DocumentIndex
+
+
+BACKENDS = ('auto', 'html.parser', 'lxml', 'selectolax', 'stream')
+
+# Elementi senza contenuto (serializzati come <br/>, come fa bs4)
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+    'menuitem', 'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound',
+    'command', 'frame', 'image', 'isindex', 'nextid', 'spacer'
+}
+
+# Tag il cui testo non compare in get_text() degli antenati (string containers di bs4)
+STRING_CONTAINERS = {'script', 'style', 'template', 'rt', 'rp'}
+RAW_TEXT_ELEMENTS = {'script', 'style'}
+
+# Attributi multi-valore, divisi sugli spazi come fa bs4
+MULTI_VALUED_ATTRIBUTES = {
+    '*': {'class', 'accesskey', 'dropzone'},
+    'a': {'rel', 'rev'},
+    'link': {'rel', 'rev'},
+    'td': {'headers'},
+    'th': {'headers'},
+    'form': {'accept-charset'},
+    'object': {'archive'},
+    'area': {'rel'},
+    'icon': {'sizes'},
+    'iframe': {'sandbox'},
+    'output': {'for'},
+}
+
+# Elementi conservati dal backend stream: tutto ciò che le sezioni leggono
+STREAM_CAPTURE_TAGS = {'a', 'button', 'input', 'form', 'link', 'script', 'img', 'title', 'meta', 'h1'}
+
+_whitespace_re = re.compile(r'\S+')
+
+
+def _module_available(name):
+    # Solo la ricerca del modulo: importare lxml o selectolax qui rallenterebbe l'avvio
+    return importlib.util.find_spec(name) is not None
+
+
+def available_backends():
+    """Backend utilizzabili nell'ambiente corrente"""
+    backends = ['html.parser', 'stream']
+    if _module_available('lxml'):
+        backends.append('lxml')
+    if _module_available('selectolax'):
+        backends.append('selectolax')
+    return backends
+
+
+def resolve_backend(name):
+    """Risolve 'auto' e ripiega su html.parser se il backend richiesto non è installato"""
+    name = name or 'html.parser'
+    if name not in BACKENDS:
+        raise ValueError(f"Parser sconosciuto: {name} (disponibili: {', '.join(BACKENDS)})")
+
+    available = available_backends()
+    if name == 'auto':
+        return 'lxml' if 'lxml' in available else 'html.parser'
+    if name not in available:
+        fallback = 'lxml' if 'lxml' in available else 'html.parser'
+        print(f"⚠️  Parser {name} non installato, uso {fallback}")
+        return fallback
+    return name
+
+
+def parse_document(html_content, backend, capture_classes=(), capture_text=None):
+    """
+    Analizza l'HTML con il backend indicato (già risolto).
+    Restituisce (radice, DocumentIndex); la radice espone get_text().
+    """
+    if backend in ('html.parser', 'lxml'):
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html_content, backend)
+        return soup, DocumentIndex(soup)
+
+    if backend == 'selectolax':
+        root, elements = _convert_selectolax(html_content)
+        return root, DocumentIndex(root, elements=elements)
+
+    extractor = StreamingExtractor(capture_classes=capture_classes, capture_text=capture_text)
+    extractor.feed(html_content)
+    return extractor.finish()
+
+
+def _split_attribute(tag_name, key, value):
+    if value is None:
+        return ''
+    if key in MULTI_VALUED_ATTRIBUTES['*'] or key in MULTI_VALUED_ATTRIBUTES.get(tag_name, ()):
+        return _whitespace_re.findall(value)
+    return value
+
+
+def _escape(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _quote_attribute(value):
+    value = _escape(value)
+    if '"' in value:
+        if "'" in value:
+            return '"' + value.replace('"', '&quot;') + '"'
+        return "'" + value + "'"
+    return '"' + value + '"'
+
+
+class LiteComment(str):
+    """Commento HTML: escluso dal testo, serializzato come <!--...-->"""
+
+
+class LiteElement:
+    __slots__ = ('name', 'attrs', 'contents', 'parent')
+
+    def __init__(self, name, attrs=None, parent=None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.contents = []
+        self.parent = parent
+
+    def get(self, key, default=None):
+        return self.attrs.get(key, default)
+
+    def __getitem__(self, key):
+        return self.attrs[key]
+
+    def has_attr(self, key):
+        return key in self.attrs
+
+    def append_text(self, text):
+        """Unisce stringhe adiacenti come fa bs4"""
+        if self.contents and type(self.contents[-1]) is str:
+            self.contents[-1] += text
+        else:
+            self.contents.append(text)
+
+    @property
+    def string(self):
+        if len(self.contents) != 1:
+            return None
+        child = self.contents[0]
+        if isinstance(child, LiteElement):
+            return child.string
+        return None if isinstance(child, LiteComment) else child
+
+    def text_nodes(self):
+        """(testo, elemento che lo contiene) del sottoalbero, con le regole dei string container di bs4"""
+        wanted = self.name if self.name in STRING_CONTAINERS else None
+        stack = [(self, iter(self.contents), wanted)]
+        while stack:
+            element, children, container = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+            elif isinstance(child, LiteElement):
+                inner = child.name if child.name in STRING_CONTAINERS else container
+                stack.append((child, iter(child.contents), inner))
+            elif not isinstance(child, LiteComment) and container == wanted:
+                yield child, element
+
+    def _strings(self):
+        return (text for text, _ in self.text_nodes())
+
+    def get_text(self, separator='', strip=False):
+        if strip:
+            return separator.join(text.strip() for text in self._strings() if text.strip())
+        return separator.join(self._strings())
+
+    def find_parent(self, name):
+        parent = self.parent
+        while parent is not None:
+            if parent.name == name:
+                return parent
+            parent = parent.parent
+        return None
+
+    @property
+    def descendants(self):
+        stack = [iter(self.contents)]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                continue
+            yield child
+            if isinstance(child, LiteElement):
+                stack.append(iter(child.contents))
+
+    def find_all(self, names):
+        names = {names} if isinstance(names, str) else set(names)
+        return [node for node in self.descendants
+                if isinstance(node, LiteElement) and node.name in names]
+
+    def _start_tag(self):
+        parts = [self.name]
+        for key, value in self.attrs.items():
+            if isinstance(value, list):
+                value = ' '.join(value)
+            parts.append(f"{key}={_quote_attribute(value)}")
+        return ' '.join(parts)
+
+    def __str__(self):
+        out = []
+        # Pila di (elemento, iteratore sui figli) per evitare la ricorsione su DOM profondi
+        stack = [(self, None)]
+        while stack:
+            element, children = stack[-1]
+            if children is None:
+                if element.name in VOID_ELEMENTS and not element.contents:
+                    out.append(f"<{element._start_tag()}/>")
+                    stack.pop()
+                    continue
+                out.append(f"<{element._start_tag()}>")
+                stack[-1] = (element, iter(element.contents))
+                continue
+            child = next(children, None)
+            if child is None:
+                out.append(f"</{element.name}>")
+                stack.pop()
+            elif isinstance(child, LiteElement):
+                stack.append((child, None))
+            elif isinstance(child, LiteComment):
+                out.append(f"<!--{child}-->")
+            elif element.name in RAW_TEXT_ELEMENTS:
+                out.append(child)
+            else:
+                out.append(_escape(child))
+        return ''.join(out)
+
+
+class LiteDocument(LiteElement):
+    """Radice del documento per i backend leggeri"""
+    __slots__ = ('text_chunks', 'text_owners')
+
+    def __init__(self):
+        super().__init__('[document]')
+        self.text_chunks = None
+        # Backend stream: indice del blocco di testo -> elemento aperto, solo per i blocchi catturati
+        self.text_owners = {}
+
+    def text_nodes(self):
+        if self.text_chunks is None:
+            return super().text_nodes()
+        return ((text, self.text_owners.get(index)) for index, text in enumerate(self.text_chunks))
+
+    def get_text(self, separator='', strip=False):
+        # Il backend stream non conserva l'albero: usa il testo raccolto durante il parsing
+        if self.text_chunks is None:
+            return super().get_text(separator, strip)
+        if strip:
+            return separator.join(text.strip() for text in self.text_chunks if text.strip())
+        return separator.join(self.text_chunks)
+
+
+def _convert_selectolax(html_content):
+    """Converte l'albero lexbor in elementi leggeri, in ordine di documento"""
+    try:
+        from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+    except ImportError:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+
+    tree = SelectolaxParser(html_content)
+    document = LiteDocument()
+    elements = []
+    stack = [(tree.root, document)]
+    while stack:
+        node, parent = stack.pop()
+        tag = node.tag
+        if tag == '-text':
+            parent.append_text(node.text_content or '')
+            continue
+        if tag == '-comment':
+            # lexbor restituisce il commento completo di delimitatori
+            parent.contents.append(LiteComment((node.html or '')[4:-3]))
+            continue
+        if tag.startswith('-') or tag.startswith('!'):
+            continue
+
+        attrs = {key: _split_attribute(tag, key, value) for key, value in node.attributes.items()}
+        element = LiteElement(tag, attrs, parent)
+        parent.contents.append(element)
+        elements.append(element)
+        children = list(node.iter(include_text=True))
+        for child in reversed(children):
+            stack.append((child, element))
+    return document, elements
+
+
+class StreamingExtractor(HTMLParser):
+    """
+    Parser SAX che ricostruisce solo i sottoalberi degli elementi utili alle
+    sezioni di audit. Gli altri elementi vivono solo finché sono aperti.
+    """
+
+    def __init__(self, capture_tags=STREAM_CAPTURE_TAGS, capture_classes=(), capture_text=None):
+        super().__init__(convert_charrefs=True)
+        self.capture_tags = set(capture_tags)
+        self.capture_classes = list(capture_classes)
+        # Regex sul testo: per i blocchi che la soddisfano si conserva l'elemento che li contiene
+        self.capture_text = capture_text
+        self.document = LiteDocument()
+        self.document.text_chunks = []
+        self.elements = []
+        self.ids = set()
+        # Pila degli elementi aperti: (elemento, registrato, string container)
+        self._open = [(self.document, False, None)]
+
+    def _capture(self, element):
+        if element.name in self.capture_tags:
+            return True
+        classes = element.attrs.get('class') or ()
+        return any(pattern.search(name) for pattern in self.capture_classes for name in classes)
+
+    def handle_starttag(self, tag, attrs):
+        parent, recording, container = self._open[-1]
+        attr_dict = {}
+        for key, value in attrs:
+            attr_dict[key] = _split_attribute(tag, key, value)
+        element = LiteElement(tag, attr_dict, parent)
+
+        if attr_dict.get('id'):
+            self.ids.add(attr_dict['id'])
+        if recording or self._capture(element):
+            if recording:
+                parent.contents.append(element)
+            self.elements.append(element)
+            recording = True
+
+        if tag in VOID_ELEMENTS:
+            return
+        if tag in STRING_CONTAINERS:
+            container = tag
+        self._open.append((element, recording, container))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        # Come bs4: chiude fino al tag aperto più recente con lo stesso nome
+        for position in range(len(self._open) - 1, 0, -1):
+            if self._open[position][0].name == tag:
+                del self._open[position:]
+                return
+
+    def handle_data(self, data):
+        element, recording, container = self._open[-1]
+        if recording:
+            element.append_text(data)
+        if container is None:
+            chunks = self.document.text_chunks
+            chunks.append(data)
+            if self.capture_text is not None and self.capture_text.search(data):
+                self.document.text_owners[len(chunks) - 1] = element
+
+    def handle_comment(self, data):
+        element, recording, _ = self._open[-1]
+        if recording:
+            element.contents.append(LiteComment(data))
+
+    def finish(self):
+        """Chiude il parsing e restituisce (radice, DocumentIndex)"""
+        self.close()
+        return self.document, DocumentIndex(self.document, elements=self.elements, ids=self.ids)
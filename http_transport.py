@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Livello di trasporto HTTP per WebsiteAuditor
+Configura la requests.Session usata da audit, crawl e batch:
+- pool di connessioni dimensionato sul numero di probe in parallelo
+- retry con backoff su 429/503 che rispetta Retry-After (con un tetto)
+- timeout separati per connessione e lettura
+- cache DNS con TTL
+- HTTP/2 tramite httpx, se installato con il supporto h2
+Conta le connessioni aperte e quelle riusate, per misurare l'effetto del keep-alive.
+"""
+
+import email.utils
+import ipaddress
+import os
+import socket
+import ssl
+import threading
+import time
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, select_proxy
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.connection import create_connection
+from urllib3.util.retry import Retry
+
+from audit_profiler import record
+# Opzioni da riga di comando, ora in un modulo senza requests (compatibilità)
+from transport_args import add_transport_arguments, transport_options  # noqa: F401
+
+
+RETRY_STATUSES = (429, 503)
+
+
+class TransportStats:
+    """Contatori condivisi tra i thread del pool di probing"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "sends": 0, "connections_opened": 0,
+                         "bytes_received": 0, "dns_lookups": 0, "dns_cache_hits": 0}
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+        record(name, amount)
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters)
+        # Le richieste in più rispetto a quelle inviate da requests sono retry
+        return {
+            "requests": counters["requests"],
+            "retries": max(0, counters["requests"] - counters["sends"]),
+            "connections_opened": counters["connections_opened"],
+            "connections_reused": max(0, counters["requests"] - counters["connections_opened"]),
+            "bytes_received": counters["bytes_received"],
+            "dns_lookups": counters["dns_lookups"],
+            "dns_cache_hits": counters["dns_cache_hits"]
+        }
+
+
+class DnsCache:
+    """Risultati di getaddrinfo (tutti gli indirizzi) memorizzati per host e porta per `ttl` secondi"""
+
+    def __init__(self, stats, ttl=300):
+        self.stats = stats
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def resolve(self, host, port):
+        """Indirizzi dell'host nell'ordine di getaddrinfo, senza duplicati"""
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.stats.count("dns_cache_hits")
+                return entry[0]
+        self.stats.count("dns_lookups")
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            self._entries[key] = (addresses, now + self.ttl)
+        return addresses
+
+    def forget(self, host, port):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+class _TrackedConnectionMixin:
+    """Connessione urllib3 che conta richieste/connessioni e risolve l'host dalla cache DNS"""
+    transport = None
+
+    def _new_conn(self):
+        dns = self.transport.dns
+        try:
+            addresses = dns.resolve(self._dns_host, self.port) if dns else [self._dns_host]
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        # Come create_connection: si prova un indirizzo dopo l'altro (IPv6 e IPv4, più A record)
+        for address in addresses:
+            try:
+                sock = create_connection((address, self.port), self.timeout,
+                                         source_address=self.source_address,
+                                         socket_options=self.socket_options)
+                break
+            except OSError as e:
+                error = e
+        else:
+            # Gli indirizzi in cache potrebbero non essere più validi
+            if dns:
+                dns.forget(self._dns_host, self.port)
+            if isinstance(error, socket.timeout):
+                raise ConnectTimeoutError(
+                    self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})") from error
+            raise NewConnectionError(self, f"Failed to establish a new connection: {error}") from error
+        self.transport.stats.count("connections_opened")
+        return sock
+
+    def request(self, *args, **kwargs):
+        self.transport.stats.count("requests")
+        return super().request(*args, **kwargs)
+
+
+class CappedRetry(Retry):
+    """Retry che rispetta Retry-After senza attendere più di max_retry_after secondi"""
+    max_retry_after = 30
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.max_retry_after)
+
+
+class TunedAdapter(HTTPAdapter):
+    """HTTPAdapter con connessioni tracciate e timeout separati"""
+
+    def __init__(self, transport):
+        self.transport = transport
+        retry_class = type('TransportRetry', (CappedRetry,), {'max_retry_after': transport.max_retry_after})
+        # Solo gli status 429/503 vengono ripetuti: errori di rete e DNS falliscono subito come prima
+        retries = retry_class(total=transport.retries, connect=0, read=0, other=0,
+                              status=transport.retries, status_forcelist=RETRY_STATUSES,
+                              backoff_factor=transport.backoff, respect_retry_after_header=True,
+                              raise_on_status=False)
+        super().__init__(pool_connections=transport.max_hosts, pool_maxsize=transport.pool_size,
+                         max_retries=retries)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        transport = self.transport
+        http_conn = type('TrackedHTTPConnection', (_TrackedConnectionMixin, HTTPConnection),
+                         {'transport': transport})
+        https_conn = type('TrackedHTTPSConnection', (_TrackedConnectionMixin, HTTPSConnection),
+                          {'transport': transport})
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': type('TrackedHTTPConnectionPool', (HTTPConnectionPool,), {'ConnectionCls': http_conn}),
+            'https': type('TrackedHTTPSConnectionPool', (HTTPSConnectionPool,), {'ConnectionCls': https_conn}),
+        }
+
+    def send(self, request, **kwargs):
+        kwargs['timeout'] = self.transport.split_timeout(kwargs.get('timeout'))
+        self.transport.stats.count("sends")
+        return super().send(request, **kwargs)
+
+    def build_response(self, req, resp):
+        # Byte del corpo letti dalla rete (prima della decompressione), contati al rilascio
+        # (release_conn può essere chiamato più volte: si conta solo la differenza)
+        release = resp.release_conn
+        stats = self.transport.stats
+        counted = [0]
+
+        def release_conn():
+            read = resp.tell()
+            stats.count("bytes_received", read - counted[0])
+            counted[0] = read
+            release()
+
+        resp.release_conn = release_conn
+        return super().build_response(req, resp)
+
+
+class _HttpxBody:
+    """Corpo di una risposta httpx letto a blocchi da requests.Response.iter_content"""
+
+    def __init__(self, response, stats):
+        self.response = response
+        self.stats = stats
+        self.counted = 0
+
+    def _count(self):
+        # Byte ricevuti dalla rete, contati man mano che arrivano
+        read = self.response.num_bytes_downloaded
+        if read > self.counted:
+            self.stats.count("bytes_received", read - self.counted)
+            self.counted = read
+
+    def stream(self, chunk_size, decode_content=True):
+        for chunk in self.response.iter_bytes(chunk_size):
+            self._count()
+            yield chunk
+
+    @property
+    def version(self):
+        return self.response.http_version
+
+    def tell(self):
+        # Byte ricevuti dalla rete, prima della decompressione (come urllib3)
+        return self.response.num_bytes_downloaded
+
+    def close(self):
+        self.response.close()
+        self._count()
+
+
+def _ssl_context(verify, cert):
+    """SSLContext equivalente alle opzioni verify/cert di requests"""
+    if isinstance(verify, str):
+        if os.path.isdir(verify):
+            context = ssl.create_default_context(capath=verify)
+        else:
+            context = ssl.create_default_context(cafile=verify)
+    else:
+        context = ssl.create_default_context()
+        if not verify:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+    if cert:
+        if isinstance(cert, str):
+            context.load_cert_chain(cert)
+        else:
+            context.load_cert_chain(*cert)
+    return context
+
+
+def _retry_after_seconds(value):
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+class Http2Adapter(BaseAdapter):
+    """
+    Adapter requests che invia le richieste con un client httpx HTTP/2,
+    uno per combinazione di verify/cert/proxy ricevuta da requests
+    """
+
+    def __init__(self, transport, httpx):
+        super().__init__()
+        self.transport = transport
+        self.httpx = httpx
+        self._lock = threading.Lock()
+        # Un client per combinazione di TLS e proxy: in httpx sono opzioni del client
+        self._clients = {}
+
+    def _client(self, verify, cert, proxy):
+        key = (verify, cert if not isinstance(cert, list) else tuple(cert), proxy)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self.httpx.Client(
+                    http2=True,
+                    follow_redirects=False,
+                    verify=_ssl_context(verify, cert),
+                    proxy=proxy,
+                    limits=self.httpx.Limits(max_connections=self.transport.pool_size * self.transport.max_hosts,
+                                             max_keepalive_connections=self.transport.pool_size)
+                )
+                self._clients[key] = client
+            return client
+
+    def _trace(self, event, info):
+        if event == 'connection.connect_tcp.complete':
+            self.transport.stats.count("connections_opened")
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        timeout = self.transport.split_timeout(timeout)
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        timeout = self.httpx.Timeout(connect=connect, read=read, write=read, pool=None)
+        self.transport.stats.count("sends")
+        client = self._client(verify, cert, select_proxy(request.url, proxies or {}))
+        for attempt in range(self.transport.retries + 1):
+            outgoing = client.build_request(request.method, request.url, headers=dict(request.headers),
+                                                 content=request.body, extensions={'trace': self._trace})
+            self.transport.stats.count("requests")
+            reply = client.send(outgoing, stream=True)
+            if reply.status_code not in RETRY_STATUSES or attempt == self.transport.retries \
+                    or request.method == 'POST':
+                break
+            reply.close()
+            delay = _retry_after_seconds(reply.headers.get('Retry-After'))
+            if delay is None:
+                delay = self.transport.backoff * (2 ** attempt)
+            time.sleep(min(delay, self.transport.max_retry_after))
+
+        response = requests.Response()
+        response.status_code = reply.status_code
+        response.headers = CaseInsensitiveDict(reply.headers.multi_items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.reason = reply.reason_phrase
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.raw = _HttpxBody(reply, self.transport.stats)
+        if not stream:
+            response.content
+        return response
+
+    def close(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+
+class HttpTransport:
+    """
+    Configurazione del trasporto condivisa dalle Session create con create_session().
+    I timeout scalari passati alle singole richieste vengono divisi in
+    (connessione, lettura) usando connect_timeout/read_timeout se impostati.
+    """
+
+    def __init__(self, pool_size=16, max_hosts=32, retries=2, backoff=0.5, max_retry_after=30,
+                 connect_timeout=None, read_timeout=None, http2=False, dns_cache_ttl=300):
+        self.pool_size = max(1, pool_size)
+        self.max_hosts = max(1, max_hosts)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.max_retry_after = max_retry_after
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.stats = TransportStats()
+        self.dns = DnsCache(self.stats, dns_cache_ttl) if dns_cache_ttl else None
+        self.http_version = 'HTTP/1.1'
+        self._http2 = http2
+
+    def split_timeout(self, timeout):
+        if isinstance(timeout, tuple) or (self.connect_timeout is None and self.read_timeout is None):
+            return timeout
+        connect = self.connect_timeout if self.connect_timeout is not None else timeout
+        read = self.read_timeout if self.read_timeout is not None else timeout
+        return (connect, read)
+
+    def _http2_adapter(self):
+        try:
+            import h2  # noqa: F401 - httpx richiede h2 per http2=True
+            import httpx
+        except ImportError:
+            print("⚠️  HTTP/2 non disponibile (pip install 'httpx[http2]'), uso HTTP/1.1")
+            return None
+        return Http2Adapter(self, httpx)
+
+    def create_session(self, user_agent=None):
+        session = requests.Session()
+        if user_agent:
+            session.headers.update({'User-Agent': user_agent})
+        adapter = self._http2_adapter() if self._http2 else None
+        if adapter is not None:
+            self.http_version = 'HTTP/2'
+            session.mount('https://', adapter)
+            session.mount('http://', TunedAdapter(self))
+        else:
+            adapter = TunedAdapter(self)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        return session
+
+    def report(self):
+        """Contatori per i metadata del report"""
+        return dict(self.stats.snapshot(), http_version=self.http_version,
+                    pool_size=self.pool_size, max_retries=self.retries)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Analisi delle immagini della pagina
+Di ogni immagine si leggono solo i primi byte (GET con Range) per ricavare
+formato e dimensioni intrinseche, che vengono confrontate con gli attributi
+width/height/srcset/sizes/loading del tag <img>. Le stime di risparmio
+(ridimensionamento e formati moderni) sono indicative: rapporti medi di
+compressione, non una ricodifica reale.
+"""
+
+import re
+import struct
+
+# Byte letti dall'inizio del file: bastano anche per JPEG con EXIF corposi
+HEADER_BYTES = 64 * 1024
+# Immagini considerate sopra la piega (senza layout non si può sapere di più)
+ABOVE_THE_FOLD_IMAGES = 2
+# Densità di pixel massima servita a un'immagine con dimensioni dichiarate
+MAX_PIXEL_DENSITY = 2
+# Larghezza oltre la quale un'immagine senza dimensioni né srcset è comunque troppo grande
+MAX_INTRINSIC_WIDTH = 2560
+# Risparmio minimo (KB) perché un formato moderno o un ridimensionamento venga segnalato
+MIN_SAVINGS_KB = 4
+
+# Risparmio medio rispetto al formato originale (studi di WebP/AVIF su immagini web)
+FORMAT_SAVINGS = {
+    'jpeg': {'webp': 0.30, 'avif': 0.50},
+    'png': {'webp': 0.26, 'avif': 0.45},
+    'gif': {'webp': 0.50, 'avif': 0.60},
+    'bmp': {'webp': 0.90, 'avif': 0.92},
+    'webp': {'avif': 0.20},
+}
+
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+_content_range_re = re.compile(r'/(\d+)\s*$')
+_dimension_re = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*(px)?\s*$')
+
+
+def _jpeg_size(data):
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+        i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+    return None
+
+
+def _webp_size(data):
+    chunk = data[12:16]
+    if chunk == b'VP8 ' and len(data) >= 30:
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and len(data) >= 25:
+        bits = struct.unpack('<I', data[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X' and len(data) >= 30:
+        width = int.from_bytes(data[24:27], 'little') + 1
+        height = int.from_bytes(data[27:30], 'little') + 1
+        return width, height
+    return None
+
+
+def _avif_size(data):
+    # Box 'ispe' (image spatial extents): versione/flag, larghezza, altezza
+    index = data.find(b'ispe')
+    if index < 0 or len(data) < index + 16:
+        return None
+    return struct.unpack('>II', data[index + 8:index + 16])
+
+
+def image_format(data, content_type=''):
+    """Formato e dimensioni intrinseche (width, height) dai primi byte; dimensioni None se ignote"""
+    if data.startswith(b'\x89PNG\r\n\x1a\n') and len(data) >= 24:
+        return 'png', struct.unpack('>II', data[16:24])
+    if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        return 'gif', struct.unpack('<HH', data[6:10])
+    if data.startswith(b'\xff\xd8'):
+        return 'jpeg', _jpeg_size(data)
+    if data.startswith(b'RIFF') and data[8:12] == b'WEBP':
+        return 'webp', _webp_size(data)
+    if data[4:8] == b'ftyp' and data[8:12] in (b'avif', b'avis'):
+        return 'avif', _avif_size(data)
+    if data.startswith(b'BM') and len(data) >= 26:
+        width, height = struct.unpack('<ii', data[18:26])
+        return 'bmp', (width, abs(height))
+    if 'svg' in content_type or data.lstrip()[:5] in (b'<?xml', b'<svg '):
+        return 'svg', None
+    return None, None
+
+
+def read_image_header(session, url, max_bytes=HEADER_BYTES, timeout=5):
+    """
+    Legge al massimo `max_bytes` dall'inizio dell'immagine.
+    Restituisce status, content_type, peso totale in byte (se noto) e formato/dimensioni.
+    """
+    headers = {'Range': f'bytes=0-{max_bytes - 1}'}
+    with session.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        # Validatori e codifica servono a usare la stessa GET anche per il peso (asset_weight)
+        info = {"status": response.status_code,
+                "content_type": response.headers.get('content-type', ''),
+                "etag": response.headers.get('etag'),
+                "last_modified": response.headers.get('last-modified'),
+                "encoded": (response.headers.get('content-encoding') or 'identity').strip().lower() != 'identity',
+                "bytes": None, "format": None, "width": None, "height": None}
+        if response.status_code not in (200, 206):
+            return info
+
+        if response.status_code == 206:
+            match = _content_range_re.search(response.headers.get('content-range', ''))
+            info["bytes"] = int(match.group(1)) if match else None
+        elif response.headers.get('content-length'):
+            info["bytes"] = int(response.headers['content-length'])
+
+        # Server che ignorano Range: ci si ferma comunque dopo max_bytes
+        data = b''
+        for chunk in response.iter_content(16384):
+            data += chunk
+            if len(data) >= max_bytes:
+                break
+        info["format"], size = image_format(data[:max_bytes], info["content_type"])
+        if size:
+            info["width"], info["height"] = size
+        return info
+
+
+def parse_dimension(value):
+    """'300', '300px' -> 300.0; percentuali e valori non numerici -> None"""
+    match = _dimension_re.match(value or '')
+    return float(match.group(1)) if match else None
+
+
+def parse_srcset(value):
+    """'a.jpg 480w, b.jpg 2x' -> [('a.jpg', '480w'), ('b.jpg', '2x')]"""
+    candidates = []
+    for candidate in (value or '').split(','):
+        parts = candidate.split()
+        if parts:
+            candidates.append((parts[0], parts[1] if len(parts) > 1 else '1x'))
+    return candidates
+
+
+def _kb(value):
+    return round(value / 1024, 2)
+
+
+def analyze_image(attrs, header, index):
+    """
+    Confronta attributi del tag e dati letti dal file.
+    `attrs`: src, width, height, srcset, sizes, loading; `index`: posizione nella pagina.
+    """
+    width, height = parse_dimension(attrs.get('width')), parse_dimension(attrs.get('height'))
+    srcset = parse_srcset(attrs.get('srcset'))
+    responsive = bool(srcset)
+    fmt = header.get("format")
+    intrinsic_w, intrinsic_h = header.get("width"), header.get("height")
+    size = header.get("bytes")
+
+    issues = []
+    if width is None or height is None:
+        issues.append("missing_dimensions")
+    if index >= ABOVE_THE_FOLD_IMAGES and (attrs.get('loading') or '').lower() != 'lazy':
+        issues.append("missing_lazy_loading")
+    if any(descriptor.endswith('w') for _, descriptor in srcset) and not attrs.get('sizes'):
+        issues.append("srcset_without_sizes")
+
+    # Larghezza utile: quella dichiarata (per la densità massima) o il tetto generico
+    target_w = None
+    if intrinsic_w and intrinsic_h and fmt != 'svg':
+        if width:
+            target_w = width * MAX_PIXEL_DENSITY
+            if height and abs(width / height - intrinsic_w / intrinsic_h) > 0.05 * (intrinsic_w / intrinsic_h):
+                issues.append("aspect_ratio_mismatch")
+        elif not responsive:
+            target_w = MAX_INTRINSIC_WIDTH
+
+    resize_savings = 0
+    if target_w and intrinsic_w > target_w and size:
+        # Il peso scala circa con l'area: stesso rapporto d'aspetto, larghezza ridotta
+        resize_savings = size * (1 - (target_w / intrinsic_w) ** 2)
+        if _kb(resize_savings) >= MIN_SAVINGS_KB:
+            issues.append("oversized")
+
+    format_savings = {}
+    if size and fmt in FORMAT_SAVINGS:
+        remaining = size - resize_savings
+        format_savings = {target: _kb(remaining * ratio) for target, ratio in FORMAT_SAVINGS[fmt].items()}
+        if max(format_savings.values()) >= MIN_SAVINGS_KB:
+            issues.append("legacy_format")
+
+    return {
+        "url": attrs.get('src'),
+        "format": fmt,
+        "size_kb": _kb(size) if size is not None else None,
+        "intrinsic": [intrinsic_w, intrinsic_h] if intrinsic_w else None,
+        "declared": [width, height] if width or height else None,
+        "srcset": len(srcset),
+        "loading": attrs.get('loading'),
+        "resize_savings_kb": _kb(resize_savings),
+        "format_savings_kb": format_savings,
+        "issues": issues
+    }
+
+
+def summarize_images(images):
+    """Totali della pagina: peso, risparmi stimati e conteggio dei problemi per tipo"""
+    issues = {}
+    for image in images:
+        for issue in image.get("issues", []):
+            issues[issue] = issues.get(issue, 0) + 1
+    return {
+        "images": len(images),
+        "total_kb": round(sum(image.get("size_kb") or 0 for image in images), 2),
+        "resize_savings_kb": round(sum(image.get("resize_savings_kb") or 0 for image in images), 2),
+        "webp_savings_kb": round(sum(image.get("format_savings_kb", {}).get("webp", 0) for image in images), 2),
+        "avif_savings_kb": round(sum(image.get("format_savings_kb", {}).get("avif", 0) for image in images), 2),
+        "issues": issues
+    }
@@ -2,88 +2,298 @@
 """
 Lighthouse Report Generator
 Genera report prima/dopo per confronto performance
+Le esecuzioni (N ripetizioni per M URL) girano in un pool limitato di
+processi Lighthouse, ognuno con timeout e file di output propri.
+
+Uso: python lighthouse_compare.py <URL> [<URL> ...] [--runs 3] [--concurrency 2]
+     python lighthouse_compare.py --before before-*.json --after after-*.json [--thresholds soglie.json]
 """
 
+import argparse
 import os
 import json
+import re
+import signal
 import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from lighthouse_stats import DEFAULT_ALPHA, compare_runs, expand_paths, load_runs, load_thresholds
+
+CHROME_FLAGS = '--headless --no-sandbox'
+# Secondi massimi per una singola esecuzione di Lighthouse
+DEFAULT_TIMEOUT = 120
+
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_concurrency(cpus=None):
+    """Un Lighthouse ogni 2 core: Chrome, trace e audit in contemporanea falsano le metriche"""
+    return max(1, (cpus or available_cpus()) // 2)
+
+
+def _slug(url):
+    return re.sub(r'[^A-Za-z0-9]+', '-', re.sub(r'^https?://', '', url)).strip('-')[:80] or 'root'
+
+
+def _kill(process):
+    """Termina Lighthouse insieme ai Chrome che ha avviato (stesso gruppo di processi)"""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (AttributeError, OSError):
+        process.kill()
+
+
 class LighthouseRunner:
-    def __init__(self, url):
+    def __init__(self, url=None, output_dir='lighthouse-reports', concurrency=None, timeout=DEFAULT_TIMEOUT,
+                 executable='lighthouse', cpus=None):
         self.url = url
         self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.output_dir = output_dir
+        self.timeout = timeout
+        self.executable = executable
+        # Mai più esecuzioni contemporanee dei core disponibili
+        cpus = cpus or available_cpus()
+        self.concurrency = max(1, min(concurrency or default_concurrency(cpus), cpus))
 
-    def run_lighthouse(self, output_name):
-        """Esegue Lighthouse e salva il report"""
-        cmd = [
-            'lighthouse',
-            self.url,
-            '--output=json',
-            '--output=html',
-            f'--output-path={output_name}',
-            '--chrome-flags="--headless --no-sandbox"',
+    def _command(self, url, output_path, outputs=('json',)):
+        return [
+            self.executable,
+            url,
+            *(f'--output={output}' for output in outputs),
+            f'--output-path={output_path}',
+            f'--chrome-flags={CHROME_FLAGS}',
             '--quiet'
         ]
 
+    def _execute(self, cmd):
+        """Esegue Lighthouse in un gruppo di processi proprio; allo scadere del timeout lo termina"""
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                   start_new_session=True)
+        try:
+            _, stderr = process.communicate(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            _kill(process)
+            process.communicate()
+            raise
+        return process.returncode, stderr
+
+    def run_lighthouse(self, output_name):
+        """Esegue Lighthouse e salva il report"""
+        cmd = self._command(self.url, output_name, ('json', 'html'))
+
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode == 0:
+            returncode, stderr = self._execute(cmd)
+            if returncode == 0:
                 print(f"✅ Lighthouse report generato: {output_name}")
                 return True
             else:
-                print(f"❌ Errore Lighthouse: {result.stderr}")
+                print(f"❌ Errore Lighthouse: {stderr}")
                 return False
+        except subprocess.TimeoutExpired:
+            print(f"❌ Lighthouse interrotto dopo {self.timeout}s")
+            return False
         except FileNotFoundError:
             print("❌ Lighthouse CLI non trovato. Installa con: npm install -g lighthouse")
             return False
 
-    def compare_reports(self, before_file, after_file):
-        """Confronta due report Lighthouse"""
+    def run_one(self, url, output_path):
+        """Una esecuzione con il suo file di output; non solleva eccezioni"""
+        started = time.monotonic()
+        entry = {"url": url, "path": output_path, "ok": False}
         try:
-            with open(before_file, 'r') as f:
-                before_data = json.load(f)
-            with open(after_file, 'r') as f:
-                after_data = json.load(f)
+            returncode, stderr = self._execute(self._command(url, output_path))
+            if returncode != 0:
+                entry["error"] = (stderr or '').strip()[-500:] or f"exit code {returncode}"
+            elif not os.path.exists(output_path):
+                entry["error"] = "report non generato"
+            else:
+                entry["ok"] = True
+        except subprocess.TimeoutExpired:
+            entry["error"] = f"timeout dopo {self.timeout}s"
+        except FileNotFoundError:
+            entry["error"] = "Lighthouse CLI non trovato. Installa con: npm install -g lighthouse"
+        entry["duration_s"] = round(time.monotonic() - started, 2)
+        return entry
 
-            categories = ['performance', 'accessibility', 'best-practices', 'seo']
-            improvements = {}
+    def run_batch(self, urls, runs=3, label='run'):
+        """
+        `runs` ripetizioni per ogni URL, al massimo `concurrency` Lighthouse
+        insieme. Le ripetizioni sono alternate tra gli URL, così un
+        rallentamento temporaneo non pesa tutto su uno solo. Ogni esecuzione
+        scrive in <output_dir>/<timestamp>/<label>/<url>/run-N.json.
+        """
+        jobs = []
+        for run in range(1, runs + 1):
+            for url in urls:
+                directory = os.path.join(self.output_dir, self.timestamp, label, _slug(url))
+                os.makedirs(directory, exist_ok=True)
+                jobs.append((url, run, os.path.join(directory, f"run-{run}.json")))
 
-            for category in categories:
-                before_score = before_data['categories'][category]['score'] * 100
-                after_score = after_data['categories'][category]['score'] * 100
-                improvement = after_score - before_score
-                improvements[category] = improvement
+        results = []
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='lighthouse') as pool:
+            futures = [pool.submit(self.run_one, url, path) for url, _, path in jobs]
+            for (url, run, _), future in zip(jobs, futures):
+                entry = dict(future.result(), run=run, label=label)
+                if entry["ok"]:
+                    print(f"✅ [{label}] {url} #{run} ({entry['duration_s']}s)")
+                else:
+                    print(f"❌ [{label}] {url} #{run}: {entry['error']}")
+                results.append(entry)
+        return results
 
-                status = "✅" if improvement >= 0 else "❌"
-                print(f"{status} {category.title()}: {before_score:.1f} → {after_score:.1f} ({improvement:+.1f})")
+    def compare_batches(self, before, after, thresholds=None, alpha=DEFAULT_ALPHA):
+        """Confronto per URL tra due run_batch; gli URL senza esecuzioni valide restano fuori"""
+        comparisons = {}
+        for url in dict.fromkeys(entry["url"] for entry in before):
+            before_files = [e["path"] for e in before if e["url"] == url and e["ok"]]
+            after_files = [e["path"] for e in after if e["url"] == url and e["ok"]]
+            if not before_files or not after_files:
+                print(f"⚠️  {url}: nessuna esecuzione valida da confrontare")
+                continue
+            print(f"\n🌐 {url}")
+            comparison = self.compare_reports(before_files, after_files, thresholds, alpha)
+            if comparison is not None:
+                comparisons[url] = comparison
+        return comparisons
+
+    def compare_reports(self, before_files, after_files, thresholds=None, alpha=DEFAULT_ALPHA):
+        """
+        Confronta le esecuzioni prima/dopo (uno o più file LHR per lato):
+        mediana, dispersione e significatività per metrica
+        """
+        if isinstance(before_files, str):
+            before_files = [before_files]
+        if isinstance(after_files, str):
+            after_files = [after_files]
+        try:
+            before_runs, skipped = load_runs(before_files)
+            after_runs, skipped_after = load_runs(after_files)
+            for entry in skipped + skipped_after:
+                print(f"⚠️  Esecuzione scartata: {entry['path']} ({entry['reason']})")
+            if not before_runs or not after_runs:
+                print("❌ Nessuna esecuzione valida da confrontare")
+                return None
 
-            return improvements
+            comparison = compare_runs(before_runs, after_runs, thresholds, alpha)
+            print_comparison(comparison)
+            return comparison
 
         except Exception as e:
             print(f"❌ Errore nel confronto: {e}")
             return None
 
-def main():
-    import sys
 
-    if len(sys.argv) != 2:
-        print("Uso: python lighthouse_compare.py <URL>")
-        sys.exit(1)
+STATUS_ICONS = {"regression": "❌", "improvement": "✅", "inconclusive": "❔", "unchanged": "➖"}
+
+
+def print_comparison(comparison):
+    """Tabella del confronto: mediane, dispersione, p-value ed esito per metrica"""
+    runs = comparison["runs"]
+    print(f"📊 Esecuzioni: {runs['before']} prima, {runs['after']} dopo (alpha {comparison['alpha']})")
+    for name, result in comparison["metrics"].items():
+        before, after = result["before"], result["after"]
+        p_value = f"{result['p_value']:.3f}" if result["p_value"] is not None else "n/d"
+        delta_pct = f" ({result['delta_pct']:+.1f}%)" if result["delta_pct"] is not None else ""
+        print(f"{STATUS_ICONS[result['status']]} {name.upper():>4}: {before['median']:.4g} ± {before['stdev']:.3g} → "
+              f"{after['median']:.4g} ± {after['stdev']:.3g}{delta_pct}  p={p_value}  {result['status']}")
+    for category, scores in comparison["categories"].items():
+        status = "✅" if scores["delta"] >= 0 else "❌"
+        print(f"{status} {category.title()}: {scores['before']:.1f} → {scores['after']:.1f} ({scores['delta']:+.1f})")
+
+
+def record_history(path, runs):
+    """Aggiunge allo storico le esecuzioni [(file LHR, etichetta)]; quelle già presenti vengono saltate"""
+    from audit_history import AuditHistory
+    history = AuditHistory(path)
+    added = 0
+    try:
+        for lhr, label in runs:
+            try:
+                added += history.ingest(lhr, label) or 0
+            except (OSError, ValueError) as e:
+                print(f"⚠️  {lhr} non aggiunto allo storico: {e}")
+    finally:
+        history.close()
+    print(f"🗃️  Storico aggiornato: {added} campioni in {path}")
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='lighthouse_compare.py',
+        description="Report Lighthouse prima/dopo e confronto statistico su più esecuzioni"
+    )
+    parser.add_argument('urls', nargs='*', metavar='URL', help="URL da analizzare (esegue Lighthouse prima e dopo)")
+    parser.add_argument('--before', nargs='+', metavar='LHR',
+                        help="report LHR esistenti del prima (file, directory o glob)")
+    parser.add_argument('--after', nargs='+', metavar='LHR', help="report LHR esistenti del dopo")
+    parser.add_argument('--thresholds', metavar='FILE',
+                        help='soglie di regressione in JSON, es. {"lcp": {"abs": 200, "pct": 5}}')
+    parser.add_argument('--alpha', type=float, default=DEFAULT_ALPHA,
+                        help="livello di significatività del test t di Welch")
+    parser.add_argument('-o', '--output', help="salva il confronto in JSON")
+    parser.add_argument('--history', metavar='DB',
+                        help="aggiunge le esecuzioni allo storico SQLite (vedi audit_history.py)")
+
+    pool = parser.add_argument_group('esecuzione')
+    pool.add_argument('--runs', type=int, default=3, help="ripetizioni per URL e per lato")
+    pool.add_argument('--concurrency', type=int,
+                      help=f"Lighthouse in parallelo (default metà dei core, qui {default_concurrency()})")
+    pool.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help="secondi massimi per esecuzione")
+    pool.add_argument('--output-dir', default='lighthouse-reports', help="directory dei report LHR")
+    return parser
+
 
-    url = sys.argv[1]
-    runner = LighthouseRunner(url)
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if bool(args.before) != bool(args.after):
+        parser.error("--before e --after vanno indicati insieme")
+    if not args.urls and not args.before:
+        parser.error("indicare uno o più URL oppure --before/--after")
+    try:
+        thresholds = load_thresholds(args.thresholds)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
 
-    before_file = f"lighthouse-before-{runner.timestamp}"
-    print("📊 Generazione report PRIMA delle ottimizzazioni...")
-    runner.run_lighthouse(before_file)
+    runner = LighthouseRunner(args.urls[0] if args.urls else None, output_dir=args.output_dir,
+                              concurrency=args.concurrency, timeout=args.timeout)
+    if args.before:
+        comparison = runner.compare_reports(args.before, args.after, thresholds, args.alpha)
+        comparisons = {"": comparison} if comparison is not None else {}
+        output = comparison
+        runs = [(path, 'before') for path in expand_paths(args.before)]
+        runs += [(path, 'after') for path in expand_paths(args.after)]
+    else:
+        print(f"📊 Report PRIMA delle ottimizzazioni ({args.runs} esecuzioni per URL, {runner.concurrency} in parallelo)...")
+        before = runner.run_batch(args.urls, args.runs, 'before')
+        print("📊 Report DOPO le ottimizzazioni...")
+        after = runner.run_batch(args.urls, args.runs, 'after')
+        comparisons = runner.compare_batches(before, after, thresholds, args.alpha)
+        output = comparisons
+        runs = [(entry["path"], entry["label"]) for entry in before + after if entry["ok"]]
 
-    after_file = f"lighthouse-after-{runner.timestamp}"
-    print("📊 Generazione report DOPO le ottimizzazioni...")
-    runner.run_lighthouse(after_file)
+    if args.history:
+        record_history(args.history, runs)
 
-    if os.path.exists(f"{before_file}.json") and os.path.exists(f"{after_file}.json"):
-        runner.compare_reports(f"{before_file}.json", f"{after_file}.json")
+    if not comparisons:
+        return 1
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2)
+        print(f"💾 Confronto salvato in {args.output}")
+    regressions = [(url, name) for url, comparison in comparisons.items() for name in comparison["regressions"]]
+    if regressions:
+        print(f"\n❌ Regressioni significative: {', '.join(f'{name.upper()} {url}'.strip() for url, name in regressions)}")
+        return 1
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
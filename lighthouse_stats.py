@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Statistiche su più esecuzioni di Lighthouse
+Legge i risultati (LHR) senza caricarli interi in memoria quando ijson è
+installato: da ogni file servono solo le metriche principali e i punteggi
+delle categorie, mentre screenshot e trace possono pesare decine di MB.
+Il confronto prima/dopo usa la mediana delle esecuzioni, la dispersione e
+un test t di Welch per metrica, con soglie di regressione configurabili.
+"""
+
+import glob
+import gzip
+import json
+import math
+import os
+import statistics
+
+# Metriche confrontate: nome breve -> id dell'audit nel LHR (per tutte, più basso è meglio)
+METRICS = {
+    'fcp': 'first-contentful-paint',
+    'lcp': 'largest-contentful-paint',
+    'tbt': 'total-blocking-time',
+    'cls': 'cumulative-layout-shift',
+    'si': 'speed-index',
+    'tti': 'interactive',
+}
+CATEGORIES = ('performance', 'accessibility', 'best-practices', 'seo')
+
+# Una variazione è rilevante se supera entrambe le soglie: assoluta (ms, o unità per CLS) e percentuale
+DEFAULT_THRESHOLDS = {
+    'fcp': {'abs': 100, 'pct': 10},
+    'lcp': {'abs': 150, 'pct': 10},
+    'tbt': {'abs': 50, 'pct': 15},
+    'cls': {'abs': 0.02, 'pct': 10},
+    'si': {'abs': 200, 'pct': 10},
+    'tti': {'abs': 200, 'pct': 10},
+}
+DEFAULT_ALPHA = 0.05
+
+_AUDIT_IDS = {audit_id: name for name, audit_id in METRICS.items()}
+
+
+def _open_binary(path):
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def _from_document(data):
+    audits = data.get('audits') or {}
+    categories = data.get('categories') or {}
+    return {
+        "url": data.get('finalDisplayedUrl') or data.get('finalUrl') or data.get('requestedUrl'),
+        "fetch_time": data.get('fetchTime'),
+        "error": (data.get('runtimeError') or {}).get('code'),
+        "metrics": {name: audits[audit_id].get('numericValue')
+                    for name, audit_id in METRICS.items() if audit_id in audits},
+        "scores": {name: categories[name]['score'] * 100
+                   for name in CATEGORIES if categories.get(name, {}).get('score') is not None}
+    }
+
+
+def _from_events(events):
+    """Stessa estrazione di _from_document a partire dagli eventi di ijson.parse"""
+    result = {"url": None, "fetch_time": None, "error": None, "metrics": {}, "scores": {}}
+    urls = {}
+    for prefix, event, value in events:
+        if event not in ('number', 'string', 'null'):
+            continue
+        parts = prefix.split('.')
+        if len(parts) == 3 and parts[0] == 'audits' and parts[2] == 'numericValue' and parts[1] in _AUDIT_IDS:
+            result["metrics"][_AUDIT_IDS[parts[1]]] = float(value) if value is not None else None
+        elif len(parts) == 3 and parts[0] == 'categories' and parts[2] == 'score' and parts[1] in CATEGORIES:
+            if value is not None:
+                result["scores"][parts[1]] = float(value) * 100
+        elif prefix in ('finalDisplayedUrl', 'finalUrl', 'requestedUrl'):
+            urls[prefix] = value
+        elif prefix == 'fetchTime':
+            result["fetch_time"] = value
+        elif prefix == 'runtimeError.code':
+            result["error"] = value
+    result["url"] = urls.get('finalDisplayedUrl') or urls.get('finalUrl') or urls.get('requestedUrl')
+    return result
+
+
+def read_lhr(path):
+    """Metriche, punteggi, URL, fetchTime ed eventuale runtimeError di un file LHR (.json o .json.gz)"""
+    with _open_binary(path) as f:
+        try:
+            import ijson
+        except ImportError:
+            return _from_document(json.load(f))
+        return _from_events(ijson.parse(f))
+
+
+def expand_paths(patterns):
+    """File, directory (tutti i *.json al loro interno) e glob, in ordine e senza duplicati"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, '*.json')) +
+                             glob.glob(os.path.join(pattern, '*.json.gz')))
+        else:
+            matches = sorted(glob.glob(pattern)) or [pattern]
+        paths.extend(path for path in matches if path not in paths)
+    return paths
+
+
+def load_runs(patterns):
+    """Esecuzioni valide (senza runtimeError) e file scartati con il motivo"""
+    runs, skipped = [], []
+    for path in expand_paths(patterns):
+        try:
+            run = read_lhr(path)
+        except (OSError, ValueError) as e:
+            skipped.append({"path": path, "reason": str(e)})
+            continue
+        if run["error"]:
+            skipped.append({"path": path, "reason": run["error"]})
+            continue
+        run["path"] = path
+        runs.append(run)
+    return runs, skipped
+
+
+def percentile(values, pct):
+    """Percentile nearest-rank di una lista già ordinata; None se vuota"""
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * pct // 100))
+    return values[int(rank) - 1]
+
+
+def describe(values):
+    """Mediana e dispersione di una serie di esecuzioni"""
+    return {
+        "runs": len(values),
+        "median": statistics.median(values),
+        "mean": statistics.fmean(values),
+        "stdev": statistics.stdev(values) if len(values) > 1 else 0.0,
+        "min": min(values),
+        "max": max(values)
+    }
+
+
+def _betacf(a, b, x, iterations=200, eps=3e-14):
+    """Frazione continua della beta incompleta (Numerical Recipes, betacf)"""
+    tiny = 1e-30
+    qab, qap, qam = a + b, a + 1, a - 1
+    c, d = 1.0, 1 - qab * x / qap
+    d = 1 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, iterations + 1):
+        m2 = 2 * m
+        for aa in (m * (b - m) * x / ((qam + m2) * (a + m2)),
+                   -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))):
+            d = 1 + aa * d
+            d = 1 / (d if abs(d) > tiny else tiny)
+            c = 1 + aa / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1) < eps:
+            break
+    return h
+
+
+def _betainc(a, b, x):
+    """Beta incompleta regolarizzata I_x(a, b)"""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1 - x))
+    if x < (a + 1) / (a + b + 2):
+        return front * _betacf(a, b, x) / a
+    return 1 - front * _betacf(b, a, 1 - x) / b
+
+
+def welch_t_test(before, after):
+    """p-value bilaterale del test t di Welch; None con meno di 2 esecuzioni per lato"""
+    if len(before) < 2 or len(after) < 2:
+        return None
+    var_b, var_a = statistics.variance(before) / len(before), statistics.variance(after) / len(after)
+    se2 = var_b + var_a
+    diff = statistics.fmean(after) - statistics.fmean(before)
+    if se2 == 0:
+        return 1.0 if diff == 0 else 0.0
+    t = diff / math.sqrt(se2)
+    df = se2 ** 2 / (var_b ** 2 / (len(before) - 1) + var_a ** 2 / (len(after) - 1))
+    return _betainc(df / 2, 0.5, df / (df + t * t))
+
+
+def student_t_test(before, after):
+    """
+    p-value bilaterale del test t con varianza comune: adatto quando, in
+    assenza di cambiamenti, i due gruppi vengono dalla stessa distribuzione
+    (es. pochi campioni recenti contro una baseline lunga); None con meno di
+    2 esecuzioni per lato.
+    """
+    if len(before) < 2 or len(after) < 2:
+        return None
+    df = len(before) + len(after) - 2
+    pooled = ((len(before) - 1) * statistics.variance(before) + (len(after) - 1) * statistics.variance(after)) / df
+    se2 = pooled * (1 / len(before) + 1 / len(after))
+    diff = statistics.fmean(after) - statistics.fmean(before)
+    if se2 == 0:
+        return 1.0 if diff == 0 else 0.0
+    t = diff / math.sqrt(se2)
+    return _betainc(df / 2, 0.5, df / (df + t * t))
+
+
+def load_thresholds(path=None):
+    """Soglie di default aggiornate da un file JSON {"lcp": {"abs": 200, "pct": 5}, ...}"""
+    thresholds = {name: dict(values) for name, values in DEFAULT_THRESHOLDS.items()}
+    if path:
+        with open(path, encoding='utf-8') as f:
+            overrides = json.load(f)
+        unknown = [name for name in overrides if name not in METRICS]
+        if unknown:
+            raise ValueError(f"Metriche sconosciute nelle soglie: {', '.join(unknown)} (disponibili: {', '.join(METRICS)})")
+        for name, values in overrides.items():
+            thresholds[name].update(values)
+    return thresholds
+
+
+def compare_metric(before, after, threshold, alpha=DEFAULT_ALPHA):
+    """
+    Confronto di una metrica: 'regression'/'improvement' se la variazione
+    delle mediane supera le soglie ed è significativa, 'inconclusive' se le
+    supera ma il rumore non permette di dirlo, altrimenti 'unchanged'.
+    """
+    stats_before, stats_after = describe(before), describe(after)
+    delta = stats_after["median"] - stats_before["median"]
+    delta_pct = delta / stats_before["median"] * 100 if stats_before["median"] else None
+    p_value = welch_t_test(before, after)
+    significant = p_value is not None and p_value < alpha
+
+    exceeds = abs(delta) > threshold['abs'] and (delta_pct is None or abs(delta_pct) > threshold['pct'])
+    if not exceeds:
+        status = "unchanged"
+    elif not significant:
+        status = "inconclusive"
+    else:
+        status = "regression" if delta > 0 else "improvement"
+    return {
+        "before": stats_before,
+        "after": stats_after,
+        "delta": round(delta, 4),
+        "delta_pct": round(delta_pct, 2) if delta_pct is not None else None,
+        "p_value": round(p_value, 4) if p_value is not None else None,
+        "significant": significant,
+        "threshold": threshold,
+        "status": status
+    }
+
+
+def compare_runs(before_runs, after_runs, thresholds=None, alpha=DEFAULT_ALPHA):
+    """Confronto metrica per metrica (più le mediane dei punteggi di categoria) tra due gruppi di esecuzioni"""
+    thresholds = thresholds or DEFAULT_THRESHOLDS
+    metrics = {}
+    for name in METRICS:
+        before = [run["metrics"][name] for run in before_runs if run["metrics"].get(name) is not None]
+        after = [run["metrics"][name] for run in after_runs if run["metrics"].get(name) is not None]
+        if before and after:
+            metrics[name] = compare_metric(before, after, thresholds[name], alpha)
+
+    categories = {}
+    for name in CATEGORIES:
+        before = [run["scores"][name] for run in before_runs if name in run["scores"]]
+        after = [run["scores"][name] for run in after_runs if name in run["scores"]]
+        if before and after:
+            before_median, after_median = statistics.median(before), statistics.median(after)
+            categories[name] = {"before": before_median, "after": after_median,
+                                "delta": round(after_median - before_median, 2)}
+
+    return {
+        "runs": {"before": len(before_runs), "after": len(after_runs)},
+        "alpha": alpha,
+        "metrics": metrics,
+        "categories": categories,
+        "regressions": [name for name, result in metrics.items() if result["status"] == "regression"]
+    }
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Ricerca di testi segnaposto e note TODO in un'unica passata
+Visita i nodi di testo della pagina (bs4 o elementi leggeri) e applica a
+ciascuno una sola regex combinata: il testo della pagina non viene mai
+concatenato e ogni match porta con sé l'elemento che lo contiene e un
+estratto del testo intorno. I match non attraversano i confini tra nodi
+(es. "lorem <b>ipsum</b>").
+"""
+
+from html_parsing import LiteElement
+
+# Caratteri di contesto mostrati prima e dopo il match
+CONTEXT_CHARS = 40
+
+
+def text_nodes(root):
+    """(testo, elemento che lo contiene) in ordine di documento, come get_text()"""
+    # Niente hasattr: sui Tag di bs4 un attributo sconosciuto è una ricerca per nome
+    if isinstance(root, LiteElement):
+        return root.text_nodes()
+    return ((text, text.parent) for text in root.strings)
+
+
+def context(text, start, end, width=CONTEXT_CHARS):
+    """Estratto del nodo intorno al match, con gli spazi compattati"""
+    snippet = ' '.join(text[max(0, start - width):end + width].split())
+    return ('…' if start > width else '') + snippet + ('…' if end + width < len(text) else '')
+
+
+def scan_text_nodes(root, matcher, selector):
+    """
+    Match di `matcher` (audit_rules.RuleMatcher) nei nodi di testo.
+    `selector(elemento)` genera il selettore CSS, calcolato una volta per elemento.
+    """
+    selectors = {}
+    for text, element in text_nodes(root):
+        if not text or text.isspace():
+            continue
+        for match, rule in matcher.finditer(text):
+            key = id(element)
+            if key not in selectors:
+                selectors[key] = selector(element) if element is not None else None
+            yield {
+                "rule": rule,
+                "text": match.group(),
+                "tag": element.name if element is not None else None,
+                "selector": selectors[key],
+                "context": context(text, match.start(), match.end())
+            }
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Motore di probing concorrente per WebsiteAuditor
+Esegue richieste HEAD/GET/POST su un pool di worker limitato, con limiti
+per host e un tetto globale di richieste in volo. Oltre il limite le
+richieste aspettano in una coda per host, fuori dal pool. Le richieste HEAD/GET sono
+memorizzate per URL normalizzato: ogni URL distinto viene richiesto una sola
+volta per run, anche se più sezioni lo chiedono contemporaneamente.
+La cache tiene solo l'esito dei probe (status, header, byte del corpo) ed è
+una LRU limitata, così resta piccola anche su crawl di migliaia di pagine.
+"""
+
+import contextvars
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse, urlunparse
+
+from audit_profiler import record
+from response_headers import ACCEPT_ENCODING_PROBE
+
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+CACHEABLE_METHODS = ('HEAD', 'GET')
+# Header di tutte le HEAD: link e asset condividono così la stessa voce in cache
+HEAD_HEADERS = {'Accept-Encoding': ACCEPT_ENCODING_PROBE}
+# Voci tenute nella cache dei probe (richieste HEAD/GET e chiamate con cache_key)
+PROBE_CACHE_SIZE = 4096
+
+
+def normalize_url(url):
+    """Normalizza un URL per il confronto: schema/host minuscoli, niente porta di default né fragment"""
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parsed.port}"
+    if parsed.username:
+        host = f"{parsed.username}@{host}"
+    return urlunparse((scheme, host, parsed.path or '/', parsed.params, parsed.query, ''))
+
+
+class ProbeResult:
+    """
+    Esito di un probe HEAD/GET senza il corpo: status, header, URL finale,
+    versione HTTP e byte ricevuti. È quello che resta in cache al posto della Response.
+    """
+
+    __slots__ = ('status_code', 'headers', 'url', 'reason', 'version', 'size')
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = response.url
+        self.reason = response.reason
+        self.version = getattr(response.raw, 'version', None)
+        self.size = len(response.content or b'')
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+
+class ProbeEngine:
+    def __init__(self, session, max_workers=16, per_host_limit=4, cache_size=PROBE_CACHE_SIZE):
+        self.session = session
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self.cache_size = max(1, cache_size)
+        self._executor = None
+        self._lock = threading.Lock()
+        # Richieste in corso e in attesa per host
+        self._active = {}
+        self._queues = {}
+        self._cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _schedule(self, url, fn, *args):
+        """
+        Future per fn(*args) verso l'host di `url`. Il lavoro entra nel pool solo
+        quando l'host ha uno slot libero, altrimenti aspetta nella coda dell'host:
+        le richieste a un host lento non occupano worker che servirebbero agli altri.
+        Va chiamato con self._lock acquisito.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='probe')
+        host = urlparse(url).netloc.lower()
+        # Il contesto del chiamante segue la richiesta nel pool (contatori per sezione)
+        task = (Future(), contextvars.copy_context(), fn, args)
+        if self._active.get(host, 0) < self.per_host_limit:
+            self._active[host] = self._active.get(host, 0) + 1
+            self._start(host, task)
+        else:
+            self._queues.setdefault(host, deque()).append(task)
+        return task[0]
+
+    def _start(self, host, task):
+        future = task[0]
+
+        def cancelled(work):
+            # Pool chiuso prima che il lavoro partisse
+            if work.cancelled():
+                future.cancel()
+                self._release(host)
+
+        self._executor.submit(self._run, host, task).add_done_callback(cancelled)
+
+    def _run(self, host, task):
+        future, context, fn, args = task
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = context.run(fn, *args)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            self._release(host)
+
+    def _release(self, host):
+        """Passa lo slot dell'host al primo lavoro in coda, o lo libera"""
+        with self._lock:
+            queue = self._queues.get(host)
+            if queue and self._executor is not None:
+                self._start(host, queue.popleft())
+                if not queue:
+                    del self._queues[host]
+                return
+            self._active[host] -= 1
+            if not self._active[host]:
+                del self._active[host]
+
+    def _cached(self, key, url, fn, *args):
+        """
+        Future condiviso per `key`: verifica e inserimento avvengono sotto lo
+        stesso lock, così due sezioni in parallelo non duplicano la richiesta.
+        Oltre `cache_size` voci esce la meno usata di recente (chi ha già il
+        Future continua a usarlo).
+        """
+        with self._lock:
+            future = self._cache.get(key)
+            if future is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                record("cache_hits")
+                return future
+            self.cache_misses += 1
+            future = self._schedule(url, fn, *args)
+            self._cache[key] = future
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return future
+
+    def _send(self, method, url, kwargs):
+        if method == 'HEAD':
+            # Stesso comportamento di Session.head()
+            kwargs.setdefault('allow_redirects', False)
+            kwargs['headers'] = dict(HEAD_HEADERS, **(kwargs.get('headers') or {}))
+        return self.session.request(method, url, **kwargs)
+
+    def _probe(self, method, url, kwargs):
+        import requests
+
+        response = self._send(method, url, kwargs)
+        if not isinstance(response, requests.Response):
+            return response
+        # In cache resta solo l'esito: il corpo e la connessione vengono rilasciati
+        result = ProbeResult(response)
+        response.close()
+        return result
+
+    def request(self, method, url, **kwargs):
+        """
+        Accoda una richiesta e restituisce un Future: Response per i metodi
+        non memorizzati, ProbeResult (senza corpo) per HEAD e GET
+        """
+        method = method.upper()
+        if method not in CACHEABLE_METHODS:
+            with self._lock:
+                return self._schedule(url, self._send, method, url, kwargs)
+
+        # Un Future già presente copre sia le risposte concluse sia quelle in volo;
+        # le richieste condizionali hanno una voce separata (HEAD_HEADERS non entrano nella chiave)
+        key = (method, normalize_url(url))
+        if kwargs.get('headers'):
+            key += tuple(sorted(kwargs['headers'].items()))
+        return self._cached(key, url, self._probe, method, url, kwargs)
+
+    def call(self, url, fn, *args, cache_key=None):
+        """
+        Esegue una funzione arbitraria nel pool rispettando il limite per host di `url`.
+        Con `cache_key` il risultato è condiviso come per le richieste HEAD/GET.
+        """
+        if cache_key is None:
+            with self._lock:
+                return self._schedule(url, fn, *args)
+        return self._cached(cache_key, url, fn, *args)
+
+    def cache_stats(self):
+        """Contatori della cache dei probe per i metadata dell'audit"""
+        with self._lock:
+            return {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "unique_urls": len(self._cache)
+            }
+
+    def map(self, calls):
+        """Esegue tutte le richieste (method, url, kwargs) e restituisce i Future nell'ordine di input"""
+        return [self.request(method, url, **kwargs) for method, url, kwargs in calls]
+
+    def imap(self, calls, window=None):
+        """
+        Restituisce i Future nell'ordine di input, tenendo in volo al massimo
+        `window` richieste. Se il consumatore si ferma non vengono accodate
+        altre richieste; quelle già partite (fino a `window`) restano in cache
+        per le altre sezioni. Con un tetto sul numero di probe conviene passare
+        solo le richieste entro il tetto, o una `window` non più grande.
+        """
+        window = window or self.max_workers
+        pending = deque()
+        for method, url, kwargs in calls:
+            pending.append(self.request(method, url, **kwargs))
+            if len(pending) >= window:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+
+    def close(self):
+        """Chiude il pool di worker, annullando le richieste ancora in coda"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            queued = [task for queue in self._queues.values() for task in queue]
+            self._queues.clear()
+        for future, _, _, _ in queued:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
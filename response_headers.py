@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Analisi degli header di risposta: cache HTTP, compressione, Vary e versione
+Per ogni risorsa calcola il TTL effettivo (come farebbe una cache del
+browser), verifica che i contenuti testuali siano compressi e che Vary non
+renda le risposte incacheabili o le frammenti, poi assegna un punteggio
+0-100 per risorsa e per sito.
+"""
+
+import email.utils
+import time
+
+# Accept-Encoding inviato nelle HEAD degli asset: senza corpo, br si verifica anche senza decoder
+ACCEPT_ENCODING_PROBE = 'br, gzip, deflate'
+
+# TTL (secondi) oltre cui una risorsa statica è considerata ben cacheata
+LONG_TTL = 30 * 24 * 3600
+SHORT_TTL = 7 * 24 * 3600
+# Cache euristica dei browser: 10% del tempo dall'ultima modifica
+HEURISTIC_FRACTION = 0.1
+
+COMPRESSIBLE_TYPES = ('text/', 'javascript', 'json', 'xml', 'svg', 'font/ttf', 'font/otf', 'wasm')
+# Vary che frammentano la cache: una copia per ogni user agent o cookie
+FRAGMENTING_VARY = {'user-agent', 'cookie'}
+SECURITY_HEADERS = ('strict-transport-security', 'content-security-policy', 'x-content-type-options',
+                    'x-frame-options', 'referrer-policy', 'permissions-policy')
+HTTP_VERSIONS = {10: 'HTTP/1.0', 11: 'HTTP/1.1', 20: 'HTTP/2'}
+
+# Peso di cache, compressione e Vary nel punteggio di ogni risorsa
+SCORE_WEIGHTS = {'cache': 0.6, 'compression': 0.3, 'vary': 0.1}
+
+
+def parse_cache_control(value):
+    """'public, max-age=60' -> {'public': True, 'max-age': '60'}"""
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else True
+    return directives
+
+
+def _http_date(value):
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def effective_ttl(headers, now=None):
+    """(ttl in secondi, origine) per una cache privata; origine None se non cacheabile né validabile"""
+    directives = parse_cache_control(headers.get('cache-control'))
+    if 'no-store' in directives:
+        return 0, 'no-store'
+    if 'no-cache' in directives:
+        return 0, 'no-cache'
+    if 'max-age' in directives:
+        try:
+            return max(0, int(directives['max-age'])), 'max-age'
+        except ValueError:
+            return 0, 'max-age'
+
+    date = _http_date(headers.get('date')) or (now if now is not None else time.time())
+    if headers.get('expires'):
+        expires = _http_date(headers['expires'])
+        # Expires non valido (es. "0") equivale a già scaduto
+        return max(0, int(expires - date)) if expires else 0, 'expires'
+    last_modified = _http_date(headers.get('last-modified'))
+    if last_modified:
+        return max(0, int((date - last_modified) * HEURISTIC_FRACTION)), 'heuristic'
+    return 0, None
+
+
+def http_version(response):
+    # ProbeResult conserva la versione, una Response la espone su raw
+    raw = getattr(response, 'raw', None)
+    version = getattr(response, 'version', None) if raw is None else getattr(raw, 'version', None)
+    if isinstance(version, str):
+        return version
+    return HTTP_VERSIONS.get(version)
+
+
+def is_compressible(content_type):
+    content_type = (content_type or '').lower()
+    return any(marker in content_type for marker in COMPRESSIBLE_TYPES)
+
+
+def _cache_score(resource_type, ttl, source, validator):
+    if resource_type == 'document':
+        # Le pagine cambiano: conta che siano rivalidabili, non che durino a lungo
+        return 100 if validator or source == 'no-store' else 50
+    if ttl >= LONG_TTL:
+        return 100
+    if ttl >= SHORT_TTL:
+        return 80
+    if ttl >= 24 * 3600:
+        return 60
+    if ttl > 0:
+        return 40
+    return 20 if validator else 0
+
+
+def analyze_response(url, resource_type, status, headers, version=None, now=None):
+    """Header di una risposta -> voce del report con problemi e punteggio"""
+    ttl, source = effective_ttl(headers, now)
+    validator = bool(headers.get('etag') or headers.get('last-modified'))
+    encoding = (headers.get('content-encoding') or '').lower() or None
+    compressible = is_compressible(headers.get('content-type'))
+    vary = {v.strip().lower() for v in (headers.get('vary') or '').split(',') if v.strip()}
+
+    issues = []
+    if source is None and not validator:
+        issues.append("no_cache_headers")
+    elif resource_type != 'document':
+        if source == 'no-store':
+            issues.append("static_no_store")
+        elif ttl < SHORT_TTL:
+            issues.append("short_ttl")
+    if not validator and resource_type == 'document' and source != 'no-store':
+        issues.append("no_validator")
+    if compressible and not encoding:
+        issues.append("not_compressed")
+    if encoding and 'accept-encoding' not in vary and '*' not in vary:
+        issues.append("missing_vary_accept_encoding")
+    if '*' in vary:
+        issues.append("vary_star")
+    if vary & FRAGMENTING_VARY:
+        issues.append("vary_fragmenting")
+
+    compression_score = 100 if not compressible or encoding else 0
+    vary_score = 0 if {'vary_star', 'missing_vary_accept_encoding', 'vary_fragmenting'} & set(issues) else 100
+    score = (SCORE_WEIGHTS['cache'] * _cache_score(resource_type, ttl, source, validator) +
+             SCORE_WEIGHTS['compression'] * compression_score +
+             SCORE_WEIGHTS['vary'] * vary_score)
+
+    return {
+        "url": url,
+        "type": resource_type,
+        "status": status,
+        "http_version": version,
+        "cache_control": headers.get('cache-control'),
+        "expires": headers.get('expires'),
+        "etag": headers.get('etag') is not None,
+        "last_modified": headers.get('last-modified') is not None,
+        "ttl_seconds": ttl,
+        "ttl_source": source,
+        "content_encoding": encoding,
+        "compressible": compressible,
+        "vary": sorted(vary),
+        "issues": issues,
+        "score": round(score)
+    }
+
+
+def security_headers(headers):
+    """Header di sicurezza della pagina: valore oppure None se assente"""
+    return {name: headers.get(name) for name in SECURITY_HEADERS}
+
+
+def summarize_headers(resources):
+    """Punteggio del sito (media delle risorse), versioni HTTP e problemi per tipo"""
+    issues, versions = {}, {}
+    for resource in resources:
+        for issue in resource.get("issues", []):
+            issues[issue] = issues.get(issue, 0) + 1
+        if resource.get("http_version"):
+            versions[resource["http_version"]] = versions.get(resource["http_version"], 0) + 1
+    # Le risorse senza header utilizzabili (errori, HEAD rifiutate) non hanno punteggio
+    scores = [resource["score"] for resource in resources if resource.get("score") is not None]
+    return {
+        "score": round(sum(scores) / len(scores)) if scores else None,
+        "resources": len(resources),
+        "http_versions": versions,
+        "issues": issues
+    }
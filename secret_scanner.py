@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Scanner di secrets a passata singola
+Tutte le regole sono compilate una volta all'import. Un'unica regex di
+ancore letterali (api_key, token, sk-, AIza, ...) scorre il testo una sola
+volta; solo nei punti in cui compare un'ancora viene provata la regola
+completa. Il testo può arrivare a blocchi (bundle JS esterni in streaming).
+"""
+
+import re
+
+
+# (tipo, regex completa, ancora letterale con cui la regex inizia)
+SECRET_RULES = [
+    ('API Key', r'api[_-]?key["\']?\s*[:=]\s*["\']([^"\'\s]{20,})', r'api[_-]?key'),
+    ('Secret Key', r'secret[_-]?key["\']?\s*[:=]\s*["\']([^"\'\s]{20,})', r'secret[_-]?key'),
+    ('Password', r'password["\']?\s*[:=]\s*["\']([^"\'\s]{8,})', r'password'),
+    ('Token', r'token["\']?\s*[:=]\s*["\']([^"\'\s]{20,})', r'token'),
+    ('OpenAI API Key', r'sk-[a-zA-Z0-9]{48}', r'sk-'),
+    ('Google API Key', r'AIza[0-9A-Za-z\-_]{35}', r'AIza'),
+]
+
+
+def compile_rules(rules):
+    """Compila le regole: (regex delle ancore, [(tipo, regex completa)])"""
+    anchors = re.compile(
+        '|'.join(f'(?P<r{i}>{anchor})' for i, (_, _, anchor) in enumerate(rules)),
+        re.IGNORECASE
+    )
+    compiled = [(secret_type, re.compile(pattern, re.IGNORECASE)) for secret_type, pattern, _ in rules]
+    return anchors, compiled
+
+
+_DEFAULT_RULES = compile_rules(SECRET_RULES)
+
+
+def mask(value):
+    return value[:10] + "..." if len(value) > 10 else value
+
+
+class ChunkScan:
+    """
+    Scansione incrementale di un testo che arriva a blocchi. Ogni carattere
+    viene esaminato una volta; si tiene solo una coda di `overlap` caratteri
+    per le regole che attraversano il confine tra due blocchi.
+    """
+
+    def __init__(self, scanner, source):
+        self.scanner = scanner
+        self.source = source
+        self.findings = []
+        self._buffer = ''
+        self._buffer_offset = 0
+        self._buffer_line = 1
+        self._next_anchor = 0
+        self._last_end = {}
+        self._seen = set()
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        self._scan(final=False)
+
+    def close(self):
+        self._scan(final=True)
+        self._buffer = ''
+        return self.findings
+
+    def _scan(self, final):
+        buffer = self._buffer
+        # Le ancore troppo vicine alla fine aspettano il blocco successivo
+        limit = len(buffer) if final else len(buffer) - self.scanner.overlap
+        if limit <= self._next_anchor:
+            return
+
+        anchors, rules = self.scanner.rules
+        line, line_pos = self._buffer_line, 0
+        for anchor in anchors.finditer(buffer, self._next_anchor):
+            start = anchor.start()
+            if start >= limit:
+                break
+            self._next_anchor = anchor.end()
+            index = int(anchor.lastgroup[1:])
+            secret_type, rule = rules[index]
+
+            absolute = self._buffer_offset + start
+            # Come re.findall: le occorrenze della stessa regola non si sovrappongono
+            if absolute < self._last_end.get(index, 0):
+                continue
+            match = rule.match(buffer, start)
+            if not match:
+                continue
+            self._last_end[index] = self._buffer_offset + match.end()
+
+            key = (secret_type, absolute)
+            if key in self._seen:
+                continue
+            self._seen.add(key)
+            line += buffer.count('\n', line_pos, start)
+            line_pos = start
+            value = match.group(1) if rule.groups else match.group(0)
+            self.findings.append({
+                "type": secret_type,
+                "value": mask(value),
+                "severity": "CRITICAL",
+                "source": self.source,
+                "offset": absolute,
+                "line": line
+            })
+        else:
+            self._next_anchor = max(self._next_anchor, limit)
+
+        if final:
+            return
+        # Scarta il testo già esaminato, conservando la coda per il prossimo blocco
+        keep_from = min(self._next_anchor, limit)
+        self._buffer_line += buffer.count('\n', 0, keep_from)
+        self._buffer = buffer[keep_from:]
+        self._buffer_offset += keep_from
+        self._next_anchor -= keep_from
+
+
+class SecretScanner:
+    def __init__(self, rules=None, overlap=1024):
+        self.rules = compile_rules(rules) if rules is not None else _DEFAULT_RULES
+        self.overlap = overlap
+
+    def stream(self, source):
+        """Restituisce una scansione incrementale da alimentare con feed()"""
+        return ChunkScan(self, source)
+
+    def scan(self, text, source='html'):
+        scan = self.stream(source)
+        scan.feed(text)
+        return scan.close()
+
+    def scan_chunks(self, chunks, source):
+        scan = self.stream(source)
+        for chunk in chunks:
+            scan.feed(chunk)
+        return scan.close()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Scheduler delle sezioni di audit come grafo di dipendenze
+Ogni sezione dichiara le risorse che usa ('dom', 'network') e le sezioni
+di cui legge l'output. Le sezioni di rete girano in un pool di thread e si
+sovrappongono tra loro; quelle di sola analisi del DOM girano nel thread
+chiamante mentre le richieste sono in volo.
+"""
+
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# name: chiave nel report; method: metodo di WebsiteAuditor; needs: risorse; after: dipendenze
+SectionSpec = namedtuple('SectionSpec', ['name', 'method', 'needs', 'after'])
+
+
+def select_sections(specs, selected=None):
+    """
+    Sottoinsieme delle sezioni richieste, con le loro dipendenze, nell'ordine
+    originale. Solleva ValueError per nomi sconosciuti.
+    """
+    if not selected:
+        return list(specs)
+    by_name = {spec.name: spec for spec in specs}
+    unknown = [name for name in selected if name not in by_name]
+    if unknown:
+        raise ValueError(f"Sezioni sconosciute: {', '.join(unknown)} (disponibili: {', '.join(by_name)})")
+
+    wanted = set()
+    stack = list(selected)
+    while stack:
+        name = stack.pop()
+        if name not in wanted:
+            wanted.add(name)
+            stack.extend(by_name[name].after)
+    return [spec for spec in specs if spec.name in wanted]
+
+
+def parse_sections_arg(value):
+    """'a,b , c' -> ['a', 'b', 'c']; None o stringa vuota -> None (tutte)"""
+    if not value:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()] or None
+
+
+class SectionScheduler:
+    def __init__(self, specs, max_workers=4):
+        self.specs = list(specs)
+        self.max_workers = max(1, max_workers)
+        names = {spec.name for spec in self.specs}
+        for spec in self.specs:
+            missing = [name for name in spec.after if name not in names]
+            if missing:
+                raise ValueError(f"La sezione {spec.name} dipende da sezioni non selezionate: {', '.join(missing)}")
+
+    def run(self, execute, on_complete=None, parallel=True):
+        """
+        Esegue le sezioni rispettando le dipendenze. `execute(spec, results)`
+        calcola una sezione; `on_complete(spec, output)` è chiamata, nel thread
+        chiamante, appena una sezione termina. Restituisce i risultati
+        nell'ordine di dichiarazione, indipendentemente dall'ordine di completamento.
+        """
+        results = {}
+        if not parallel:
+            for spec in self.specs:
+                results[spec.name] = execute(spec, results)
+                if on_complete:
+                    on_complete(spec, results[spec.name])
+            return {spec.name: results[spec.name] for spec in self.specs}
+
+        remaining = list(self.specs)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='section') as pool:
+            while remaining or running:
+                ready = [spec for spec in remaining if all(name in results for name in spec.after)]
+                for spec in ready:
+                    remaining.remove(spec)
+
+                # Prima si avviano le sezioni di rete, poi si analizza il DOM mentre sono in volo
+                for spec in ready:
+                    if 'network' in spec.needs:
+                        running[pool.submit(execute, spec, results)] = spec
+                local = [spec for spec in ready if 'network' not in spec.needs]
+                for spec in local:
+                    results[spec.name] = execute(spec, results)
+                    if on_complete:
+                        on_complete(spec, results[spec.name])
+                if local:
+                    continue
+
+                if not running:
+                    raise ValueError(f"Dipendenze circolari tra le sezioni: {', '.join(s.name for s in remaining)}")
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    spec = running.pop(future)
+                    results[spec.name] = future.result()
+                    if on_complete:
+                        on_complete(spec, results[spec.name])
+
+        return {spec.name: results[spec.name] for spec in self.specs}
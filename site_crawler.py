@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Crawler multi-pagina per WebsiteAuditor
+Visita le pagine interne raggiungibili dall'URL di partenza (BFS per livelli)
+ed esegue su ognuna le sezioni di audit, rispettando robots.txt e un
+intervallo minimo tra richieste allo stesso host.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from asset_weight import MAX_ASSET_BYTES
+from html_parsing import resolve_backend
+from http_transport import HttpTransport
+from probe_engine import ProbeEngine, normalize_url
+from website_auditor import USER_AGENT, WebsiteAuditor, count_issues
+
+
+class HostThrottle:
+    """Garantisce un intervallo minimo tra due richieste verso lo stesso host"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def set_delay(self, delay):
+        with self._lock:
+            self.delay = max(self.delay, delay)
+
+    def wait(self, host):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class CrawlFrontier:
+    """Coda BFS deduplicata per URL normalizzato, con limiti di profondità e pagine"""
+
+    def __init__(self, max_depth, max_pages):
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.seen = set()
+        self.levels = {}
+
+    def add(self, url, depth):
+        """Aggiunge un URL se nuovo ed entro i limiti; restituisce True se accodato"""
+        key = normalize_url(url)
+        if depth > self.max_depth or key in self.seen or len(self.seen) >= self.max_pages:
+            return False
+        self.seen.add(key)
+        self.levels.setdefault(depth, []).append(url)
+        return True
+
+    def pop_level(self, depth):
+        return self.levels.pop(depth, [])
+
+
+class SiteCrawler:
+    def __init__(self, start_url, max_depth=2, max_pages=50, page_workers=4,
+                 crawl_delay=0.5, respect_robots=True, max_workers=16, per_host_limit=4,
+                 parser='html.parser', scan_external_js=True, cache=None, sink=None, transport=None,
+                 sections=None, parallel_sections=True, asset_budgets=None, max_asset_bytes=MAX_ASSET_BYTES,
+                 rules=None, store=None):
+        self.start_url = start_url
+        self.host = urlparse(start_url).netloc.lower()
+        self.page_workers = max(1, page_workers)
+        self.respect_robots = respect_robots
+        self.frontier = CrawlFrontier(max_depth, max_pages)
+        self.throttle = HostThrottle(crawl_delay)
+        self.robots = None
+        self.parser = resolve_backend(parser)
+        self.scan_external_js = scan_external_js
+        self.cache = cache
+        self.sink = sink
+        # routes_and_links serve comunque per scoprire le pagine da visitare
+        self.sections = sorted(set(sections) | {"routes_and_links"}) if sections else None
+        self.parallel_sections = parallel_sections
+        self.asset_budgets = asset_budgets
+        self.max_asset_bytes = max_asset_bytes
+        self.rules = rules
+        # Archivio compatto opzionale (finding_store.FindingStore) per il dettaglio delle pagine
+        self.store = store
+        self.sections_from_cache = 0
+
+        # Session e cache dei probe condivise da tutte le pagine
+        self.transport = transport or HttpTransport(pool_size=max_workers)
+        self.session = self.transport.create_session(USER_AGENT)
+        self.probe = ProbeEngine(self.session, max_workers=max_workers,
+                                 per_host_limit=per_host_limit)
+
+    def _load_robots(self):
+        """Scarica e interpreta robots.txt; se non disponibile tutto è permesso"""
+        robots_url = urljoin(self.start_url, '/robots.txt')
+        parser = RobotFileParser(robots_url)
+        try:
+            response = self.session.get(robots_url, timeout=10)
+            if response.status_code in (401, 403):
+                parser.disallow_all = True
+            elif response.status_code < 400:
+                parser.parse(response.text.splitlines())
+            else:
+                parser.allow_all = True
+        except requests.RequestException:
+            parser.allow_all = True
+        self.robots = parser
+
+        delay = parser.crawl_delay(USER_AGENT)
+        if delay:
+            self.throttle.set_delay(float(delay))
+
+    def _allowed(self, url):
+        if not self.respect_robots or self.robots is None:
+            return True
+        return self.robots.can_fetch(USER_AGENT, url)
+
+    def _is_internal(self, url):
+        parsed = urlparse(url)
+        return parsed.scheme in ('http', 'https') and parsed.netloc.lower() == self.host
+
+    def _audit_page(self, url, depth):
+        """Scarica una pagina ed esegue tutte le sezioni di audit"""
+        self.throttle.wait(urlparse(url).netloc.lower())
+        auditor = WebsiteAuditor(url, session=self.session, probe=self.probe, parser=self.parser,
+                                 scan_external_js=self.scan_external_js, cache=self.cache,
+                                 sink=self.sink, transport=self.transport, sections=self.sections,
+                                 parallel_sections=self.parallel_sections, asset_budgets=self.asset_budgets,
+                                 max_asset_bytes=self.max_asset_bytes, rules=self.rules)
+        try:
+            response = auditor.fetch_page(require_html=True)
+        except (requests.RequestException, ValueError) as e:
+            return {"url": url, "depth": depth, "error": str(e)}, []
+
+        sections = auditor.audit_sections()
+
+        discovered = []
+        for link in sections["routes_and_links"]["internal_links"]:
+            target = link["full_url"].split('#', 1)[0]
+            if self._is_internal(target):
+                discovered.append(target)
+
+        page = {
+            "url": url,
+            "depth": depth,
+            "status": response.status_code,
+            "issues": count_issues(sections),
+            "audit": sections
+        }
+        if self.cache is not None:
+            page["cache"] = auditor.cache_report["page"]
+        return page, discovered
+
+    def crawl(self):
+        """Esegue il crawl e restituisce il report aggregato con il dettaglio per pagina"""
+        print(f"🕷️  Crawl di {self.start_url}...")
+        metadata = {
+            "url": self.start_url,
+            "audit_date": datetime.now().isoformat(),
+            "audit_version": "1.0",
+            "mode": "crawl",
+            "max_depth": self.frontier.max_depth,
+            "max_pages": self.frontier.max_pages
+        }
+        if self.sink is not None:
+            self.sink.write({"type": "start", "mode": "crawl", "metadata": metadata})
+        if self.respect_robots:
+            self._load_robots()
+
+        pages, skipped = [], []
+        summary = CrawlSummary()
+        self.frontier.add(self.start_url, 0)
+
+        with ThreadPoolExecutor(max_workers=self.page_workers, thread_name_prefix='crawl') as pool:
+            depth = 0
+            while depth <= self.frontier.max_depth:
+                level = []
+                for url in self.frontier.pop_level(depth):
+                    if self._allowed(url):
+                        level.append(url)
+                    else:
+                        self._skip(skipped, {"url": url, "depth": depth, "reason": "robots.txt"})
+                if not level:
+                    break
+
+                # Le pagine di un livello sono scaricate in parallelo, i risultati restano in ordine
+                for page, discovered in pool.map(self._audit_page, level, [depth] * len(level)):
+                    if "error" in page:
+                        self._skip(skipped, {"url": page["url"], "depth": depth, "reason": page["error"]})
+                        continue
+                    summary.add(page)
+                    if page.get("cache") in ("not_modified", "unchanged"):
+                        self.sections_from_cache += len(page["audit"])
+                    if self.sink is not None:
+                        # In streaming il dettaglio è già su file: in memoria resta solo il riepilogo
+                        page.pop("audit")
+                        self.sink.write({"type": "page", "page": page})
+                    self._keep(pages, page)
+                    print(f"📄 [{summary.pages}] {page['url']}")
+                    for target in discovered:
+                        self.frontier.add(target, depth + 1)
+                depth += 1
+
+        metadata["probe_cache"] = self.probe.cache_stats()
+        metadata["transport"] = self.transport.report()
+        metadata.update(self._cache_metadata())
+        report = {
+            "metadata": metadata,
+            "summary": summary.as_dict(len(skipped)),
+            "pages": self._pages(pages),
+            "skipped": skipped
+        }
+        if self.sink is not None:
+            self.sink.write({"type": "summary", "data": report["summary"]})
+            self.sink.write({"type": "metadata", "metadata": metadata})
+        return report
+
+    def _keep(self, pages, page):
+        """Conserva il dettaglio della pagina: nella lista o, se c'è, nell'archivio compatto"""
+        if self.store is None:
+            pages.append(page)
+        else:
+            self.store.add(page)
+
+    def _pages(self, pages):
+        return pages if self.store is None else self.store
+
+    def _skip(self, skipped, entry):
+        skipped.append(entry)
+        if self.sink is not None:
+            self.sink.write({"type": "skipped", "data": entry})
+
+    def _cache_metadata(self):
+        metadata = {}
+        if self.store is not None:
+            metadata["finding_store"] = self.store.stats()
+        if self.cache is not None:
+            metadata["cache"] = dict(self.cache.stats(), sections_from_cache=self.sections_from_cache)
+        return metadata
+
+
+class CrawlSummary:
+    """Riepilogo aggregato aggiornato pagina per pagina"""
+
+    def __init__(self):
+        self.pages = 0
+        self.issues = {"critical": 0, "high": 0, "medium": 0, "low": 0}
+        self.broken_links = set()
+        self.broken_assets = set()
+        self.total_size_kb = 0
+        self.pages_over_budget = 0
+        self.header_scores = []
+
+    def add(self, page):
+        self.pages += 1
+        for severity, count in page["issues"].items():
+            self.issues[severity] += count
+        audit = page["audit"]
+        for broken in audit["routes_and_links"]["broken_links"]:
+            self.broken_links.add(broken["url"])
+        headers = audit.get("response_headers")
+        if headers and headers["score"] is not None:
+            self.header_scores.append(headers["score"])
+        # Con --sections le sezioni degli asset possono mancare
+        assets = audit.get("missing_assets")
+        if assets is None:
+            return
+        for category in ('css_files', 'js_files', 'images', 'other_assets'):
+            for asset in assets[category]:
+                if not asset.get("accessible"):
+                    self.broken_assets.add(asset["url"])
+        self.total_size_kb += assets["total_size_kb"]
+        if assets.get("budget_violations"):
+            self.pages_over_budget += 1
+
+    def as_dict(self, skipped):
+        return {
+            "pages_audited": self.pages,
+            "pages_skipped": skipped,
+            "issues": self.issues,
+            "unique_broken_links": sorted(self.broken_links),
+            "unique_broken_assets": sorted(self.broken_assets),
+            "total_size_kb": round(self.total_size_kb, 2),
+            "pages_over_budget": self.pages_over_budget,
+            # Punteggio degli header di cache/compressione: media delle pagine
+            "response_headers_score": (round(sum(self.header_scores) / len(self.header_scores))
+                                       if self.header_scores else None)
+        }
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Audit pianificato dalla sitemap
+Legge sitemap e sitemap index (anche .gz) in streaming, senza caricarle
+intere, e confronta ogni URL con il report del run precedente:
+- lastmod più recente, o pagina mai vista: audit completo
+- lastmod uguale o più vecchio: i risultati precedenti vengono riusati
+  senza nessuna richiesta
+- lastmod assente: la pagina viene scaricata e, se l'hash del contenuto
+  non è cambiato, le sezioni non vengono rieseguite
+I risultati riusati finiscono nel report insieme a quelli nuovi; dopo
+max_age_days una pagina viene comunque rianalizzata (asset e link esterni
+possono rompersi anche se la pagina non cambia).
+"""
+
+import gzip
+import json
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+from asset_weight import DEFAULT_BUDGETS_KB
+from audit_stream import read_stream
+from probe_engine import normalize_url
+from site_crawler import CrawlSummary, SiteCrawler
+from website_auditor import WebsiteAuditor, count_issues
+
+# Limiti del protocollo sitemap: 50.000 URL per file, indici annidati di poco
+MAX_SITEMAP_URLS = 50000
+MAX_SITEMAP_DEPTH = 3
+DEFAULT_MAX_AGE_DAYS = 7
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def parse_lastmod(value):
+    """Data W3C (2024-05-01, 2024-05-01T10:00:00+02:00, ...Z) in UTC; None se non valida"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+class ChunkReader:
+    """File binario in sola lettura sopra un iteratore di blocchi (es. Response.iter_content)"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = b''
+
+    def _fill(self, size):
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+
+    def peek(self, size):
+        self._fill(size)
+        return self.buffer[:size]
+
+    def read(self, size=-1):
+        self._fill(size if size is not None else -1)
+        if size is None or size < 0:
+            data, self.buffer = self.buffer, b''
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def open_body(chunks):
+    """Corpo della sitemap come file binario, decomprimendo i .gz serviti senza Content-Encoding"""
+    reader = ChunkReader(chunks)
+    if reader.peek(2) == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=reader)
+    return reader
+
+
+def iter_sitemap(stream):
+    """
+    ('url' | 'sitemap', loc, lastmod) per ogni voce, in ordine. Gli elementi
+    vengono liberati appena letti: la memoria non cresce con la sitemap.
+    """
+    root = None
+    loc = lastmod = None
+    for event, element in ET.iterparse(stream, events=('start', 'end')):
+        if root is None:
+            root = element
+            continue
+        if event == 'start':
+            continue
+        name = element.tag.rsplit('}', 1)[-1]
+        if name == 'loc':
+            loc = (element.text or '').strip()
+        elif name == 'lastmod':
+            lastmod = (element.text or '').strip()
+        elif name in ('url', 'sitemap'):
+            if loc:
+                yield name, loc, lastmod
+            loc = lastmod = None
+            root.clear()
+
+
+def load_previous(path):
+    """Report del run precedente (JSON o JSONL) come (metadata, {URL normalizzato: pagina})"""
+    if not path or not os.path.exists(path):
+        return {}, {}
+    if '.jsonl' in os.path.basename(path):
+        report = read_stream(path)
+    else:
+        with open(path, encoding='utf-8') as f:
+            report = json.load(f)
+    pages = {normalize_url(page["url"]): page for page in report.get("pages", []) if page.get("audit")}
+    return report.get("metadata", {}), pages
+
+
+def plan_entry(lastmod, previous, now, max_age):
+    """
+    Stato di una voce della sitemap rispetto al run precedente:
+    'new', 'changed', 'unchanged' (riuso senza richieste) o 'check' (confronto dell'hash)
+    """
+    if previous is None:
+        return 'new'
+    audited_at = parse_lastmod(previous.get("audited_at"))
+    if audited_at is None or now - audited_at > max_age:
+        return 'changed'
+    current, before = parse_lastmod(lastmod), parse_lastmod(previous.get("lastmod"))
+    if current is None or before is None:
+        return 'check' if previous.get("content_hash") else 'changed'
+    return 'unchanged' if current <= before else 'changed'
+
+
+class SitemapAuditor(SiteCrawler):
+    """Audit delle pagine elencate nelle sitemap, solo quelle nuove o cambiate"""
+
+    def __init__(self, start_url, sitemaps=None, previous=None, max_age_days=DEFAULT_MAX_AGE_DAYS,
+                 max_urls=MAX_SITEMAP_URLS, **kwargs):
+        super().__init__(start_url, **kwargs)
+        self.sitemaps = list(sitemaps or [])
+        self.previous_path = previous
+        self.max_age = timedelta(days=max_age_days)
+        self.max_urls = max_urls
+        self.sitemap_errors = []
+
+    def _sitemap_roots(self):
+        """Sitemap indicate, altrimenti quelle di robots.txt, altrimenti /sitemap.xml"""
+        if self.sitemaps:
+            return [urljoin(self.start_url, url) for url in self.sitemaps]
+        declared = self.robots.site_maps() if self.robots is not None else None
+        return list(declared or [urljoin(self.start_url, '/sitemap.xml')])
+
+    def _read_sitemap(self, url):
+        self.throttle.wait(urlparse(url).netloc.lower())
+        with self.session.get(url, timeout=30, stream=True) as response:
+            response.raise_for_status()
+            # iter_content toglie il Content-Encoding, open_body il gzip del file (.xml.gz)
+            yield from iter_sitemap(open_body(response.iter_content(chunk_size=65536)))
+
+    def iter_entries(self):
+        """(URL, lastmod) delle pagine interne, senza duplicati, visitando gli indici in ampiezza"""
+        queue = [(url, 0) for url in self._sitemap_roots()]
+        seen_sitemaps, seen_urls = set(), set()
+        while queue:
+            sitemap, depth = queue.pop(0)
+            if sitemap in seen_sitemaps:
+                continue
+            seen_sitemaps.add(sitemap)
+            try:
+                for kind, loc, lastmod in self._read_sitemap(sitemap):
+                    if kind == 'sitemap':
+                        if depth < MAX_SITEMAP_DEPTH:
+                            queue.append((urljoin(sitemap, loc), depth + 1))
+                        continue
+                    key = normalize_url(loc)
+                    if key in seen_urls or not self._is_internal(loc):
+                        continue
+                    seen_urls.add(key)
+                    yield loc, lastmod
+                    if len(seen_urls) >= self.max_urls:
+                        return
+            except (requests.RequestException, ET.ParseError, OSError, EOFError) as e:
+                self.sitemap_errors.append({"sitemap": sitemap, "error": str(e)})
+                print(f"⚠️  Sitemap non leggibile: {sitemap} ({e})")
+
+    def _new_auditor(self, url):
+        return WebsiteAuditor(url, session=self.session, probe=self.probe, parser=self.parser,
+                              scan_external_js=self.scan_external_js, cache=self.cache,
+                              sink=self.sink, transport=self.transport, sections=self.sections,
+                              parallel_sections=self.parallel_sections, asset_budgets=self.asset_budgets,
+                              max_asset_bytes=self.max_asset_bytes, rules=self.rules)
+
+    def _reuse(self, url, lastmod, previous, state):
+        page = dict(previous, url=url, lastmod=lastmod or previous.get("lastmod"), state=state)
+        if self.sink is not None:
+            for name, data in page["audit"].items():
+                self.sink.write_section(url, name, data)
+        return page
+
+    def _audit_entry(self, url, lastmod, previous, state):
+        """Pagina del report per una voce della sitemap: riusata oppure analizzata ora"""
+        if state == 'unchanged':
+            return self._reuse(url, lastmod, previous, state)
+
+        self.throttle.wait(urlparse(url).netloc.lower())
+        auditor = self._new_auditor(url)
+        try:
+            response = auditor.fetch_page(require_html=True)
+        except (requests.RequestException, ValueError) as e:
+            return {"url": url, "error": str(e)}
+        if state == 'check':
+            if auditor.content_hash == previous["content_hash"]:
+                return self._reuse(url, lastmod, previous, 'unchanged')
+            state = 'changed'
+
+        sections = auditor.audit_sections()
+        return {
+            "url": url,
+            "lastmod": lastmod,
+            "state": state,
+            "status": response.status_code,
+            "content_hash": auditor.content_hash,
+            "audited_at": datetime.now(timezone.utc).isoformat(),
+            "issues": count_issues(sections),
+            "audit": sections
+        }
+
+    def _result_options(self):
+        """Opzioni che cambiano il contenuto delle sezioni, salvate nei metadata del report"""
+        return {
+            "audit_version": "1.0",
+            "sections": self.sections,
+            "parser": self.parser,
+            "scan_external_js": self.scan_external_js,
+            "asset_budgets": dict(DEFAULT_BUDGETS_KB, **(self.asset_budgets or {})),
+            "max_asset_bytes": self.max_asset_bytes,
+            "rules": self.rules.fingerprint() if self.rules is not None else None
+        }
+
+    def _compatible(self, metadata):
+        """I risultati precedenti valgono solo con la stessa versione e le stesse opzioni"""
+        return all(metadata.get(key) == value for key, value in self._result_options().items())
+
+    def crawl(self):
+        """Pianifica dalle sitemap, esegue solo gli audit necessari e unisce i risultati precedenti"""
+        print(f"🗺️  Audit da sitemap di {self.start_url}...")
+        previous_metadata, previous = load_previous(self.previous_path)
+        if previous and not self._compatible(previous_metadata):
+            print("⚠️  Report precedente con opzioni diverse: tutte le pagine verranno rianalizzate")
+            previous = {}
+        metadata = {
+            "url": self.start_url,
+            "audit_date": datetime.now().isoformat(),
+            "mode": "sitemap",
+            **self._result_options(),
+            "previous": self.previous_path
+        }
+        if self.sink is not None:
+            self.sink.write({"type": "start", "mode": "sitemap", "metadata": metadata})
+        if self.respect_robots:
+            self._load_robots()
+
+        now = datetime.now(timezone.utc)
+        plan = {"new": 0, "changed": 0, "unchanged": 0, "checked": 0, "removed": []}
+        jobs, listed, skipped = [], set(), []
+        for url, lastmod in self.iter_entries():
+            if not self._allowed(url):
+                self._skip(skipped, {"url": url, "reason": "robots.txt"})
+                continue
+            key = normalize_url(url)
+            listed.add(key)
+            state = plan_entry(lastmod, previous.get(key), now, self.max_age)
+            if state == 'check':
+                plan["checked"] += 1
+            jobs.append((url, lastmod, previous.get(key), state))
+        plan["removed"] = sorted(page["url"] for key, page in previous.items() if key not in listed)
+        print(f"📋 {len(jobs)} URL: {sum(1 for job in jobs if job[3] != 'unchanged')} da scaricare")
+
+        pages = []
+        summary = CrawlSummary()
+        with ThreadPoolExecutor(max_workers=self.page_workers, thread_name_prefix='sitemap') as pool:
+            for page in pool.map(lambda job: self._audit_entry(*job), jobs):
+                if "error" in page:
+                    self._skip(skipped, {"url": page["url"], "reason": page["error"]})
+                    continue
+                plan[page["state"]] += 1
+                summary.add(page)
+                if page["state"] == 'unchanged':
+                    self.sections_from_cache += len(page["audit"])
+                if self.sink is not None:
+                    page = dict(page)
+                    page.pop("audit")
+                    self.sink.write({"type": "page", "page": page})
+                self._keep(pages, page)
+                mark = "♻️ " if page["state"] == 'unchanged' else "📄"
+                print(f"{mark} [{summary.pages}] {page['url']}")
+
+        metadata["plan"] = plan
+        metadata["sitemap_errors"] = self.sitemap_errors
+        metadata["probe_cache"] = self.probe.cache_stats()
+        metadata["transport"] = self.transport.report()
+        metadata.update(self._cache_metadata())
+        report = {
+            "metadata": metadata,
+            "summary": summary.as_dict(len(skipped)),
+            "pages": self._pages(pages),
+            "skipped": skipped
+        }
+        if self.sink is not None:
+            self.sink.write({"type": "summary", "data": report["summary"]})
+            self.sink.write({"type": "metadata", "metadata": metadata})
+        return report
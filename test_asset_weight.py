@@ -0,0 +1,156 @@
+"""
+Test per la misura del peso degli asset (GET di fallback, Range, budget)
+"""
+
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from asset_weight import parse_budgets, weight_summary
+from website_auditor import WebsiteAuditor, count_issues
+
+PAGE = (b'<html><head><link rel="stylesheet" href="/big.css"><script src="/app.js"></script></head>'
+        b'<body><img src="/photo.png" alt="foto"></body></html>')
+SCRIPT = b'console.log("bundle");' * 2000
+STYLE = b'body{margin:0}' * 20000
+IMAGE = b'\x89PNG' + b'0' * 5000
+
+
+class _NoHeadHandler(BaseHTTPRequestHandler):
+    """Rifiuta le HEAD, comprime il JS, serve il CSS senza Content-Length e le immagini con Range"""
+
+    def do_HEAD(self):
+        self.server.hits.append(('HEAD', self.path))
+        self.send_response(405)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        self.server.hits.append(('GET', self.path))
+        if self.path == '/':
+            self._send(PAGE, 'text/html', length=True)
+        elif self.path == '/app.js':
+            self._send(gzip.compress(SCRIPT), 'application/javascript', length=True, encoding='gzip')
+        elif self.path == '/big.css':
+            # Nessun Content-Length: il corpo termina con la chiusura della connessione
+            self._send(STYLE, 'text/css')
+        elif self.path == '/photo.png' and self.headers.get('Range', '').startswith('bytes=0-'):
+            end = min(int(self.headers['Range'][8:]), len(IMAGE) - 1)
+            self.send_response(206)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Range', f'bytes 0-{end}/{len(IMAGE)}')
+            self.send_header('Content-Length', str(end + 1))
+            self.end_headers()
+            self.wfile.write(IMAGE[:end + 1])
+        else:
+            self._send(IMAGE, 'image/png', length=True)
+
+    def _send(self, body, content_type, length=False, encoding=None):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        if length:
+            self.send_header('Content-Length', str(len(body)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def no_head_site():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _NoHeadHandler)
+    httpd.daemon_threads = True
+    httpd.hits = []
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd, f"http://127.0.0.1:{httpd.server_address[1]}/"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _assets(url, **options):
+    auditor = WebsiteAuditor(url, **options)
+    assert auditor.download_page()
+    return auditor.audit_assets()
+
+
+def test_head_refused_falls_back_to_get(no_head_site):
+    _, url = no_head_site
+    assets = _assets(url)
+
+    script = assets["js_files"][0]
+    assert script["status"] == 200 and script["accessible"]
+    assert script["measured"] == "stream"
+    assert script["transfer_kb"] == round(len(gzip.compress(SCRIPT)) / 1024, 2)
+    assert script["decoded_kb"] == round(len(SCRIPT) / 1024, 2)
+    assert script["transfer_kb"] < script["decoded_kb"]
+
+    style = assets["css_files"][0]
+    assert style["measured"] == "stream" and not style["truncated"]
+    assert style["transfer_kb"] == style["decoded_kb"] == round(len(STYLE) / 1024, 2)
+
+
+def test_images_use_ranged_get(no_head_site):
+    httpd, url = no_head_site
+    image = _assets(url)["images"][0]
+    assert image["measured"] == "range"
+    assert image["transfer_kb"] == round(len(IMAGE) / 1024, 2)
+    # Nessuna GET completa dell'immagine
+    assert httpd.hits.count(('GET', '/photo.png')) == 1
+
+
+def test_each_body_fetched_once(no_head_site):
+    """La GET che misura il peso serve anche a dimensioni delle immagini e secrets dei bundle"""
+    httpd, url = no_head_site
+    auditor = WebsiteAuditor(url)
+    assert auditor.download_page()
+    assets = auditor.audit_assets()
+    images = auditor.audit_images()["images"]
+    auditor.audit_security()
+
+    assert assets["js_files"][0]["measured"] == "stream"
+    assert images[0]["url"] == url + "photo.png" and "error" not in images[0]
+    assert assets["images"][0]["measured"] == "range"
+    assert httpd.hits.count(('GET', '/app.js')) == 1
+    assert httpd.hits.count(('GET', '/photo.png')) == 1
+
+
+def test_streamed_get_is_capped(no_head_site):
+    _, url = no_head_site
+    style = _assets(url, max_asset_bytes=64 * 1024)["css_files"][0]
+    assert style["truncated"]
+    assert style["transfer_kb"] < len(STYLE) / 1024
+
+
+def test_budget_violations(no_head_site):
+    _, url = no_head_site
+    assets = _assets(url, asset_budgets={'css': 100})
+
+    assert assets["weight"]["css"]["over_budget"]
+    assert not assets["weight"]["js"]["over_budget"]
+    assert [v["type"] for v in assets["budget_violations"]] == ["css"]
+    assert assets["budget_violations"][0]["over_kb"] == round(len(STYLE) / 1024 - 100, 2)
+    assert count_issues({"missing_assets": assets})["medium"] == 1
+
+
+def test_head_with_length_needs_no_get(http_site):
+    site = http_site({
+        '/': (200, '<html><body><img src="/a.png" alt="a"></body></html>', 'text/html'),
+        '/a.png': (200, 'x' * 2048, 'image/png'),
+    })
+    image = _assets(site.base_url)["images"][0]
+    assert image["measured"] == "content-length" and image["transfer_kb"] == 2.0
+    assert ('GET', '/a.png') not in site.hits
+
+
+def test_parse_budgets():
+    assert parse_budgets(['js=250'])['js'] == 250
+    assert parse_budgets([])['css'] == 150
+    with pytest.raises(ValueError):
+        parse_budgets(['fonts=10'])
+    weight, violations = weight_summary({'js': [{"transfer_kb": 10, "decoded_kb": 30}]}, {'js': 5})
+    assert weight['js']['decoded_kb'] == 30 and violations[0]["over_kb"] == 5
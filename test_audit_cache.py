@@ -0,0 +1,124 @@
+"""
+Test per la cache persistente e l'audit incrementale
+"""
+
+import time
+
+from audit_cache import AuditCache
+from site_crawler import SiteCrawler
+from website_auditor import SECTION_NAMES, WebsiteAuditor
+
+
+PAGE = """<html><head><title>Cache</title><link rel="stylesheet" href="/main.css"></head>
+<body><a href="/about">Chi siamo</a><img src="/logo.png"></body></html>"""
+
+
+def _routes(page=PAGE):
+    return {
+        '/': (200, page, 'text/html'),
+        '/about': (200, '<html><body><a href="/">Home</a></body></html>', 'text/html'),
+        '/main.css': (200, 'body{}', 'text/css'),
+        '/logo.png': (200, 'PNG' * 100, 'image/png'),
+    }
+
+
+def _audit(base, cache, **kwargs):
+    results = WebsiteAuditor(base, cache=cache, **kwargs).run_full_audit()
+    results["metadata"].pop("audit_date")
+    return results
+
+
+def test_unchanged_page_served_from_cache(http_site, tmp_path):
+    site = http_site(_routes(), etags=True)
+    cache = AuditCache(str(tmp_path / "cache.sqlite"))
+
+    first = _audit(site.base_url, cache)
+    assert first["metadata"]["cache"]["page"] == "miss"
+    site.hits.clear()
+
+    second = _audit(site.base_url, cache)
+    assert second["metadata"]["cache"]["page"] == "not_modified"
+    assert second["metadata"]["cache"]["sections_from_cache"] == len(SECTION_NAMES)
+    # Solo la richiesta condizionale della pagina: nessun probe né analisi
+    assert site.hits == [('GET', '/')]
+    for section in ("routes_and_links", "missing_assets", "seo_analysis"):
+        assert second[section] == first[section]
+
+
+def test_changed_page_reanalysed_with_conditional_assets(http_site, tmp_path):
+    site = http_site(_routes(), etags=True)
+    cache = AuditCache(str(tmp_path / "cache.sqlite"))
+    _audit(site.base_url, cache)
+
+    site.routes.update(_routes(PAGE.replace("Cache", "Nuovo titolo")))
+    results = _audit(site.base_url, cache)
+    meta = results["metadata"]["cache"]
+    assert meta["page"] == "miss" and meta["sections_from_cache"] == 0
+    assert meta["assets_revalidated"] == 2
+    assert results["seo_analysis"]["meta_title"]["content"] == "Nuovo titolo"
+    assert [a["size_kb"] for a in results["missing_assets"]["images"]] == [round(300 / 1024, 2)]
+
+
+def test_same_content_without_validators_is_unchanged(http_site, tmp_path):
+    site = http_site(_routes())
+    cache = AuditCache(str(tmp_path / "cache.sqlite"))
+    _audit(site.base_url, cache, parser='stream')
+    results = _audit(site.base_url, cache, parser='stream')
+    assert results["metadata"]["cache"]["page"] == "unchanged"
+
+
+def test_option_change_invalidates_page_entry(http_site, tmp_path):
+    site = http_site(_routes(), etags=True)
+    cache = AuditCache(str(tmp_path / "cache.sqlite"))
+    _audit(site.base_url, cache)
+    results = _audit(site.base_url, cache, scan_external_js=False)
+    assert results["metadata"]["cache"]["page"] == "miss"
+
+
+def test_crawl_reports_cached_sections(http_site, tmp_path):
+    site = http_site(_routes(), etags=True)
+    cache = AuditCache(str(tmp_path / "cache.sqlite"))
+    SiteCrawler(site.base_url, crawl_delay=0, cache=cache).crawl()
+    report = SiteCrawler(site.base_url, crawl_delay=0, cache=cache).crawl()
+    assert [page["cache"] for page in report["pages"]] == ["not_modified", "not_modified"]
+    assert report["metadata"]["cache"]["sections_from_cache"] == 2 * len(SECTION_NAMES)
+
+
+def test_ttl_and_size_eviction(tmp_path):
+    cache = AuditCache(str(tmp_path / "c.sqlite"), ttl=0.2, max_bytes=1000)
+    cache.put('asset', 'a', {"x": 1}, etag='"1"')
+    entry = cache.get('asset', 'a')
+    assert entry["etag"] == '"1"' and entry["value"] == {"x": 1}
+    assert cache.conditional_headers(entry) == {'If-None-Match': '"1"'}
+    time.sleep(0.25)
+    assert cache.get('asset', 'a') is None
+
+    cache.ttl = 3600
+    for i in range(10):
+        cache.put('asset', f'u{i}', {"blob": "x" * 200})
+    stats = cache.stats()
+    assert stats["size_bytes"] <= 1000
+    assert cache.get('asset', 'u9') is not None
+    assert cache.get('asset', 'u0') is None
+
+
+def test_reads_are_batched_and_size_is_tracked(tmp_path):
+    cache = AuditCache(str(tmp_path / "c.sqlite"), max_bytes=1000)
+    statements = []
+    cache._db.set_trace_callback(statements.append)
+    cache.put('asset', 'letto', {"blob": "x" * 200})
+    cache.put('asset', 'ignorato', {"blob": "x" * 200})
+    assert not any("SUM" in sql for sql in statements)
+
+    statements.clear()
+    assert cache.get('asset', 'letto') is not None
+    # Nessuna scrittura a ogni lettura: accessed_at viene aggiornato con la put successiva
+    assert [sql.split()[0] for sql in statements] == ['SELECT']
+    for i in range(3):
+        cache.put('asset', f'u{i}', {"blob": "x" * 200})
+    assert cache.get('asset', 'letto') is not None and cache.get('asset', 'ignorato') is None
+    assert cache.stats()["size_bytes"] == cache._total_size() <= 1000
+    cache.put('asset', 'letto', {"x": 1})
+    cache.delete('asset', 'u2')
+    assert cache.stats()["size_bytes"] == cache._total_size()
+    cache.close()
@@ -0,0 +1,177 @@
+"""
+Test per lo storico di audit e Lighthouse (serie per URL, percentili, regressioni)
+"""
+
+import json
+import os
+
+import pytest
+
+from audit_history import AuditHistory, fdr_cutoff, main, page_metrics, parse_time
+from audit_stream import JsonlSink
+from lighthouse_compare import main as lighthouse_main
+from lighthouse_stats import student_t_test
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'lighthouse')
+DAY = 24 * 3600
+URL = "https://x.test/"
+
+
+def _report(day, size_kb, broken=0, url=URL):
+    return {
+        "metadata": {"url": url, "audit_date": f"2024-05-{day:02d}T03:00:00", "audit_version": "1.0"},
+        "routes_and_links": {"internal_links": [], "broken_links": [{"url": f"/rotto-{n}"} for n in range(broken)]},
+        "missing_assets": {"css_files": [], "js_files": [], "other_assets": [], "total_size_kb": size_kb,
+                           "images": [{"url": "/a.png", "accessible": False}]},
+        "response_headers": {"score": 80}
+    }
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = AuditHistory(str(tmp_path / 'storico.db'))
+    yield history
+    history.close()
+
+
+def test_page_metrics():
+    metrics = page_metrics({key: value for key, value in _report(1, 120.5, broken=2).items() if key != "metadata"})
+    assert metrics["total_size_kb"] == 120.5 and metrics["broken_links"] == 2
+    assert metrics["broken_assets"] == 1 and metrics["headers_score"] == 80
+    assert metrics["issues_critical"] == 0
+    assert parse_time("2024-05-01T10:00:00.000Z") == 1714557600
+    assert parse_time("ieri") is None
+
+
+def test_ingest_lighthouse_runs_once(history):
+    paths = [os.path.join(FIXTURES, name) for name in sorted(os.listdir(FIXTURES))]
+    added = [history.ingest(path, 'before') for path in paths]
+    # after-error.json ha un runtimeError: nessun campione
+    assert [count is not None for count in added].count(True) == len(paths) - 1
+    assert history.ingest(paths[0]) is None
+
+    series = history.series("http://localhost:3000", 'lcp')
+    assert len(series) == len(paths) - 1
+    assert [at for at, _ in series] == sorted(at for at, _ in series)
+    assert history.stats()["urls"] == 1
+
+
+def test_ingest_reports_and_jsonl(history, tmp_path):
+    assert history.ingest_report(_report(1, 100)) == 8
+    crawl = {"metadata": {"url": URL, "mode": "crawl", "audit_date": "2024-05-02T03:00:00"},
+             "pages": [{"url": URL + "a", "issues": {"critical": 1, "high": 0, "medium": 0, "low": 0},
+                        "audit": {"missing_assets": _report(2, 50)["missing_assets"]}},
+                       {"url": URL + "b", "depth": 1}]}
+    history.ingest_report(crawl)
+    assert history.series(URL + "a", 'issues_critical') == [(parse_time("2024-05-02T03:00:00"), 1.0)]
+
+    path = str(tmp_path / 'audit.jsonl')
+    sink = JsonlSink(path)
+    report = _report(3, 300)
+    sink.write({"type": "start", "mode": "page", "metadata": report.pop("metadata")})
+    for section, data in report.items():
+        sink.write_section(URL, section, data)
+    sink.close()
+    assert history.ingest(path) == 8
+    assert [value for _, value in history.series(URL, 'total_size_kb')] == [100, 300]
+
+
+def test_trend_and_percentiles(history):
+    for day in range(1, 11):
+        history.ingest_report(_report(day, 100 + day * 10, url=URL))
+        history.ingest_report(_report(day, 500, url=URL + "b"))
+
+    trend = {entry["url"]: entry for entry in history.trend('total_size_kb')}
+    assert trend[URL]["first"] == 110 and trend[URL]["last"] == 200
+    assert trend[URL]["slope_per_day"] == pytest.approx(10)
+    assert trend[URL + "b"]["change_pct"] == 0
+    assert [entry["url"] for entry in history.trend('total_size_kb', url=URL)] == [URL]
+
+    sizes = history.percentiles('total_size_kb')["total_size_kb"]
+    assert sizes["samples"] == 20 and sizes["p50"] == 200 and sizes["p99"] == 500
+    assert "headers_score" in history.percentiles()
+    with pytest.raises(ValueError):
+        history.trend('inesistente')
+
+
+def test_student_t_and_fdr_cutoff():
+    # Valore di riferimento: scipy.stats.ttest_ind([1, 2, 3, 4], [2, 3, 4, 5])
+    assert student_t_test([1, 2, 3, 4], [2, 3, 4, 5]) == pytest.approx(0.31533, abs=1e-5)
+    assert student_t_test([1, 1], [2, 2]) == 0.0 and student_t_test([1], [2, 3]) is None
+    assert fdr_cutoff([0.04, 0.001, 0.02], 3, 0.05) == 0.04
+    # Con molte serie la soglia per singolo confronto si abbassa
+    assert fdr_cutoff([0.04, 0.001, 0.02], 100, 0.05) is None
+    assert fdr_cutoff([0.0001, 0.02], 100, 0.05) == 0.0001
+
+
+def test_check_flags_significant_worsening(history):
+    base = parse_time("2024-05-01T00:00:00")
+    noise = [0, 3, -2, 1, -3, 2, -1, 0, 2, -2, 1, -1, 3, -2, 0, 1]
+    for day, delta in enumerate(noise):
+        late = day >= len(noise) - 3
+        samples = [
+            (URL, 'total_size_kb', (400 if late else 200) + delta),    # raddoppia: regressione
+            (URL, 'performance_score', (60 if late else 90) + delta),  # punteggio in calo: regressione
+            (URL, 'seo_score', (99 if late else 80) + delta),          # punteggio in crescita: miglioramento
+            (URL, 'lcp', 2500 + delta * 10),                           # solo rumore
+            (URL + "b", 'broken_links', 1 if late else 0),             # nuovo link rotto fisso
+        ]
+        history.add_run('test', f"run-{day}", base + day * DAY, samples)
+
+    regressions = history.check(since=0)
+    assert sorted((entry["metric"], entry["url"]) for entry in regressions) == [
+        ('broken_links', URL + "b"), ('performance_score', URL), ('total_size_kb', URL)]
+    size = next(entry for entry in regressions if entry["metric"] == 'total_size_kb')
+    assert size["before"]["runs"] == 13 and size["after"]["runs"] == 3 and size["p_value"] < 0.01
+
+    # Serie troppo corte: niente confronto
+    assert history.check(recent=3, baseline=14, min_baseline=20, since=0) == []
+    # Con un solo campione recente il test t non è definito
+    with pytest.raises(ValueError):
+        history.check(recent=1, since=0)
+
+
+def test_cli_ingest_and_check(tmp_path, capsys):
+    db = str(tmp_path / 'storico.db')
+    for day in range(1, 10):
+        path = tmp_path / f"audit-{day}.json"
+        path.write_text(json.dumps(_report(day, 100, broken=3 if day > 6 else 0)))
+    assert main(['--db', db, 'ingest', str(tmp_path / 'audit-*.json'), '--label', 'nightly']) == 0
+    assert "9 file importati" in capsys.readouterr().out
+
+    assert main(['--db', db, 'ingest', str(tmp_path)]) == 0
+    # Già importati: nessun campione doppio
+    assert "0 file importati (0 campioni, 9 già presenti" in capsys.readouterr().out
+    assert main(['--db', db, 'check', '--days', '100000', '--min-baseline', '5']) == 1
+    assert "broken_links" in capsys.readouterr().out
+    with pytest.raises(SystemExit):
+        main(['--db', db, 'check', '--recent', '1'])
+    assert main(['--db', db, 'trend', '--metric', 'total_size_kb', '--days', '100000', '--json']) == 0
+    assert json.loads(capsys.readouterr().out)[0]["samples"] == 9
+
+
+def test_lighthouse_compare_records_history(tmp_path):
+    db = str(tmp_path / 'storico.db')
+    lighthouse_main(['--before', os.path.join(FIXTURES, 'before-*.json'),
+                     '--after', os.path.join(FIXTURES, 'after-*.json*'), '--history', db])
+    history = AuditHistory(db)
+    assert history.stats()["runs"] == 6
+    assert len(history.series("http://localhost:3000/", 'performance_score')) == 6
+    history.close()
+
+
+def test_website_auditor_records_history(http_site, tmp_path):
+    from website_auditor import main as auditor_main
+
+    site = http_site({'/': (200, '<html><head><title>Home</title></head><body><a href="/x">x</a></body></html>',
+                            'text/html'),
+                      '/x': (200, '<html><body>ok</body></html>', 'text/html')})
+    db = str(tmp_path / 'storico.db')
+    common = [site.base_url, '--sections', 'routes_and_links', '--history', db, '--crawl-delay', '0']
+    assert auditor_main(common + ['--crawl', '-o', str(tmp_path / 'audit.json')]) == 0
+    assert auditor_main(common + ['--format', 'jsonl', '-o', str(tmp_path / 'audit.jsonl')]) == 0
+
+    history = AuditHistory(db)
+    assert history.stats()["runs"] == 2 and history.stats()["urls"] == 2
+    assert [value for _, value in history.series(site.base_url, 'broken_links')] == [0, 0]
+    history.close()
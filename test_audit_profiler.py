@@ -0,0 +1,75 @@
+"""
+Test per la strumentazione delle sezioni di audit
+"""
+
+import json
+import os
+import pstats
+
+import pytest
+
+from audit_profiler import SectionProfiler
+from website_auditor import AUDIT_SECTIONS, WebsiteAuditor
+
+
+PAGE = """<html><head><title>Profilo</title><link rel="stylesheet" href="/main.css"></head>
+<body><a href="/a">A</a><a href="/b">B</a><img src="/logo.png"></body></html>"""
+
+ROUTES = {
+    '/': (200, PAGE, 'text/html'),
+    '/a': (200, 'a', 'text/html'),
+    '/b': (200, 'b', 'text/html'),
+    '/main.css': (200, 'body{}', 'text/css'),
+    '/logo.png': (200, 'PNG' * 100, 'image/png'),
+}
+
+
+def test_timings_recorded_per_section(http_site):
+    site = http_site(ROUTES)
+    results = WebsiteAuditor(site.base_url).run_full_audit()
+    timings = results["metadata"]["timings"]
+
+    assert list(timings["sections"])[0] == "download"
+    assert set(timings["sections"]) == {"download"} | {spec.name for spec in AUDIT_SECTIONS}
+    download = timings["sections"]["download"]
+    assert download["requests"] == 1 and download["bytes_received"] == len(PAGE)
+    # Due link interni sondati con HEAD, nessun corpo scaricato
+    links = timings["sections"]["routes_and_links"]
+    assert links["requests"] == 2 and links["bytes_received"] == 0
+    assert timings["sections"]["policy_links"]["requests"] == 0
+    assert timings["total"]["requests"] == results["metadata"]["transport"]["requests"]
+    assert all(entry["wall_ms"] >= 0 and entry["cpu_ms"] >= 0 for entry in timings["sections"].values())
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/statm'), reason="RSS corrente solo su Linux")
+def test_rss_delta_is_per_section():
+    profiler = SectionProfiler()
+    with profiler.measure("alloca"):
+        blob = b'x' * (64 * 1024 * 1024)
+    with profiler.measure("vuota"):
+        pass
+    # Il picco del processo resterebbe alto anche per la seconda sezione
+    assert profiler.sections["alloca"]["rss_delta_kb"] > 32 * 1024
+    assert abs(profiler.sections["vuota"]["rss_delta_kb"]) < 4 * 1024
+    assert "peak_rss_kb" not in profiler.sections["vuota"] and len(blob)
+
+
+def test_trace_and_profile_export(http_site, tmp_path):
+    site = http_site(ROUTES)
+    auditor = WebsiteAuditor(site.base_url, profile='cprofile', trace_memory=True)
+    results = auditor.run_full_audit()
+    sections = results["metadata"]["timings"]["sections"]
+    assert "peak_alloc_kb" in sections["seo_analysis"]
+    # Le sezioni di rete girano nel pool: il picco di tracemalloc sarebbe quello di tutte
+    assert "peak_alloc_kb" not in sections["routes_and_links"]
+
+    trace = tmp_path / "trace.json"
+    auditor.profiler.save_trace(str(trace))
+    events = json.loads(trace.read_text())["traceEvents"]
+    assert events[0]["name"] == "download" and len(events) == len(AUDIT_SECTIONS) + 1
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+
+    profile = tmp_path / "audit.prof"
+    auditor.profiler.save_profile(str(profile))
+    stats = pstats.Stats(str(profile))
+    assert any(name == 'run_audit_sections' for _, _, name in stats.stats)
@@ -0,0 +1,132 @@
+"""
+Test per il servizio di audit (API HTTP/JSON, coda limitata, metriche)
+"""
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from audit_cache import AuditCache
+from audit_service import AuditService, create_server, percentile
+
+PAGE = '<html><head><title>Servizio</title></head><body><a href="/ok">ok</a></body></html>'
+ROUTES = {
+    '/': (200, PAGE, 'text/html'),
+    '/slow': (200, PAGE, 'text/html'),
+    '/ok': (200, 'ok', 'text/html'),
+}
+
+
+@pytest.fixture
+def service():
+    """Avvia un servizio su una porta libera; restituisce una funzione (**opzioni) -> (servizio, URL base)"""
+    started = []
+
+    def start(**options):
+        audit = AuditService(**options).start()
+        httpd = create_server(audit, port=0)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        started.append((audit, httpd))
+        return audit, f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    yield start
+    for audit, httpd in started:
+        httpd.shutdown()
+        httpd.server_close()
+        audit.stop(timeout=5)
+
+
+def _call(url, payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([5], 99) == 5
+    assert [percentile(list(range(1, 11)), pct) for pct in (50, 90, 99)] == [5, 9, 10]
+
+
+def test_submit_poll_and_fetch_result(http_site, service):
+    site = http_site(ROUTES)
+    audit, api = service(workers=2)
+
+    status, job = _call(f"{api}/jobs", {"url": site.base_url, "sections": ["seo_analysis"]})
+    assert status == 202 and job["status"] in ("queued", "running")
+    status, report = _call(f"{api}{job['links']['result']}?wait=10")
+    assert status == 200
+    assert report["seo_analysis"]["meta_title"]["content"] == "Servizio"
+    assert "routes_and_links" not in report
+
+    status, info = _call(f"{api}/jobs/{job['id']}")
+    assert info["status"] == "done" and info["issues"]["critical"] == 0
+
+    _call(f"{api}/jobs", {"url": site.base_url + "slow", "sections": ["routes_and_links"]})
+    metrics = _call(f"{api}/metrics")[1]
+    assert metrics["jobs"]["submitted"] == 2
+    assert metrics["queue"]["capacity"] == 100 and metrics["queue"]["workers"] == 2
+    assert metrics["latency_ms"]["total"]["p50"] is not None
+
+
+def test_validation_and_unknown_jobs(service):
+    _, api = service(workers=1)
+    assert _call(f"{api}/jobs", {"url": "ftp://x"})[0] == 400
+    assert _call(f"{api}/jobs", {"url": "http://x.test/", "sections": ["inesistente"]})[0] == 400
+    for bad in ({"sections": [1]}, {"sections": [None]}, {"sections": "seo_analysis"},
+                {"scan_external_js": "false"}, {"scan_external_js": 0}):
+        assert _call(f"{api}/jobs", dict(bad, url="http://x.test/"))[0] == 400
+    assert _call(f"{api}/jobs/nessuno")[0] == 404
+    assert _call(f"{api}/health") == (200, {"status": "ok"})
+
+
+def test_bounded_queue_rejects_with_429(http_site, service):
+    site = http_site(ROUTES, delays={'/slow': 0.5})
+    audit, api = service(workers=1, max_queue=1)
+    payload = {"url": site.base_url + "slow", "sections": ["seo_analysis"]}
+
+    first = _call(f"{api}/jobs", payload)[1]
+    while _call(f"{api}/jobs/{first['id']}")[1]["status"] == "queued":
+        time.sleep(0.01)
+    # Uno in esecuzione, uno in coda, gli altri rifiutati
+    statuses = [_call(f"{api}/jobs", payload)[0] for _ in range(3)]
+    assert statuses == [202, 429, 429]
+    assert audit.metrics()["jobs"]["rejected"] == 2
+
+
+def test_failed_job_is_reported(http_site, service):
+    site = http_site(ROUTES)
+    _, api = service(workers=1)
+    job = _call(f"{api}/jobs", {"url": site.base_url + "missing"})[1]
+    status, info = _call(f"{api}/jobs/{job['id']}/result?wait=10")
+    assert status == 502 and info["status"] == "failed"
+    assert _call(f"{api}/metrics")[1]["jobs"]["failed"] == 1
+
+
+def test_job_can_bypass_the_persistent_cache(http_site, service, tmp_path):
+    site = http_site(dict(ROUTES))
+    cache = AuditCache(str(tmp_path / "cache.db"))
+    _, api = service(workers=1, cache=cache)
+    payload = {"url": site.base_url, "sections": ["routes_and_links"]}
+
+    def run(extra):
+        job = _call(f"{api}/jobs", dict(payload, **extra))[1]
+        return _call(f"{api}/jobs/{job['id']}/result?wait=10")[1]
+
+    assert run({})["routes_and_links"]["status_codes"][site.base_url + "ok"] == 200
+    site.routes['/ok'] = (404, 'gone', 'text/html')
+    # Pagina invariata: con la cache il link rotto non si vede, senza sì
+    assert run({})["routes_and_links"]["status_codes"][site.base_url + "ok"] == 200
+    report = run({"cache": False})
+    assert report["routes_and_links"]["status_codes"][site.base_url + "ok"] == 404
+    assert "cache" not in report["metadata"]
+    assert _call(f"{api}/jobs", dict(payload, cache="no"))[0] == 400
+    cache.close()
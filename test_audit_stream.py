@@ -0,0 +1,88 @@
+"""
+Test per l'output in streaming JSONL
+"""
+
+import json
+
+from audit_stream import JsonlSink, read_records, read_stream
+from site_crawler import SiteCrawler
+from website_auditor import AUDIT_SECTIONS, WebsiteAuditor
+
+
+PAGE = """<html><head><title>Stream</title><link rel="stylesheet" href="/main.css"></head>
+<body><a href="/about">Chi siamo</a><a href="/rotto">Rotto</a><img src="/logo.png">
+<img src="/manca.png"></body></html>"""
+
+ROUTES = {
+    '/': (200, PAGE, 'text/html'),
+    '/about': (200, '<html><body><a href="/">Home</a></body></html>', 'text/html'),
+    '/main.css': (200, 'body{}', 'text/css'),
+    '/logo.png': (200, 'PNG', 'image/png'),
+}
+
+
+def test_page_stream_roundtrip(http_site, tmp_path):
+    site = http_site(ROUTES)
+    for name in ("audit.jsonl", "audit.jsonl.gz"):
+        path = str(tmp_path / name)
+        sink = JsonlSink(path)
+        results = WebsiteAuditor(site.base_url, sink=sink).run_full_audit()
+        sink.close()
+        rebuilt = read_stream(path)
+        assert rebuilt == json.loads(json.dumps(results))
+        # Stesso ordine delle sezioni di un run normale, non quello di completamento
+        assert list(rebuilt) == list(results)
+
+
+def test_sections_written_as_they_complete(http_site, tmp_path):
+    site = http_site(ROUTES)
+    path = str(tmp_path / "audit.jsonl")
+    sink = JsonlSink(path)
+    auditor = WebsiteAuditor(site.base_url, sink=sink, parallel_sections=False)
+    seen = []
+    original = auditor.audit_assets
+
+    def audit_assets():
+        # Le sezioni precedenti sono già su disco mentre gli asset sono in corso
+        seen.extend(read_records(path))
+        return original()
+
+    auditor.audit_assets = audit_assets
+    auditor.run_full_audit()
+    sink.close()
+
+    sections = [r["section"] for r in seen if r["type"] == "section"]
+    assert sections == ["routes_and_links", "broken_anchors", "non_functional_buttons", "broken_forms"]
+    broken = [r for r in seen if r["type"] == "finding" and r["field"] == "broken_links"]
+    assert [r["data"]["url"] for r in broken] == [site.base_url + "rotto"]
+
+
+def test_crawl_stream_roundtrip(http_site, tmp_path):
+    site = http_site(ROUTES)
+    path = str(tmp_path / "crawl.jsonl")
+    sink = JsonlSink(path)
+    report = SiteCrawler(site.base_url, max_depth=1, crawl_delay=0, sink=sink).crawl()
+    sink.close()
+
+    rebuilt = read_stream(path)
+    assert rebuilt["summary"] == report["summary"]
+    assert [p["url"] for p in rebuilt["pages"]] == [p["url"] for p in report["pages"]]
+    # Con il sink il dettaglio per pagina vive solo sul file
+    assert all("audit" not in page for page in report["pages"])
+    assert list(rebuilt["pages"][0]["audit"]) == [spec.name for spec in AUDIT_SECTIONS]
+    assert rebuilt["pages"][0]["audit"]["missing_assets"]["images"][1]["accessible"] is False
+    assert report["summary"]["unique_broken_links"] == [site.base_url + "rotto"]
+
+
+def test_section_flushed_once(tmp_path):
+    path = str(tmp_path / "audit.jsonl")
+    sink = JsonlSink(path)
+    flushes = []
+    flush = sink._file.flush
+    sink._file.flush = lambda: flushes.append(sink.records) or flush()
+    sink.write_section("https://x.test/", "routes_and_links",
+                       {"broken_links": [{"url": f"/rotto-{n}"} for n in range(500)], "total": 500})
+    assert flushes == [0] and sink.records == 501
+    # Il blocco è già leggibile prima della chiusura
+    assert len(list(read_records(path))) == 501
+    sink.close()
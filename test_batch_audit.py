@@ -0,0 +1,53 @@
+"""
+Test per l'audit in batch su pool di processi
+"""
+
+import json
+import os
+
+from batch_audit import BatchAuditor, load_index, read_urls, report_name
+
+
+PAGE = '<html><head><title>{}</title></head><body><a href="#">Vuoto</a></body></html>'
+ROUTES = {
+    '/a': (200, PAGE.format('A'), 'text/html'),
+    '/b': (200, PAGE.format('B'), 'text/html'),
+    '/c': (200, PAGE.format('C'), 'text/html'),
+}
+
+
+def test_read_urls_skips_comments_and_duplicates(tmp_path):
+    path = tmp_path / "urls.txt"
+    path.write_text("# clienti\nhttp://a/\n\nhttp://b/\nhttp://a/\n", encoding='utf-8')
+    assert read_urls(str(path)) == ["http://a/", "http://b/"]
+
+
+def test_batch_writes_reports_and_summary(http_site, tmp_path):
+    site = http_site(ROUTES)
+    urls = [site.base_url + p for p in ('a', 'b', 'c', 'manca')]
+    out = str(tmp_path / "out")
+    summary = BatchAuditor(urls, out, processes=2).run()
+
+    assert summary["urls"] == 4 and summary["audited"] == 3
+    assert [f["url"] for f in summary["failed"]] == [site.base_url + "manca"]
+    assert summary["issues"]["medium"] == 3
+    with open(os.path.join(out, "reports", report_name(urls[1])), encoding='utf-8') as f:
+        assert json.load(f)["seo_analysis"]["meta_title"]["content"] == "B"
+    with open(os.path.join(out, "summary.json"), encoding='utf-8') as f:
+        assert json.load(f)["audited"] == 3
+
+
+def test_batch_resumes_after_interruption(http_site, tmp_path):
+    site = http_site(ROUTES)
+    urls = [site.base_url + p for p in ('a', 'b', 'c')]
+    out = tmp_path / "out"
+    out.mkdir()
+    # Indice lasciato da un'esecuzione interrotta: un URL completato e una riga troncata
+    done = {"url": urls[0], "status": "ok", "report": None, "error": None,
+            "issues": {"critical": 0, "high": 0, "medium": 1, "low": 0}}
+    (out / "results.jsonl").write_text(json.dumps(done) + '\n{"url": "htt', encoding='utf-8')
+
+    summary = BatchAuditor(urls, str(out), processes=2).run()
+    assert ('GET', '/a') not in site.hits
+    assert summary["audited"] == 3
+    assert set(load_index(str(out / "results.jsonl"))) == set(urls)
@@ -0,0 +1,93 @@
+"""
+Test per l'analisi statica del percorso critico
+"""
+
+import gzip
+
+from critical_path import css_imports, transfer_round_trips
+from website_auditor import WebsiteAuditor
+
+PAGE = """<html><head>
+<link rel="preconnect" href="https://fonts.example.com">
+<link rel="stylesheet" href="/main.css">
+<link rel="stylesheet" href="/print.css" media="print">
+<link rel="preload" href="/late.css" as="style">
+<script src="/app.js"></script>
+<script src="/analytics.js" async></script>
+<script src="/module.js" type="module"></script>
+</head><body><script src="/footer.js"></script></body></html>"""
+
+
+def _audit(site, parser='html.parser'):
+    auditor = WebsiteAuditor(site.base_url, parser=parser, sections=["critical_path"])
+    assert auditor.download_page()
+    return auditor.run_audit_sections()["critical_path"]
+
+
+def test_css_imports():
+    css = """/* @import "commented.css"; */
+@import url("a.css");
+@import 'b.css' screen;
+@import url(print.css) print;
+body { color: red }"""
+    assert css_imports(css, "http://x.test/css/main.css") == [
+        "http://x.test/css/a.css", "http://x.test/css/b.css"]
+
+
+def test_transfer_round_trips():
+    assert transfer_round_trips(0) == 1
+    assert transfer_round_trips(10 * 1024) == 1
+    # 14.6 KB nel primo giro, 29.2 nel secondo, 58.4 nel terzo
+    assert transfer_round_trips(50 * 1024) == 3
+
+
+def test_render_blocking_chain(http_site):
+    site = http_site({
+        '/': (200, PAGE, 'text/html'),
+        '/main.css': (200, '@import "/base.css";\nbody{}', 'text/css'),
+        '/base.css': (200, '@import url(/late.css);\n@import url(/deep.css);', 'text/css'),
+        '/late.css': (200, 'h1{}', 'text/css'),
+        '/deep.css': (200, 'p{}' * 100, 'text/css'),
+        '/print.css': (200, 'body{}', 'text/css'),
+        '/app.js': (200, 'console.log(1)', 'application/javascript'),
+    })
+    for parser in ('html.parser', 'stream'):
+        result = _audit(site, parser)
+        blocking = {entry["url"][len(site.base_url) - 1:]: entry for entry in result["render_blocking"]}
+        assert list(blocking) == ['/main.css', '/app.js', '/base.css', '/late.css', '/deep.css']
+        assert blocking['/base.css']["depth"] == 2 and blocking['/base.css']["parent"] == site.base_url + 'main.css'
+        assert blocking['/deep.css']["depth"] == 3 and blocking['/deep.css']["size_kb"] == round(300 / 1024, 2)
+        # Il preload porta l'import al primo livello
+        assert blocking['/late.css']["depth"] == 1 and blocking['/late.css']["preloaded"]
+        assert "defer" in blocking['/app.js']["suggestions"][0]
+        assert "@import" in blocking['/base.css']["suggestions"][0]
+
+        assert result["chain_depth"] == 3
+        assert result["critical_requests"] == 6
+        # Documento (connessione + trasferimento) e un round trip per livello
+        assert result["estimated_round_trips"] == 2 + 3
+        assert result["preconnect"] == ["https://fonts.example.com"]
+
+
+def test_third_party_blocking_suggests_preconnect(http_site):
+    other = http_site({'/lib.js': (200, 'x', 'application/javascript')})
+    site = http_site({'/': (200, f'<html><head><script src="{other.base_url}lib.js"></script></head></html>',
+                            'text/html')})
+    result = _audit(site)
+    entry, = result["render_blocking"]
+    assert any("preconnect" in suggestion for suggestion in entry["suggestions"])
+    # Nuova connessione verso l'altro host: un round trip in più
+    assert result["estimated_round_trips"] == 2 + 2
+
+
+def test_stylesheet_size_is_transferred_bytes(http_site):
+    css = b'p{color:red}' * 1000
+    site = http_site({
+        '/': (200, '<html><head><link rel="stylesheet" href="/main.css"></head></html>', 'text/html'),
+        '/main.css': (200, '@import "/big.css";', 'text/css'),
+        '/big.css': (200, gzip.compress(css), 'text/css', {'Content-Encoding': 'gzip'}),
+    })
+    result = _audit(site)
+    big = next(entry for entry in result["render_blocking"] if entry["url"].endswith('/big.css'))
+    # Peso compresso, non quello del CSS decodificato
+    assert big["size_kb"] == round(len(gzip.compress(css)) / 1024, 2)
@@ -0,0 +1,57 @@
+"""
+Test di equivalenza tra DocumentIndex e le ricerche soup.find_all
+"""
+
+import re
+
+from bs4 import BeautifulSoup
+
+from dom_index import DocumentIndex
+
+
+HTML = """<html><head>
+<title>Primo</title><title>Secondo</title>
+<link rel="stylesheet preload" href="/a.css"><link rel="icon" href="/f.ico">
+<link rel="stylesheet" href="/b.css">
+<meta name="description" content="desc"><meta property="og:title" content="t">
+<meta property="twitter:og:x" content="y">
+<script type="application/ld+json">{"a": 1}</script>
+<script src="/app.js"></script><script>console.log(1)</script><script></script>
+</head><body>
+<div id="top" class="hero loading"><a href="">vuoto</a><a>senza href</a></div>
+<input type="text" id="q"><button class="btn todo-item">ok</button><input type="submit">
+<span class="Placeholder">x</span><p class="loading">y</p>
+<img src="/i.png"><img data-src="/lazy.png">
+<form><a href="#top">su</a></form><h1>uno</h1><h1>due</h1>
+</body></html>"""
+
+
+def _same(a, b):
+    return [id(x) for x in a] == [id(x) for x in b]
+
+
+def test_index_matches_find_all():
+    soup = BeautifulSoup(HTML, 'html.parser')
+    dom = DocumentIndex(soup)
+
+    assert _same(dom.tags('a'), soup.find_all('a'))
+    assert _same(dom.with_attr('a', 'href'), soup.find_all('a', href=True))
+    assert _same(dom.tags('button', 'input'), soup.find_all(['button', 'input']))
+    assert _same(dom.with_attr('link', 'rel', 'stylesheet'), soup.find_all('link', rel='stylesheet'))
+    assert _same(dom.with_attr('script', 'src'), soup.find_all('script', src=True))
+    assert _same(dom.with_attr('img', 'src'), soup.find_all('img', src=True))
+    assert _same(dom.with_attr('script', 'type', 'application/ld+json'),
+                 soup.find_all('script', type='application/ld+json'))
+    assert dom.first('title') is soup.find('title')
+    assert set(dom.ids) == {e.get('id') for e in soup.find_all() if e.get('id')}
+    assert _same(dom.scripts, [s for s in soup.find_all('script') if s.string])
+
+    pattern = re.compile(r'(placeholder|loading|todo)', re.I)
+    assert _same(dom.with_class_matching(pattern), soup.find_all(attrs={'class': pattern}))
+
+
+def test_missing_tags_are_empty():
+    dom = DocumentIndex(BeautifulSoup("<p>x</p>", 'html.parser'))
+    assert dom.tags('a') == []
+    assert dom.tags('a', 'img') == []
+    assert dom.first('title') is None
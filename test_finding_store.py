@@ -0,0 +1,136 @@
+"""
+Test per l'archivio compatto dei risultati (codifica, spill su SQLite, report JSON)
+"""
+
+import io
+import json
+import os
+
+from finding_store import FindingStore, write_report
+from site_crawler import SiteCrawler
+from website_auditor import save_report
+
+PAGE = {
+    "url": "https://x.test/a",
+    "depth": 1,
+    "status": 200,
+    "issues": {"critical": 0, "high": 2, "medium": 0, "low": 1},
+    "audit": {
+        "values": [1, 1.0, True, False, None, -7, 2**70, -2**70, 0.1, "è", "", [], {}, [[{}]]],
+        "links": [{"url": "/b", "full_url": "https://x.test/b"}, {"url": "/c", "full_url": "https://x.test/c"}]
+    }
+}
+
+
+def test_roundtrip_keeps_types_and_order():
+    store = FindingStore()
+    store.add(PAGE)
+    decoded = store[0]
+    assert decoded == PAGE
+    assert list(decoded["audit"]) == ["values", "links"]
+    values = decoded["audit"]["values"]
+    assert [type(value) for value in values[:3]] == [int, float, bool]
+    assert store.decode(store.encode("solo")) == "solo"
+
+
+def test_strings_and_shapes_are_shared():
+    store = FindingStore()
+    for _ in range(50):
+        store.add(json.loads(json.dumps(PAGE)))
+    single = FindingStore()
+    single.add(PAGE)
+    assert len(store) == 50
+    assert store.stats()["unique_strings"] == single.stats()["unique_strings"]
+    assert store.stats()["shapes"] == single.stats()["shapes"]
+    assert all(page == PAGE for page in store)
+
+
+def test_spill_to_sqlite():
+    store = FindingStore(max_memory_bytes=1)
+    pages = [dict(PAGE, url=f"https://x.test/{i}") for i in range(5)]
+    for page in pages:
+        store.add(page)
+    assert store.stats()["spilled_pages"] == 5 and store.token_bytes == 0
+    assert os.path.exists(store.spill_path)
+    assert list(store) == pages and store[3] == pages[3]
+    store.close()
+    assert not os.path.exists(store.spill_path)
+
+
+def test_strings_spill_with_pages():
+    """Con le stringhe uniche oltre la soglia gli spill restano rari e la memoria limitata"""
+    store = FindingStore(max_memory_bytes=200 * 1024, string_cache_size=100)
+    pages = [{"url": f"https://x.test/{i}", "title": f"Pagina {i}", "size_kb": i / 3, "links": ["/", "/privacy"]}
+             for i in range(4000)]
+    for page in pages:
+        store.add(page)
+    stats = store.stats()
+    # 2 stringhe per pagina, "/" e "/privacy" e le 4 chiavi del dizionario
+    assert stats["unique_strings"] == 8006
+    assert 0 < stats["spills"] < 40 and stats["memory_bytes"] <= 200 * 1024
+    assert store.strings == [] and len(store._ids_lru) <= 100
+    assert store[1234] == pages[1234] and list(store) == pages
+    # Le stringhe già su disco vengono riusate, non duplicate
+    store.add(pages[0])
+    assert store.stats()["unique_strings"] == 8006
+    store.close()
+
+
+def test_url_keyed_dicts_stay_within_the_limit():
+    """Dizionari con URL come chiavi: una forma per pagina, contata e spostata su disco come le stringhe"""
+    limit = 64 * 1024
+    store = FindingStore(max_memory_bytes=limit, string_cache_size=100)
+    pages = [{"url": f"https://x.test/{i}",
+              "status_codes": {f"https://x.test/{i}/a": 200, f"https://x.test/{i}/b": 404}}
+             for i in range(2000)]
+    for page in pages:
+        store.add(page)
+        assert store.memory_bytes() <= limit
+    stats = store.stats()
+    assert stats["shapes"] == 2001 and stats["spills"] > 0
+    assert store.shapes == [] and len(store._shape_ids_lru) <= 100
+    assert store[1500] == pages[1500] and list(store) == pages
+    # Chiavi solo in memoria: la forma pesa quanto le sue stringhe
+    single = FindingStore()
+    before = single.memory_bytes()
+    single.encode({"https://x.test/" + "a" * 1000: 1})
+    assert single.memory_bytes() - before > 1000 and single.shape_bytes > 0
+    store.close()
+
+
+def test_write_report_matches_json_dump(tmp_path):
+    store = FindingStore(max_memory_bytes=1, spill_path=str(tmp_path / 'spill.db'))
+    store.add(PAGE)
+    store.add(dict(PAGE, url="https://x.test/z"))
+    report = {"metadata": {"mode": "crawl"}, "pages": store, "skipped": []}
+    expected = dict(report, pages=list(store))
+
+    output = io.StringIO()
+    write_report(report, output)
+    assert output.getvalue() == json.dumps(expected, indent=2, ensure_ascii=False)
+    output = io.StringIO()
+    write_report({"pages": FindingStore()}, output)
+    assert json.loads(output.getvalue()) == {"pages": []}
+
+    path = tmp_path / 'audit.json'
+    save_report(report, str(path))
+    assert json.loads(path.read_text(encoding='utf-8')) == expected
+    store.close()
+    assert os.path.exists(tmp_path / 'spill.db')
+
+
+def test_crawl_with_store_gives_same_pages(http_site):
+    site = http_site({
+        '/': (200, '<html><head><title>Home</title></head><body><a href="/a">A</a></body></html>', 'text/html'),
+        '/a': (200, '<html><head><title>A</title></head><body>Lorem ipsum</body></html>', 'text/html'),
+    })
+    options = dict(crawl_delay=0, respect_robots=False, sections=['seo_analysis', 'placeholder_content'])
+    plain = SiteCrawler(site.base_url, **options).crawl()
+    store = FindingStore(max_memory_bytes=1)
+    compact = SiteCrawler(site.base_url, store=store, **options).crawl()
+
+    assert compact["pages"] is store and len(store) == 2
+    assert compact["metadata"]["finding_store"]["spilled_pages"] == 2
+    assert compact["summary"] == plain["summary"]
+    assert list(store) == plain["pages"]
+    store.close()
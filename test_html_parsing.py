@@ -0,0 +1,127 @@
+"""
+Test di parità tra i backend di parsing: ogni sezione audit_* deve
+produrre lo stesso risultato di html.parser.
+"""
+
+import pytest
+
+from html_parsing import StreamingExtractor, available_backends, resolve_backend
+from website_auditor import WebsiteAuditor
+
+
+PAGE = """<!DOCTYPE html>
+<html lang="it">
+<head>
+<meta charset="utf-8">
+<title>Negozio &amp; Catalogo</title>
+<meta name="description" content="Il nostro catalogo">
+<meta property="og:title" content="Catalogo"><meta property="og:url" content="/">
+<link rel="stylesheet" href="/main.css"><link rel="preload stylesheet" href="/extra.css">
+<script src="/app.js"></script>
+<script type="application/ld+json">{"@type": "Organization"}</script>
+<script>var api_key = "abcdefghijklmnopqrstuvwxyz012345"; console.log("avvio");
+try { init(); } catch (e) { console.error(e); }</script>
+<style>.x { color: red }</style>
+</head>
+<body>
+<!-- commento -->
+<header id="top" class="site-header">
+<a href="/">Home</a> <a href="/ok" class="nav active">Chi siamo</a>
+<a href="#">Vuoto</a> <a href="#missing">Ancora</a> <a href="#top">Su</a>
+<a href="javascript:void(0)">JS</a>
+</header>
+<main>
+<h1>Catalogo <em>2024</em></h1>
+<div class="card loading" data-x='a "quoted" value'>Caricamento... TODO</div>
+<p class="Placeholder-text">Lorem ipsum dolor &lt;sit&gt; amet</p>
+<img src="/logo.png" alt="Logo"><img src="/missing.png" alt="">
+<button class="btn primary" onclick="go()">Vai</button>
+<button class="btn ghost">Nessuna azione</button>
+<input type="submit" value="Invia fuori form">
+<input type="text" name="q">
+<form action="/submit" method="post"><input name="email" type="email" required>
+<select name="s"><option>1</option></select><button>Invia</button></form>
+<form action="#"><textarea name="msg"> testo </textarea></form>
+<form action="/gone"><input name="x"></form>
+</main>
+<footer>
+<a href="/privacy">Privacy Policy</a> <a href="/terms">Termini e condizioni</a>
+<a href="/cookie">Cookie</a> <a href="https://external.invalid/x">Esterno</a>
+</footer>
+</body>
+</html>
+"""
+
+ROUTES = {
+    '/': (200, PAGE, 'text/html; charset=utf-8'),
+    '/ok': (200, 'ok', 'text/html'),
+    '/privacy': (200, 'ok', 'text/html'),
+    '/terms': (200, 'ok', 'text/html'),
+    '/main.css': (200, 'body{}', 'text/css'),
+    '/app.js': (200, '1', 'application/javascript'),
+    '/logo.png': (200, 'PNG', 'image/png'),
+    '/submit': (200, 'ok', 'text/html'),
+}
+
+SECTIONS = [
+    'audit_links_and_routes', 'audit_broken_anchors', 'audit_buttons', 'audit_forms',
+    'audit_assets', 'audit_security', 'audit_console_errors', 'audit_placeholders',
+    'audit_policy_links', 'audit_seo'
+]
+
+BACKENDS = [name for name in ('html.parser', 'lxml', 'selectolax', 'stream') if name in available_backends()]
+
+
+def _sections(base, parser, html=PAGE):
+    auditor = WebsiteAuditor(base, parser=parser)
+    auditor.load_html(html)
+    return {name: getattr(auditor, name)() for name in SECTIONS}
+
+
+@pytest.fixture
+def site(http_site):
+    return http_site(ROUTES)
+
+
+@pytest.mark.parametrize('parser', BACKENDS)
+def test_sections_match_html_parser(site, parser):
+    expected = _sections(site.base_url, 'html.parser')
+    actual = _sections(site.base_url, parser)
+    for name in SECTIONS:
+        assert actual[name] == expected[name], name
+
+
+def test_reference_report_is_meaningful(site):
+    results = _sections(site.base_url, 'html.parser')
+    assert results['audit_seo']['meta_title']['content'] == "Negozio & Catalogo"
+    assert len(results['audit_placeholders']['warning_elements']) == 2
+    assert results['audit_security']['exposed_secrets']
+    assert results['audit_buttons']['css_selectors'] == ['button.btn.ghost', 'input']
+
+
+def test_stream_download_matches_html_parser(site):
+    streamed = WebsiteAuditor(site.base_url, parser='stream')
+    assert streamed.download_page()
+    reference = WebsiteAuditor(site.base_url)
+    reference.download_page()
+    for name in SECTIONS:
+        assert getattr(streamed, name)() == getattr(reference, name)(), name
+
+
+def test_stream_keeps_only_captured_elements():
+    extractor = StreamingExtractor()
+    for chunk in ("<div><p>uno <b>due</b></p>", "<a href='/x'>li", "nk</a><span>tre</span></div>"):
+        extractor.feed(chunk)
+    root, dom = extractor.finish()
+    assert dom.tags('div') == [] and dom.tags('span') == []
+    assert [str(a) for a in dom.tags('a')] == ['<a href="/x">link</a>']
+    assert root.get_text() == "uno duelinktre"
+
+
+def test_resolve_backend_fallback(monkeypatch, capsys):
+    monkeypatch.setattr('html_parsing.available_backends', lambda: ['html.parser', 'stream'])
+    assert resolve_backend('selectolax') == 'html.parser'
+    assert "non installato" in capsys.readouterr().out
+    assert resolve_backend('auto') == 'html.parser'
+    with pytest.raises(ValueError):
+        resolve_backend('regex')
@@ -0,0 +1,154 @@
+"""
+Test per il livello di trasporto HTTP
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_transport import DnsCache, HttpTransport, TransportStats
+from website_auditor import WebsiteAuditor
+
+
+class _ThrottledHandler(BaseHTTPRequestHandler):
+    """Risponde 503 con Retry-After alle prime `failures` richieste"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.calls += 1
+        if self.server.calls <= self.server.failures:
+            self.send_response(503)
+            self.send_header('Retry-After', self.server.retry_after)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def throttled():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _ThrottledHandler)
+    httpd.calls = 0
+    httpd.failures = 1
+    httpd.retry_after = '0'
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    httpd.base_url = f"http://127.0.0.1:{httpd.server_address[1]}/"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_connections_are_reused(http_site):
+    site = http_site({'/': (200, 'ok', 'text/html')}, keep_alive=True)
+    transport = HttpTransport()
+    session = transport.create_session()
+    for _ in range(5):
+        assert session.get(site.base_url, timeout=5).status_code == 200
+    stats = transport.report()
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1 and stats["connections_reused"] == 4
+
+
+def test_retry_honours_retry_after(throttled):
+    transport = HttpTransport(retries=2)
+    response = transport.create_session().get(throttled.base_url, timeout=5)
+    assert response.status_code == 200
+    assert transport.report()["retries"] == 1
+
+
+def test_retry_after_is_capped(throttled):
+    throttled.retry_after = '120'
+    transport = HttpTransport(retries=1, max_retry_after=0.2)
+    started = time.monotonic()
+    assert transport.create_session().get(throttled.base_url, timeout=5).status_code == 200
+    assert time.monotonic() - started < 5
+
+
+def test_retries_exhausted_return_last_response(throttled):
+    throttled.failures = 10
+    transport = HttpTransport(retries=1)
+    assert transport.create_session().get(throttled.base_url, timeout=5).status_code == 503
+    assert throttled.calls == 2
+
+
+def test_split_timeout():
+    assert HttpTransport().split_timeout(5) == 5
+    assert HttpTransport(connect_timeout=2).split_timeout(5) == (2, 5)
+    assert HttpTransport(connect_timeout=2, read_timeout=8).split_timeout(5) == (2, 8)
+    assert HttpTransport(connect_timeout=2).split_timeout((1, 3)) == (1, 3)
+
+
+def test_dns_cache():
+    stats = TransportStats()
+    dns = DnsCache(stats, ttl=60)
+    assert dns.resolve('127.0.0.1', 80) == ['127.0.0.1']
+    first = dns.resolve('localhost', 80)
+    assert dns.resolve('localhost', 80) == first
+    snapshot = stats.snapshot()
+    assert snapshot["dns_lookups"] == 1 and snapshot["dns_cache_hits"] == 1
+
+
+def test_dns_cache_tries_every_address(http_site, monkeypatch):
+    import socket
+
+    site = http_site({'/': (200, 'ok', 'text/plain')})
+    port = int(site.base_url.rsplit(':', 1)[1].strip('/'))
+    # Il primo indirizzo rifiuta la connessione, il secondo è il server di test
+    infos = [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (address, port)) for address in ('127.0.0.2', '127.0.0.1')]
+    resolve = socket.getaddrinfo
+    monkeypatch.setattr(socket, 'getaddrinfo',
+                        lambda host, *args, **kwargs: infos if host == 'sito.test' else resolve(host, *args, **kwargs))
+    transport = HttpTransport()
+    session = transport.create_session()
+    assert session.get(f"http://sito.test:{port}/", timeout=5).text == 'ok'
+    assert transport.dns.resolve('sito.test', port) == ['127.0.0.2', '127.0.0.1']
+    assert transport.report()["dns_lookups"] == 1
+
+
+def test_audit_reports_transport_counters(http_site):
+    site = http_site({'/': (200, '<a href="/a">a</a><a href="/b">b</a>', 'text/html'),
+                      '/a': (200, 'a', 'text/html'), '/b': (200, 'b', 'text/html')}, keep_alive=True)
+    results = WebsiteAuditor(site.base_url, max_workers=1).run_full_audit()
+    transport = results["metadata"]["transport"]
+    assert transport["connections_reused"] >= 2
+    assert transport["connections_opened"] + transport["connections_reused"] == transport["requests"]
+
+
+def test_http2_adapter_options_and_byte_count(http_site):
+    httpx = pytest.importorskip('httpx')
+    pytest.importorskip('h2')
+    import ssl
+
+    from http_transport import Http2Adapter, _ssl_context
+
+    site = http_site({'/grande': (200, 'x' * 200000, 'text/plain')}, keep_alive=True)
+    transport = HttpTransport()
+    adapter = Http2Adapter(transport, httpx)
+    session = transport.create_session()
+    session.mount('http://', adapter)
+
+    # I byte vengono contati mentre il corpo arriva, non solo alla chiusura
+    with session.get(site.base_url + 'grande', stream=True, timeout=5) as response:
+        chunks = response.iter_content(chunk_size=65536)
+        next(chunks)
+        assert 0 < transport.report()["bytes_received"] < 200000
+        sum(len(chunk) for chunk in chunks)
+    assert transport.report()["bytes_received"] >= 200000
+
+    # Proxy e TLS di requests arrivano al client httpx
+    proxy = http_site({})
+    session.get("http://sito.test/pagina", proxies={'http': proxy.base_url}, timeout=5)
+    assert proxy.hits == [('GET', "http://sito.test/pagina")]
+    assert adapter._client(False, None, None) is adapter._client(False, None, None)
+    assert adapter._client(False, None, None) is not adapter._client(True, None, None)
+    assert _ssl_context(False, None).verify_mode == ssl.CERT_NONE
+    assert _ssl_context(True, None).verify_mode == ssl.CERT_REQUIRED
+    adapter.close()
@@ -0,0 +1,77 @@
+"""
+Test per l'analisi delle immagini (formato, dimensioni, risparmi stimati)
+"""
+
+import struct
+
+from image_analysis import analyze_image, image_format, parse_srcset
+from website_auditor import WebsiteAuditor
+
+
+def png(width, height, size=0):
+    header = b'\x89PNG\r\n\x1a\n' + b'\x00\x00\x00\rIHDR' + struct.pack('>II', width, height)
+    return header + b'\x00' * max(0, size - len(header))
+
+
+def jpeg(width, height):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    sof = b'\xff\xc0' + struct.pack('>HBHH', 17, 8, height, width) + b'\x00' * 10
+    return b'\xff\xd8' + app0 + sof
+
+
+def test_image_format_from_header_bytes():
+    assert image_format(png(800, 600)) == ('png', (800, 600))
+    assert image_format(jpeg(1920, 1080)) == ('jpeg', (1920, 1080))
+    assert image_format(b'GIF89a' + struct.pack('<HH', 16, 32)) == ('gif', (16, 32))
+    vp8x = b'RIFF\x00\x00\x00\x00WEBPVP8X' + b'\x00' * 8 + (399).to_bytes(3, 'little') + (299).to_bytes(3, 'little')
+    assert image_format(vp8x) == ('webp', (400, 300))
+    assert image_format(b'<svg xmlns="http://www.w3.org/2000/svg"></svg>') == ('svg', None)
+    assert image_format(b'not an image') == (None, None)
+
+
+def test_oversized_image_savings():
+    header = {"format": 'jpeg', "width": 2000, "height": 1000, "bytes": 400 * 1024}
+    image = analyze_image({'src': '/hero.jpg', 'width': '500', 'height': '250'}, header, 0)
+    # Servita a 2x basterebbero 1000px di larghezza: un quarto dei pixel
+    assert image["resize_savings_kb"] == 300
+    assert image["format_savings_kb"] == {'webp': 30.0, 'avif': 50.0}
+    assert "oversized" in image["issues"] and "legacy_format" in image["issues"]
+    assert "missing_lazy_loading" not in image["issues"]
+
+
+def test_lazy_loading_and_dimensions():
+    header = {"format": 'webp', "width": 100, "height": 100, "bytes": 1024}
+    below = analyze_image({'src': '/a.webp'}, header, 5)
+    assert below["issues"] == ["missing_dimensions", "missing_lazy_loading"]
+    lazy = analyze_image({'src': '/a.webp', 'width': '100', 'height': '50', 'loading': 'lazy'}, header, 5)
+    assert lazy["issues"] == ["aspect_ratio_mismatch"]
+
+
+def test_srcset_parsing():
+    assert parse_srcset('a.jpg 480w, b.jpg 960w') == [('a.jpg', '480w'), ('b.jpg', '960w')]
+    header = {"format": 'png', "width": 3000, "height": 2000, "bytes": 1024}
+    image = analyze_image({'src': '/a.png', 'srcset': 'a.png 480w, b.png 960w'}, header, 0)
+    assert "srcset_without_sizes" in image["issues"]
+    assert "oversized" not in image["issues"]
+
+
+def test_audit_images_reads_only_headers(http_site):
+    page = ('<html><body><img src="/hero.png" width="300" height="200">'
+            '<img src="/missing.png" alt="x"><img src="data:image/png;base64,AAAA">'
+            '<img src="/footer.png" width="100" height="100" loading="lazy"></body></html>')
+    site = http_site({
+        '/': (200, page, 'text/html'),
+        '/hero.png': (200, png(1200, 800, 64 * 1024), 'image/png'),
+        '/footer.png': (200, png(100, 100, 2048), 'image/png'),
+    })
+    auditor = WebsiteAuditor(site.base_url)
+    assert auditor.download_page()
+    result = auditor.audit_images()
+
+    hero, missing, footer = result["images"]
+    assert hero["intrinsic"] == [1200, 800] and hero["declared"] == [300, 200]
+    assert "oversized" in hero["issues"]
+    assert missing == {"url": f"{site.base_url}missing.png", "status": 404, "issues": []}
+    assert footer["issues"] == []
+    assert result["summary"]["images"] == 3
+    assert result["summary"]["issues"]["oversized"] == 1
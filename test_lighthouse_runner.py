@@ -0,0 +1,102 @@
+"""
+Test per il pool di esecuzioni Lighthouse, con un finto eseguibile `lighthouse` nel PATH
+"""
+
+import json
+import os
+import stat
+import sys
+import time
+
+import pytest
+
+from lighthouse_compare import LighthouseRunner, default_concurrency, main
+
+FAKE_LIGHTHOUSE = """#!{python}
+import json, os, sys, time
+
+args = sys.argv[1:]
+url = args[0]
+path = next(arg.split('=', 1)[1] for arg in args if arg.startswith('--output-path='))
+if 'hang' in url:
+    time.sleep(60)
+if 'fail' in url:
+    sys.stderr.write('Runtime error encountered: NO_FCP')
+    sys.exit(1)
+
+started = time.time()
+time.sleep(float(os.environ.get('FAKE_LH_DELAY', '0')))
+lcp = 3200 if os.sep + 'after' + os.sep in path else 2500
+audits = {{'largest-contentful-paint': {{'numericValue': lcp}},
+          'first-contentful-paint': {{'numericValue': 1200}}}}
+with open(path, 'w') as f:
+    json.dump({{'requestedUrl': url, 'categories': {{'performance': {{'score': 0.9}}}}, 'audits': audits}}, f)
+with open(os.environ['FAKE_LH_LOG'], 'a') as f:
+    f.write(f"{{started}} {{time.time()}}\\n")
+"""
+
+
+@pytest.fixture
+def fake_lighthouse(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "lighthouse"
+    script.write_text(FAKE_LIGHTHOUSE.format(python=sys.executable))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    log = tmp_path / "runs.log"
+    log.write_text("")
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_LH_LOG", str(log))
+    return log
+
+
+def _max_overlap(log):
+    intervals = [tuple(map(float, line.split())) for line in log.read_text().splitlines()]
+    return max(sum(1 for start, end in intervals if start <= moment < end) for moment, _ in intervals)
+
+
+def test_concurrency_is_cpu_aware():
+    assert default_concurrency(8) == 4
+    assert default_concurrency(1) == 1
+    assert LighthouseRunner(concurrency=16, cpus=4).concurrency == 4
+
+
+def test_batch_runs_in_bounded_pool(fake_lighthouse, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_LH_DELAY", "0.3")
+    runner = LighthouseRunner(output_dir=str(tmp_path / "reports"), concurrency=2, cpus=4)
+    results = runner.run_batch(["http://a.test/", "http://b.test/"], runs=3, label='before')
+
+    assert [(entry["url"], entry["run"]) for entry in results] == [
+        ("http://a.test/", 1), ("http://b.test/", 1), ("http://a.test/", 2),
+        ("http://b.test/", 2), ("http://a.test/", 3), ("http://b.test/", 3)]
+    assert all(entry["ok"] for entry in results)
+    # Un file per esecuzione, separato per lato e URL
+    assert len({entry["path"] for entry in results}) == 6
+    assert results[0]["path"].endswith(os.path.join("before", "a-test", "run-1.json"))
+    assert _max_overlap(fake_lighthouse) == 2
+
+
+def test_failures_and_timeouts_are_collected(fake_lighthouse, tmp_path):
+    runner = LighthouseRunner(output_dir=str(tmp_path), timeout=0.5, concurrency=2, cpus=2)
+    started = time.monotonic()
+    hang, fail = runner.run_batch(["http://hang.test/", "http://fail.test/"], runs=1)
+    assert time.monotonic() - started < 10
+    assert hang["error"] == "timeout dopo 0.5s"
+    assert "NO_FCP" in fail["error"]
+
+
+def test_missing_executable(tmp_path):
+    runner = LighthouseRunner(output_dir=str(tmp_path), executable=str(tmp_path / "nope"))
+    entry, = runner.run_batch(["http://a.test/"], runs=1)
+    assert not entry["ok"] and "non trovato" in entry["error"]
+
+
+def test_main_runs_before_and_after(fake_lighthouse, tmp_path):
+    output = tmp_path / "confronto.json"
+    code = main(["http://a.test/", "http://b.test/", "--runs", "3", "--output-dir", str(tmp_path / "reports"),
+                 "-o", str(output)])
+    comparisons = json.loads(output.read_text())
+    assert code == 1
+    assert sorted(comparisons) == ["http://a.test/", "http://b.test/"]
+    assert comparisons["http://a.test/"]["regressions"] == ["lcp"]
+    assert comparisons["http://a.test/"]["runs"] == {"before": 3, "after": 3}
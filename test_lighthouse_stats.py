@@ -0,0 +1,92 @@
+"""
+Test per il confronto statistico di più esecuzioni Lighthouse (fixture LHR, niente Chrome)
+"""
+
+import json
+import os
+
+import pytest
+
+from lighthouse_compare import main
+from lighthouse_stats import (_betainc, _from_document, _from_events, compare_metric, compare_runs,
+                              load_runs, load_thresholds, read_lhr, welch_t_test)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'lighthouse')
+
+
+def _fixtures(pattern):
+    return [os.path.join(FIXTURES, pattern)]
+
+
+def test_read_lhr_extracts_core_metrics():
+    run = read_lhr(os.path.join(FIXTURES, 'before-1.json'))
+    assert run["url"] == "http://localhost:3000/"
+    assert run["metrics"] == {'fcp': 1200, 'lcp': 2400, 'tbt': 200, 'cls': 0.1, 'si': 3000, 'tti': 4000}
+    assert run["scores"]["performance"] == pytest.approx(82)
+    # Anche compresso
+    assert read_lhr(os.path.join(FIXTURES, 'after-3.json.gz'))["metrics"]["lcp"] == 3200
+
+
+def test_event_extraction_matches_document():
+    """Il percorso in streaming (eventi stile ijson.parse) dà lo stesso risultato di json.load"""
+    with open(os.path.join(FIXTURES, 'before-2.json'), encoding='utf-8') as f:
+        data = json.load(f)
+
+    def events(value, prefix=''):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                yield from events(item, f"{prefix}.{key}" if prefix else key)
+        elif isinstance(value, list):
+            for item in value:
+                yield from events(item, f"{prefix}.item")
+        elif isinstance(value, str):
+            yield prefix, 'string', value
+        elif value is None:
+            yield prefix, 'null', None
+        else:
+            yield prefix, 'number', value
+
+    assert _from_events(events(data)) == _from_document(data)
+
+
+def test_failed_runs_are_skipped():
+    runs, skipped = load_runs(_fixtures('after-*'))
+    assert len(runs) == 3
+    assert [entry["reason"] for entry in skipped] == ["NO_FCP"]
+
+
+def test_welch_t_test():
+    # Valore critico di t con 4 gradi di libertà per alpha 0.05
+    assert _betainc(2, 0.5, 4 / (4 + 2.776 ** 2)) == pytest.approx(0.05, abs=1e-3)
+    assert welch_t_test([1, 2, 3], [1, 2, 3]) == 1.0
+    assert welch_t_test([5], [6, 7]) is None
+
+
+def test_multi_run_comparison():
+    before, _ = load_runs(_fixtures('before-*'))
+    after, _ = load_runs(_fixtures('after-*'))
+    comparison = compare_runs(before, after)
+    statuses = {name: result["status"] for name, result in comparison["metrics"].items()}
+    assert statuses == {'fcp': 'unchanged', 'lcp': 'regression', 'tbt': 'unchanged',
+                        'cls': 'improvement', 'si': 'inconclusive', 'tti': 'unchanged'}
+    assert comparison["metrics"]["lcp"]["after"]["median"] == 3100
+    assert comparison["regressions"] == ["lcp"]
+    assert comparison["categories"]["performance"]["delta"] == pytest.approx(-6)
+
+
+def test_thresholds(tmp_path):
+    # Sotto la soglia assoluta una variazione significativa resta 'unchanged'
+    assert compare_metric([100, 101, 102], [120, 121, 122], {'abs': 50, 'pct': 5})["status"] == "unchanged"
+    path = tmp_path / "soglie.json"
+    path.write_text(json.dumps({"lcp": {"abs": 1000}}))
+    assert load_thresholds(str(path))["lcp"] == {'abs': 1000, 'pct': 10}
+    path.write_text(json.dumps({"ttfb": {"abs": 10}}))
+    with pytest.raises(ValueError):
+        load_thresholds(str(path))
+
+
+def test_cli_exit_code(tmp_path):
+    output = tmp_path / "confronto.json"
+    assert main(['--before', *_fixtures('before-*'), '--after', *_fixtures('after-*'), '-o', str(output)]) == 1
+    assert json.loads(output.read_text())["regressions"] == ["lcp"]
+    assert main(['--before', *_fixtures('before-*'), '--after', *_fixtures('before-*')]) == 0
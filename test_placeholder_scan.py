@@ -0,0 +1,65 @@
+"""
+Test per la ricerca in una passata di segnaposto e TODO
+"""
+
+import pytest
+
+from audit_rules import RuleMatcher, RuleRegistry
+from html_parsing import available_backends, parse_document
+from placeholder_scan import context, scan_text_nodes
+from website_auditor import WebsiteAuditor
+
+PAGE = """<html><head><title>Coming soon</title><script>// TODO non è testo</script></head>
+<body><div id="hero"><h2>Benvenuti</h2><p class="intro">Testo vero, poi lorem ipsum dolor sit amet.</p></div>
+<ul><li>FIXME: prezzo</li><li>Todoist non è un todo</li></ul>
+<!-- TODO nei commenti: ignorato --></body></html>"""
+
+BACKENDS = [name for name in ('html.parser', 'lxml', 'selectolax', 'stream') if name in available_backends()]
+
+
+def _placeholders(parser, html=PAGE):
+    auditor = WebsiteAuditor('http://127.0.0.1:9/', parser=parser)
+    auditor.load_html(html)
+    return auditor.audit_placeholders()
+
+
+@pytest.mark.parametrize('parser', BACKENDS)
+def test_hits_carry_selector_and_context(parser):
+    results = _placeholders(parser)
+    assert results["placeholder_texts"] == ["Coming soon", "lorem ipsum"]
+    assert [(hit["selector"], hit["context"]) for hit in results["placeholder_locations"]] == [
+        ("title", "Coming soon"),
+        ("p.intro", "Testo vero, poi lorem ipsum dolor sit amet."),
+    ]
+    # Solo parole intere, mai script o commenti
+    assert [(hit["text"], hit["selector"]) for hit in results["todo_items"]] == [("FIXME", "li"), ("todo", "li")]
+
+
+def test_matcher_reports_rule_with_inner_groups():
+    matcher = RuleMatcher([("a", [r"(x)(y)z", r"foo"]), ("b", [r"(?:ba)(r)"])])
+    hits = [(match.group(), rule) for match, rule in matcher.finditer("xyz bar foo")]
+    assert hits == [("xyz", "a"), ("bar", "b"), ("foo", "a")]
+    with pytest.raises(ValueError):
+        RuleMatcher([("a", [r"(?P<n>x)"]), ("b", [r"(?P<n>y)"])])
+
+
+def test_context_is_bounded():
+    text = "a" * 100 + " TODO " + "b" * 100
+    snippet = context(text, 101, 105, width=10)
+    assert snippet == "…aaaaaaaaa TODO bbbbbbbbb…"
+
+
+def test_scan_is_linear_in_text_nodes():
+    """Una riga per nodo, nessuna concatenazione del testo della pagina"""
+    html = "<body>" + "<p>testo normale</p>" * 5000 + "<p>placeholder</p></body>"
+    soup, _ = parse_document(html, 'html.parser')
+    seen = []
+
+    def selector(element):
+        seen.append(element)
+        return element.name
+
+    hits = list(scan_text_nodes(soup, RuleRegistry().matcher('placeholder_text', 'todo_marker'), selector))
+    assert [(hit["rule"], hit["selector"]) for hit in hits] == [("placeholder_text", "p")]
+    # Il selettore viene calcolato solo per gli elementi con un match
+    assert len(seen) == 1
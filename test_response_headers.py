@@ -0,0 +1,102 @@
+"""
+Test per l'analisi degli header di cache, compressione e Vary
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from response_headers import analyze_response, effective_ttl
+from website_auditor import WebsiteAuditor
+
+PAGE = (b'<html><head><link rel="stylesheet" href="/app.css"><script src="/app.js"></script></head>'
+        b'<body><img src="/logo.png" alt="logo"></body></html>')
+
+# path -> (content type, header aggiuntivi)
+ROUTES = {
+    '/': ('text/html', {'ETag': '"p1"', 'Cache-Control': 'no-cache'}),
+    '/app.css': ('text/css', {'Cache-Control': 'public, max-age=31536000, immutable',
+                              'Content-Encoding': 'br', 'Vary': 'Accept-Encoding'}),
+    '/app.js': ('application/javascript', {'Cache-Control': 'max-age=300', 'Vary': 'User-Agent'}),
+    '/logo.png': ('image/png', {}),
+}
+
+
+class _HeaderHandler(BaseHTTPRequestHandler):
+    """Header di cache per route; la compressione br solo se il client la offre"""
+
+    def _reply(self, with_body):
+        content_type, headers = ROUTES[self.path]
+        body = PAGE if self.path == '/' else b'x' * 100
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            if name == 'Content-Encoding' and 'br' not in (self.headers.get('Accept-Encoding') or ''):
+                continue
+            self.send_header(name, value)
+        self.end_headers()
+        if with_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply(True)
+
+    def do_HEAD(self):
+        self._reply(False)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def header_site():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _HeaderHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_effective_ttl():
+    date = 'Mon, 01 Jan 2024 00:00:00 GMT'
+    assert effective_ttl({'cache-control': 'max-age=60, public'}) == (60, 'max-age')
+    assert effective_ttl({'cache-control': 'no-store', 'expires': date}) == (0, 'no-store')
+    assert effective_ttl({'date': date, 'expires': 'Tue, 02 Jan 2024 00:00:00 GMT'}) == (86400, 'expires')
+    assert effective_ttl({'date': date, 'expires': '0'}) == (0, 'expires')
+    assert effective_ttl({'date': date, 'last-modified': 'Thu, 22 Dec 2023 00:00:00 GMT'}) == (86400, 'heuristic')
+    assert effective_ttl({}) == (0, None)
+
+
+def test_vary_and_compression_issues():
+    headers = {'content-type': 'application/json', 'content-encoding': 'gzip', 'vary': '*',
+               'cache-control': 'max-age=31536000'}
+    result = analyze_response('http://x.test/a.json', 'js', 200, headers)
+    assert result["issues"] == ["vary_star"]
+    assert result["score"] == 90
+
+    plain = analyze_response('http://x.test/a.js', 'js', 200, {'content-type': 'text/javascript'})
+    assert plain["issues"] == ["no_cache_headers", "not_compressed"]
+    assert plain["score"] == 10
+
+
+def test_audit_response_headers(header_site):
+    auditor = WebsiteAuditor(header_site, sections=["response_headers", "security_issues"])
+    results = auditor.run_full_audit()
+    report = results["response_headers"]
+    by_path = {resource["url"][len(header_site) - 1:]: resource for resource in report["resources"]}
+
+    assert list(by_path) == ['/', '/app.css', '/app.js', '/logo.png']
+    # Pagina rivalidabile (ETag) ma non compressa
+    assert by_path['/']["issues"] == ["not_compressed"] and by_path['/']["score"] == 70
+    assert by_path['/app.css']["content_encoding"] == 'br'
+    assert by_path['/app.css']["ttl_seconds"] == 31536000 and by_path['/app.css']["issues"] == []
+    assert by_path['/app.js']["issues"] == ["short_ttl", "not_compressed", "vary_fragmenting"]
+    assert by_path['/logo.png']["issues"] == ["no_cache_headers"]
+    assert report["http_versions"] == {"HTTP/1.0": 4}
+    assert report["score"] == round(sum(r["score"] for r in by_path.values()) / 4)
+
+    headers = results["security_issues"]["security_headers"]
+    assert headers["content-security-policy"] is None
@@ -0,0 +1,79 @@
+"""
+Test per lo scanner di secrets a passata singola
+"""
+
+import random
+import re
+
+from secret_scanner import SECRET_RULES, SecretScanner
+from website_auditor import WebsiteAuditor
+
+
+KEY = "sk-" + "a1B2c3D4" * 6
+GOOGLE = "AIza" + "x" * 35
+TEXT = f"""
+<script>
+var api_key = "abcdefghijklmnopqrstuvwxyz012345";
+const cfg = {{"token": "tttttttttttttttttttttttttt", "password": 'hunter22'}};
+openai("{KEY}"); maps('{GOOGLE}');
+var API-KEY='{KEY}';
+</script>
+"""
+
+
+def _legacy(text):
+    """Il vecchio algoritmo: una re.findall per regola"""
+    found = []
+    for secret_type, pattern, _ in SECRET_RULES:
+        for match in re.findall(pattern, text, re.IGNORECASE):
+            found.append((secret_type, match[:10] + "..." if len(match) > 10 else match))
+    return sorted(found)
+
+
+def test_single_pass_matches_per_rule_findall():
+    findings = SecretScanner().scan(TEXT)
+    assert sorted((f["type"], f["value"]) for f in findings) == _legacy(TEXT)
+    # La chiave dentro API-KEY='sk-...' è trovata da entrambe le regole
+    assert {f["type"] for f in findings if f["line"] == 6} == {"API Key", "OpenAI API Key"}
+
+
+def test_offsets_and_lines():
+    findings = SecretScanner().scan(TEXT, source="page")
+    for finding in findings:
+        assert TEXT.count('\n', 0, finding["offset"]) + 1 == finding["line"]
+        assert finding["source"] == "page"
+    google = next(f for f in findings if f["type"] == "Google API Key")
+    assert TEXT[google["offset"]:].startswith(GOOGLE)
+
+
+def test_chunked_scan_is_chunk_size_independent():
+    text = (TEXT + "filler " * 300) * 20
+    scanner = SecretScanner(overlap=128)
+    expected = scanner.scan(text)
+    rng = random.Random(1)
+    for _ in range(5):
+        chunks, pos = [], 0
+        while pos < len(text):
+            size = rng.randint(1, 700)
+            chunks.append(text[pos:pos + size])
+            pos += size
+        assert scanner.scan_chunks(chunks, "html") == expected
+    assert len(expected) == 20 * len(_legacy(TEXT))
+
+
+def test_inline_scripts_not_double_counted_and_bundles_scanned(http_site):
+    page = f"<html><head><script src='/bundle.js'></script>{TEXT}</head></html>"
+    site = http_site({
+        '/': (200, page, 'text/html'),
+        '/bundle.js': (200, f'const x = "{GOOGLE}";', 'application/javascript'),
+    })
+    auditor = WebsiteAuditor(site.base_url)
+    auditor.load_html(page)
+    secrets = auditor.audit_security()["exposed_secrets"]
+    inline = [f for f in secrets if f["source"] == site.base_url]
+    bundle = [f for f in secrets if f["source"] == site.base_url + "bundle.js"]
+    assert len(inline) == len(_legacy(TEXT))
+    assert [f["type"] for f in bundle] == ["Google API Key"]
+
+    auditor.audit_security()
+    assert [path for _, path in site.hits].count('/bundle.js') == 1
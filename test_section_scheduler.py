@@ -0,0 +1,94 @@
+"""
+Test per lo scheduler delle sezioni di audit
+"""
+
+import threading
+import time
+
+import pytest
+
+from section_scheduler import SectionScheduler, SectionSpec, parse_sections_arg, select_sections
+from website_auditor import WebsiteAuditor
+
+
+PAGE = """<html><head><title>DAG</title><link rel="stylesheet" href="/slow.css"></head>
+<body><a href="/slow">Lento</a><a href="/privacy">Privacy</a><a href="#">Vuoto</a>
+<form action="/slow-form"><input name="q"></form><button>Nulla</button></body></html>"""
+
+ROUTES = {
+    '/': (200, PAGE, 'text/html'),
+    '/slow': (200, 'slow', 'text/html'),
+    '/slow.css': (200, 'body{}', 'text/css'),
+    '/slow-form': (200, 'ok', 'text/html'),
+    '/privacy': (200, 'privacy', 'text/html'),
+}
+DELAYS = {'/slow': 0.4, '/slow.css': 0.4, '/slow-form': 0.4}
+
+
+def _audit(base, **kwargs):
+    results = WebsiteAuditor(base, **kwargs).run_full_audit()
+    metadata = results.pop("metadata")
+    return results, metadata
+
+
+def test_parallel_report_matches_serial(http_site):
+    site = http_site(ROUTES, delays=DELAYS)
+    serial, serial_meta = _audit(site.base_url, parallel_sections=False)
+    parallel, parallel_meta = _audit(site.base_url)
+    assert parallel == serial
+    assert list(parallel) == list(serial)
+    assert parallel_meta["probe_cache"] == serial_meta["probe_cache"]
+
+    # Le richieste restano attribuite alla sezione che le ha avviate
+    sections = parallel_meta["timings"]["sections"]
+    assert sections["missing_assets"]["requests"] == 1
+    assert sections["broken_forms"]["requests"] == 1
+    assert sections["seo_analysis"]["requests"] == 0
+    assert sum(entry["requests"] for entry in sections.values()) == parallel_meta["transport"]["requests"]
+
+
+def test_parallel_wall_time(http_site):
+    site = http_site(ROUTES, delays=DELAYS)
+    auditor = WebsiteAuditor(site.base_url)
+    auditor.download_page()
+    started = time.monotonic()
+    auditor.run_audit_sections()
+    # Le tre sezioni lente (0.4s ciascuna) si sovrappongono
+    assert time.monotonic() - started < 1.0
+
+
+def test_sections_subset(http_site):
+    site = http_site(ROUTES)
+    results, metadata = _audit(site.base_url, sections=["seo_analysis", "broken_anchors"])
+    assert list(results) == ["broken_anchors", "seo_analysis"]
+    assert metadata["transport"]["requests"] == 1
+    with pytest.raises(ValueError):
+        WebsiteAuditor(site.base_url, sections=["nessuna"])
+
+
+def test_dependencies_run_first_and_see_outputs():
+    order = []
+    lock = threading.Lock()
+    specs = [
+        SectionSpec("report", None, ('dom',), ("net_a", "net_b")),
+        SectionSpec("net_a", None, ('network',), ()),
+        SectionSpec("net_b", None, ('network',), ("net_a",)),
+        SectionSpec("dom", None, ('dom',), ()),
+    ]
+
+    def execute(spec, results):
+        with lock:
+            order.append(spec.name)
+        if spec.name == "report":
+            return results["net_a"] + results["net_b"]
+        return 1
+
+    results = SectionScheduler(specs).run(execute)
+    assert list(results) == ["report", "net_a", "net_b", "dom"]
+    assert results["report"] == 2
+    assert order.index("net_a") < order.index("net_b") < order.index("report")
+
+    assert [s.name for s in select_sections(specs, ["net_b"])] == ["net_a", "net_b"]
+    assert parse_sections_arg(" net_a, ,net_b ") == ["net_a", "net_b"]
+    with pytest.raises(ValueError):
+        SectionScheduler([SectionSpec("a", None, (), ("b",)), SectionSpec("b", None, (), ("a",))]).run(execute)
@@ -0,0 +1,70 @@
+"""
+Test per la modalità crawl (SiteCrawler)
+"""
+
+from site_crawler import CrawlFrontier, SiteCrawler
+
+
+def _page(title, *links):
+    anchors = ''.join(f'<a href="{href}">{href}</a>' for href in links)
+    return (200, f"<html><head><title>{title}</title></head><body>{anchors}</body></html>", 'text/html')
+
+
+ROUTES = {
+    '/': _page('Home', '/a', '/b#top', 'https://external.test/x'),
+    '/a': _page('A', '/', '/a/deep', '/private/secret', '/missing'),
+    '/b': _page('B', '/a', '/file.pdf'),
+    '/a/deep': _page('Deep', '/a/deeper'),
+    '/a/deeper': _page('Deeper'),
+    '/private/secret': _page('Private'),
+    '/file.pdf': (200, '%PDF', 'application/pdf'),
+    '/robots.txt': (200, 'User-agent: *\nDisallow: /private/\n', 'text/plain'),
+}
+
+
+def _crawl(base, **kwargs):
+    kwargs.setdefault('crawl_delay', 0)
+    return SiteCrawler(base, **kwargs).crawl()
+
+
+def test_crawl_follows_internal_links_by_depth(http_site):
+    site = http_site(ROUTES)
+    base = site.base_url
+    report = _crawl(base, max_depth=2)
+
+    pages = [(p["url"], p["depth"]) for p in report["pages"]]
+    assert pages == [(base, 0), (base + "a", 1), (base + "b", 1), (base + "a/deep", 2)]
+
+    reasons = {s["url"]: s["reason"] for s in report["skipped"]}
+    assert reasons[base + "private/secret"] == "robots.txt"
+    assert "404" in reasons[base + "missing"]
+    assert reasons[base + "file.pdf"].startswith("contenuto non HTML")
+
+    summary = report["summary"]
+    assert summary["pages_audited"] == 4
+    assert base + "missing" in summary["unique_broken_links"]
+    assert report["metadata"]["mode"] == "crawl"
+
+
+def test_crawl_respects_max_pages_and_ignore_robots(http_site):
+    site = http_site(ROUTES)
+    report = _crawl(site.base_url, max_depth=5, max_pages=3, respect_robots=False)
+    assert len(report["pages"]) + len(report["skipped"]) == 3
+    assert not any(path == '/robots.txt' for _, path in site.hits)
+
+
+def test_crawl_fetches_each_page_once(http_site):
+    site = http_site(ROUTES)
+    _crawl(site.base_url, max_depth=3, page_workers=3)
+    gets = [path for method, path in site.hits if method == 'GET']
+    assert len(gets) == len(set(gets))
+
+
+def test_frontier_dedup_and_limits():
+    frontier = CrawlFrontier(max_depth=1, max_pages=2)
+    assert frontier.add("http://x.test/", 0)
+    assert not frontier.add("HTTP://X.test:80/#frag", 1)
+    assert not frontier.add("http://x.test/deep", 2)
+    assert frontier.add("http://x.test/a", 1)
+    assert not frontier.add("http://x.test/b", 1)
+    assert frontier.pop_level(1) == ["http://x.test/a"]
@@ -0,0 +1,134 @@
+"""
+Test per l'audit pianificato dalle sitemap (lastmod, hash e riuso dei risultati)
+"""
+
+import gzip
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+from audit_rules import RuleRegistry
+from audit_stream import JsonlSink, read_stream
+from sitemap_planner import SitemapAuditor, iter_sitemap, open_body, parse_lastmod, plan_entry
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def _page(title):
+    return (200, f"<html><head><title>{title}</title></head><body><p>{title}</p></body></html>", 'text/html')
+
+
+def _urlset(base, entries):
+    urls = ''.join(f"<url><loc>{base}{path}</loc>{f'<lastmod>{lastmod}</lastmod>' if lastmod else ''}</url>"
+                   for path, lastmod in entries)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {NS}>{urls}</urlset>'
+
+
+def _site(http_site, lastmods):
+    """Sito con un sitemap index che punta a una sitemap compressa e a una normale"""
+    site = http_site({
+        '/': _page('Home'), '/a': _page('A'), '/b': _page('B'), '/c': _page('C'),
+        '/robots.txt': (200, '', 'text/plain'),
+    })
+    _set_sitemaps(site, lastmods)
+    return site
+
+
+def _set_sitemaps(site, lastmods):
+    base = site.base_url
+    site.routes['/sitemap.xml'] = (200, f'<sitemapindex {NS}><sitemap><loc>{base}pages.xml.gz</loc></sitemap>'
+                                        f'<sitemap><loc>/extra.xml</loc></sitemap></sitemapindex>', 'application/xml')
+    pages = _urlset(base, [('', lastmods.get('/')), ('a', lastmods.get('/a')), ('b', lastmods.get('/b'))])
+    site.routes['/pages.xml.gz'] = (200, gzip.compress(pages.encode()), 'application/gzip')
+    site.routes['/extra.xml'] = (200, _urlset(base, [('c', lastmods.get('/c')), ('a', None)])
+                                 .replace('</urlset>', '<url><loc>https://altro.test/x</loc></url></urlset>'),
+                                 'application/xml')
+
+
+def _run(site, tmp_path, name, previous=None, **kwargs):
+    kwargs.setdefault('crawl_delay', 0)
+    report = SitemapAuditor(site.base_url, previous=previous, sections=['seo_analysis'], **kwargs).crawl()
+    path = tmp_path / name
+    path.write_text(json.dumps(report))
+    return report, str(path)
+
+
+def _page_gets(site):
+    return sorted(path for method, path in site.hits if method == 'GET' and path in ('/', '/a', '/b', '/c'))
+
+
+def test_iter_sitemap_streams_entries():
+    xml = _urlset('http://x.test/', [('a', '2024-05-01'), ('b', None)]).encode()
+    entries = list(iter_sitemap(open_body([xml[:10], b'', xml[10:]])))
+    assert entries == [('url', 'http://x.test/a', '2024-05-01'), ('url', 'http://x.test/b', None)]
+    # Anche gzip senza Content-Encoding, letto a blocchi
+    compressed = gzip.compress(xml)
+    chunks = [compressed[i:i + 7] for i in range(0, len(compressed), 7)]
+    assert list(iter_sitemap(open_body(chunks))) == entries
+    assert list(iter_sitemap(io.BytesIO(xml))) == entries
+
+
+def test_plan_entry():
+    now = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    week = timedelta(days=7)
+    previous = {"lastmod": "2024-05-01", "audited_at": "2024-05-30T00:00:00+00:00", "content_hash": "h"}
+    assert parse_lastmod("2024-05-01T10:00:00Z") == datetime(2024, 5, 1, 10, tzinfo=timezone.utc)
+    assert parse_lastmod("ieri") is None
+    assert plan_entry("2024-05-01", None, now, week) == 'new'
+    assert plan_entry("2024-05-01T00:00:00+00:00", previous, now, week) == 'unchanged'
+    assert plan_entry("2024-05-02", previous, now, week) == 'changed'
+    assert plan_entry(None, previous, now, week) == 'check'
+    # Risultati troppo vecchi: si rianalizza comunque
+    assert plan_entry("2024-05-01", previous, now + week, week) == 'changed'
+
+
+def test_only_new_and_changed_pages_are_audited(http_site, tmp_path):
+    lastmods = {'/': '2024-05-01', '/a': '2024-05-01', '/b': '2024-05-01'}
+    site = _site(http_site, lastmods)
+    first, path = _run(site, tmp_path, 'primo.json')
+    base = site.base_url
+    assert [page["url"] for page in first["pages"]] == [base, base + 'a', base + 'b', base + 'c']
+    assert first["metadata"]["plan"]["new"] == 4
+    assert _page_gets(site) == ['/', '/a', '/b', '/c']
+
+    # /a cambia, /b sparisce dalla sitemap, /c non ha lastmod: solo il suo hash viene confrontato
+    site.hits.clear()
+    site.routes['/pages.xml.gz'] = (200, gzip.compress(
+        _urlset(base, [('', '2024-05-01'), ('a', '2024-06-01')]).encode()), 'application/gzip')
+    second, _ = _run(site, tmp_path, 'secondo.json', previous=path)
+
+    plan = second["metadata"]["plan"]
+    assert (plan["new"], plan["changed"], plan["unchanged"], plan["checked"]) == (0, 1, 2, 1)
+    assert plan["removed"] == [base + 'b']
+    assert _page_gets(site) == ['/a', '/c']
+    states = {page["url"]: page["state"] for page in second["pages"]}
+    assert states == {base: 'unchanged', base + 'a': 'changed', base + 'c': 'unchanged'}
+    # I risultati riusati sono quelli del run precedente
+    assert second["pages"][0]["audit"] == first["pages"][0]["audit"]
+    assert second["summary"]["pages_audited"] == 3
+
+
+def test_jsonl_previous_and_changed_options(http_site, tmp_path):
+    site = _site(http_site, {'/': '2024-05-01', '/a': '2024-05-01', '/b': '2024-05-01', '/c': '2024-05-01'})
+    output = str(tmp_path / 'audit.jsonl')
+    sink = JsonlSink(output)
+    SitemapAuditor(site.base_url, sections=['seo_analysis'], crawl_delay=0, sink=sink).crawl()
+    sink.close()
+    assert read_stream(output)["metadata"]["mode"] == "sitemap"
+
+    site.hits.clear()
+    report, _ = _run(site, tmp_path, 'di-nuovo.json', previous=output)
+    assert report["metadata"]["plan"]["unchanged"] == 4 and _page_gets(site) == []
+
+    # Sezioni diverse: il report precedente non vale
+    site.hits.clear()
+    report = SitemapAuditor(site.base_url, previous=output, sections=['broken_anchors'], crawl_delay=0).crawl()
+    assert report["metadata"]["plan"]["new"] == 4
+
+    # Stesse sezioni ma budget, parser, limite di lettura o regole diversi: idem
+    changed = [dict(asset_budgets={'js': 10}), dict(parser='stream'), dict(max_asset_bytes=1024),
+               dict(scan_external_js=False), dict(rules=RuleRegistry({"og_property": ["twitter:"]}))]
+    for options in changed:
+        report = SitemapAuditor(site.base_url, previous=output, sections=['seo_analysis'], crawl_delay=0,
+                                **options).crawl()
+        assert report["metadata"]["plan"]["new"] == 4, options
@@ -0,0 +1,216 @@
+"""
+Test per WebsiteAuditor e il motore di probing
+Usa un server HTTP locale, nessun accesso alla rete esterna.
+"""
+
+import threading
+import time
+
+import pytest
+
+from probe_engine import ProbeEngine, normalize_url
+from website_auditor import WebsiteAuditor
+
+
+PAGE = """<!DOCTYPE html>
+<html><head>
+<title>Pagina di test</title>
+<link rel="stylesheet" href="/style.css">
+<script src="/app.js"></script>
+</head><body>
+<h1>Titolo</h1>
+<a href="/ok">Home</a>
+<a href="/missing">Rotto</a>
+<a href="/slow">Lento</a>
+<a href="#contatti">Contatti</a>
+<a href="#">Vuoto</a>
+<a href="/privacy">Privacy Policy</a>
+<img src="/logo.png">
+<img src="/missing.png">
+<form action="/submit" method="post"><input name="email"></form>
+<form action="/gone"><input name="q"></form>
+<button>Senza handler</button>
+</body></html>
+"""
+
+ROUTES = {
+    '/': (200, PAGE, 'text/html'),
+    '/ok': (200, 'ok', 'text/html'),
+    '/slow': (200, 'slow', 'text/html'),
+    '/privacy': (200, 'privacy', 'text/html'),
+    '/style.css': (200, 'body{}', 'text/css'),
+    '/app.js': (200, 'console.log(1)', 'application/javascript'),
+    '/logo.png': (200, 'PNG' * 400, 'image/png'),
+    '/submit': (200, 'ok', 'text/html'),
+}
+
+
+@pytest.fixture
+def server(http_site):
+    return http_site(ROUTES, delays={'/slow': 0.3})
+
+
+def _base(server):
+    return server.base_url
+
+
+def _run(url, **kwargs):
+    auditor = WebsiteAuditor(url, **kwargs)
+    results = auditor.run_full_audit()
+    results["metadata"].pop("audit_date")
+    # Tempi e contatori di connessione dipendono dall'ordine dei thread
+    results["metadata"].pop("transport")
+    results["metadata"].pop("timings")
+    return results
+
+
+def test_full_audit_report(server):
+    base = _base(server)
+    results = _run(base)
+
+    links = results["routes_and_links"]
+    assert links["status_codes"][base + "ok"] == 200
+    assert [b["url"] for b in links["broken_links"]] == [base + "missing"]
+
+    assets = results["missing_assets"]
+    assert [a["url"] for a in assets["css_files"]] == [base + "style.css"]
+    assert [a["accessible"] for a in assets["images"]] == [True, False]
+    assert assets["images"][0]["size_kb"] == round(1200 / 1024, 2)
+
+    forms = results["broken_forms"]
+    assert [e["full_url"] for e in forms["unreachable_endpoints"]] == [base + "gone"]
+
+    assert results["policy_links"]["privacy_policy"] == {
+        "exists": True, "url": base + "privacy", "accessible": True
+    }
+    assert results["broken_anchors"]["missing_targets"][0]["target_id"] == "contatti"
+
+
+def test_concurrent_report_matches_serial(server):
+    base = _base(server)
+    assert _run(base, max_workers=1, per_host_limit=1) == _run(base, max_workers=16)
+
+
+def test_link_probe_cap_is_preserved(server):
+    base = _base(server)
+    auditor = WebsiteAuditor(base)
+    auditor.load_html(''.join(f'<a href="/ok?{i}">x</a>' for i in range(40)))
+    results = auditor.audit_links_and_routes()
+    assert list(results["status_codes"]) == [f"{base}ok?{i}" for i in range(20)]
+    # Nessuna HEAD oltre il limite, anche con il pool più largo
+    assert auditor.probe.cache_stats()["misses"] == 20
+    assert len([path for method, path in server.hits if method == 'HEAD']) == 20
+
+
+class _RecordingSession:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = {}
+        self.peak = {}
+
+    def request(self, method, url, **kwargs):
+        host = url.split('/')[2]
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+        time.sleep(self.delay)
+        with self.lock:
+            self.active[host] -= 1
+        return (method, url, kwargs)
+
+
+def test_probe_engine_per_host_limit_and_order():
+    session = _RecordingSession()
+    engine = ProbeEngine(session, max_workers=8, per_host_limit=2)
+    calls = [('head', f"http://h{i % 2}.test/{i}", {}) for i in range(12)]
+    futures = engine.map(calls)
+    results = [f.result() for f in futures]
+    engine.close()
+
+    assert [r[1] for r in results] == [c[1] for c in calls]
+    assert results[0][0] == 'HEAD'
+    assert results[0][2] == {'allow_redirects': False, 'headers': {'Accept-Encoding': 'br, gzip, deflate'}}
+    assert max(session.peak.values()) <= 2
+
+
+def test_probe_engine_slow_host_does_not_block_others():
+    session = _RecordingSession(delay=0.2)
+    engine = ProbeEngine(session, max_workers=2, per_host_limit=1)
+    slow = engine.map([('GET', f"http://lento.test/{i}", {}) for i in range(4)])
+    started = time.monotonic()
+    engine.request('GET', "http://veloce.test/").result()
+    # Le richieste in coda per lento.test non occupano il secondo worker
+    assert time.monotonic() - started < 0.35
+    assert not slow[-1].done()
+    engine.close()
+    assert slow[-1].cancelled() and max(session.peak.values()) == 1
+
+
+def test_probe_engine_imap_stops_submitting_on_early_stop():
+    session = _RecordingSession(delay=0.01)
+    engine = ProbeEngine(session, max_workers=2, per_host_limit=2)
+    calls = [('GET', f"http://h.test/{i}", {}) for i in range(100)]
+    probes = engine.imap(calls, window=4)
+    first = [next(probes).result() for _ in range(3)]
+    probes.close()
+    engine.close()
+    assert [r[1] for r in first] == [c[1] for c in calls[:3]]
+    assert engine.cache_stats()["misses"] == 6
+
+
+def test_normalize_url():
+    assert normalize_url("HTTP://Example.COM:80/a?x=1#top") == "http://example.com/a?x=1"
+    assert normalize_url("https://example.com") == "https://example.com/"
+    assert normalize_url("https://example.com:8443/") == "https://example.com:8443/"
+
+
+def test_probe_cache_coalesces_requests():
+    session = _RecordingSession(delay=0.05)
+    engine = ProbeEngine(session, max_workers=4)
+    first = engine.request('HEAD', "http://h.test/a#x")
+    second = engine.request('head', "http://H.test:80/a")
+    post = engine.request('POST', "http://h.test/a")
+    engine.request('POST', "http://h.test/a").result()
+    assert first is second
+    assert post.result()[0] == 'POST'
+    assert engine.cache_stats() == {"hits": 1, "misses": 1, "unique_urls": 1}
+    engine.close()
+
+
+def test_probe_cache_is_bounded_and_keeps_no_body(server):
+    import requests
+
+    engine = ProbeEngine(requests.Session(), cache_size=2)
+    result = engine.request('GET', _base(server) + "ok").result()
+    assert result.status_code == 200 and result.size == 2 and result.ok
+    assert not hasattr(result, 'content')
+    for path in ("privacy", "slow", "ok"):
+        engine.request('HEAD', _base(server) + path).result()
+    # La GET di /ok è già uscita dalla LRU, la HEAD di /ok no
+    engine.request('GET', _base(server) + "ok").result()
+    engine.request('HEAD', _base(server) + "ok").result()
+    assert engine.cache_stats() == {"hits": 1, "misses": 5, "unique_urls": 2}
+    engine.close()
+
+
+def test_link_and_asset_heads_share_the_cache(http_site):
+    site = http_site({
+        '/': (200, '<html><head><link rel="stylesheet" href="/style.css"></head>'
+                   '<body><a href="/style.css">CSS</a></body></html>', 'text/html'),
+        '/style.css': (200, 'body{}', 'text/css'),
+    })
+    results = _run(site.base_url, sections=['routes_and_links', 'missing_assets'])
+    assert results["routes_and_links"]["status_codes"][site.base_url + "style.css"] == 200
+    assert site.hits.count(('HEAD', '/style.css')) == 1
+    assert results["metadata"]["probe_cache"]["hits"] == 1
+
+
+def test_each_url_fetched_once_per_run(server):
+    base = _base(server)
+    results = _run(base)
+    heads = [path for method, path in server.hits if method == 'HEAD']
+    assert len(heads) == len(set(heads))
+    # + GET del form /gone, scansione secrets di /app.js, header delle 2 immagini
+    # e GET di /style.css per gli @import (percorso critico)
+    assert results["metadata"]["probe_cache"]["misses"] == len(set(heads)) + 5
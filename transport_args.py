@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Opzioni da riga di comando del trasporto HTTP
+Separate da http_transport perché il parser degli argomenti (e --help)
+non deve importare requests e urllib3.
+"""
+
+
+def add_transport_arguments(parser):
+    """Opzioni di trasporto comuni a website_auditor.py e batch_audit.py"""
+    group = parser.add_argument_group('trasporto HTTP')
+    group.add_argument('--pool-size', type=int, help="connessioni keep-alive per host (default: --workers)")
+    group.add_argument('--retries', type=int, default=2, help="tentativi in più su 429/503 (rispetta Retry-After)")
+    group.add_argument('--max-retry-after', type=float, default=30, help="attesa massima per un Retry-After, in secondi")
+    group.add_argument('--connect-timeout', type=float, help="timeout di connessione in secondi")
+    group.add_argument('--read-timeout', type=float, help="timeout di lettura in secondi")
+    group.add_argument('--http2', action='store_true', help="usa HTTP/2 se httpx[http2] è installato")
+    group.add_argument('--dns-cache-ttl', type=float, default=300, help="validità della cache DNS (0 la disattiva)")
+    return group
+
+
+def transport_options(args):
+    """Argomenti di HttpTransport a partire dalla riga di comando"""
+    return {
+        "pool_size": args.pool_size or args.workers,
+        "retries": args.retries,
+        "max_retry_after": args.max_retry_after,
+        "connect_timeout": args.connect_timeout,
+        "read_timeout": args.read_timeout,
+        "http2": args.http2,
+        "dns_cache_ttl": args.dns_cache_ttl
+    }
@@ -4,19 +4,89 @@ Script di audit automatizzato per siti web
 Esegue un'analisi completa di funzionalità, SEO, accessibilità e sicurezza
 """
 
-import requests
 import re
 import json
 import os
-from bs4 import BeautifulSoup
+import sys
+import argparse
 from urllib.parse import urljoin, urlparse
 from datetime import datetime
 import time
 import base64
+import codecs
+import hashlib
+from probe_engine import ProbeEngine, normalize_url
+from transport_args import add_transport_arguments, transport_options
+from audit_profiler import PROFILERS, SectionProfiler
+from section_scheduler import SectionScheduler, SectionSpec, parse_sections_arg, select_sections
+from critical_path import analyze_chain, build_chain, find_critical_resources
+from response_headers import ACCEPT_ENCODING_PROBE, analyze_response, http_version, security_headers, summarize_headers
+from image_analysis import analyze_image, read_image_header, summarize_images
+from asset_weight import (DEFAULT_BUDGETS_KB, MAX_ASSET_BYTES, measure_weight, needs_measurement,
+                          parse_budgets, weight_from_head, weight_from_range, weight_summary)
+from audit_rules import RULES, load_rules
+from placeholder_scan import scan_text_nodes
+from html_parsing import BACKENDS, StreamingExtractor, parse_document, resolve_backend
+
+USER_AGENT = 'Mozilla/5.0 (compatible; WebAuditor/1.0)'
+# Limite di caratteri letti da ogni bundle JS esterno durante la scansione dei secrets
+MAX_SCRIPT_SCAN_CHARS = 5 * 1024 * 1024
+# URL distinti dei link verificati con una HEAD (per performance)
+MAX_LINK_PROBES = 20
+# Attributi di <img> confrontati con formato e dimensioni reali
+IMAGE_ATTRIBUTES = ('width', 'height', 'srcset', 'sizes', 'loading')
+
+# Sezioni del report, metodi che le producono, risorse usate e dipendenze, nell'ordine del report
+AUDIT_SECTIONS = [
+    SectionSpec("routes_and_links", "audit_links_and_routes", ('dom', 'network'), ()),
+    SectionSpec("broken_anchors", "audit_broken_anchors", ('dom',), ()),
+    SectionSpec("non_functional_buttons", "audit_buttons", ('dom',), ()),
+    SectionSpec("broken_forms", "audit_forms", ('dom', 'network'), ()),
+    SectionSpec("missing_assets", "audit_assets", ('dom', 'network'), ()),
+    SectionSpec("image_optimization", "audit_images", ('dom', 'network'), ()),
+    SectionSpec("critical_path", "audit_critical_path", ('dom', 'network'), ("missing_assets",)),
+    SectionSpec("response_headers", "audit_response_headers", ('network',), ("missing_assets",)),
+    SectionSpec("security_issues", "audit_security", ('dom', 'network'), ()),
+    SectionSpec("console_errors", "audit_console_errors", ('dom',), ()),
+    SectionSpec("placeholder_content", "audit_placeholders", ('dom',), ()),
+    SectionSpec("policy_links", "audit_policy_links", ('dom', 'network'), ()),
+    SectionSpec("seo_analysis", "audit_seo", ('dom',), ()),
+]
+SECTION_NAMES = [spec.name for spec in AUDIT_SECTIONS]
+
 
 class WebsiteAuditor:
-    def __init__(self, url):
+    def __init__(self, url, max_workers=16, per_host_limit=4, session=None, probe=None,
+                 parser='html.parser', scan_external_js=True, cache=None, sink=None, transport=None,
+                 profile=None, trace_memory=False, sections=None, parallel_sections=True,
+                 asset_budgets=None, max_asset_bytes=MAX_ASSET_BYTES, rules=None):
         self.base_url = url
+        # Sottoinsieme di sezioni (con le loro dipendenze); ValueError se un nome non esiste
+        self.section_specs = select_sections(AUDIT_SECTIONS, sections)
+        self.parallel_sections = parallel_sections
+        self.parser = resolve_backend(parser)
+        self.scan_external_js = scan_external_js
+        # Budget di peso per tipo di asset (KB trasferiti) e tetto di byte letti per asset
+        self.asset_budgets = dict(DEFAULT_BUDGETS_KB, **(asset_budgets or {}))
+        self.max_asset_bytes = max_asset_bytes
+        # Regex delle sezioni (audit_rules.RuleRegistry), compilate una volta per registro
+        self.rules = rules or RULES
+        self._page_secrets = None
+        # Cache persistente opzionale (audit_cache.AuditCache)
+        self.cache = cache
+        # Output JSONL opzionale (audit_stream.JsonlSink): ogni sezione è scritta appena pronta
+        self.sink = sink
+        self.cached_page = None
+        self.content_hash = None
+        self.content_type = ''
+        self.page_bytes = None
+        self.page_headers = None
+        self.page_version = None
+        # HEAD degli asset di questo run, riletti dall'analisi degli header
+        self.asset_responses = {}
+        self.validators = {}
+        self.cache_report = {"page": "disabled" if cache is None else "miss",
+                             "sections_from_cache": 0, "assets_revalidated": 0}
         self.domain = urlparse(url).netloc
         self.audit_results = {
             "metadata": {
@@ -25,23 +95,119 @@ class WebsiteAuditor:
                 "audit_version": "1.0"
             }
         }
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (compatible; WebAuditor/1.0)'
-        })
+        # Session e probe possono essere condivisi tra più auditor (modalità crawl)
+        if session is None:
+            if transport is None:
+                # requests viene importato solo quando serve davvero una sessione
+                from http_transport import HttpTransport
+                transport = HttpTransport(pool_size=max_workers)
+            session = transport.create_session(USER_AGENT)
+        self.transport = transport
+        self.session = session
+        # Tutte le verifiche di rete passano dallo stesso pool di probing
+        self.probe = probe or ProbeEngine(self.session, max_workers=max_workers,
+                                          per_host_limit=per_host_limit)
+        # Tempi, richieste e memoria per sezione (metadata.timings)
+        self.profiler = SectionProfiler(profile=profile, trace_memory=trace_memory)
 
     def download_page(self):
         """Scarica la pagina principale e analizza la struttura"""
         try:
-            response = self.session.get(self.base_url, timeout=10)
-            response.raise_for_status()
-            self.html_content = response.text
-            self.soup = BeautifulSoup(self.html_content, 'html.parser')
+            with self.profiler.measure('download'):
+                self.fetch_page()
             return True
         except Exception as e:
             print(f"❌ Errore durante il download: {e}")
             return False
 
+    def fetch_page(self, require_html=False):
+        """
+        Scarica e analizza la pagina, sollevando eccezioni in caso di errore.
+        Con la cache attiva la richiesta è condizionale: se la pagina non è
+        cambiata (304 o stesso hash) l'analisi viene saltata.
+        """
+        entry = self.cache.get('page', self.base_url) if self.cache else None
+        if entry and entry["value"].get("config") != self._cache_config():
+            entry = None
+        headers = self.cache.conditional_headers(entry) if entry else {}
+
+        stream = self.parser == 'stream'
+        response = self.session.get(self.base_url, timeout=10, headers=headers, stream=stream)
+        with response:
+            if response.status_code == 304 and entry:
+                self._use_cached_page(entry, "not_modified")
+                return response
+            response.raise_for_status()
+            self.content_type = response.headers.get('content-type', '')
+            if require_html and 'html' not in self.content_type:
+                raise ValueError(f"contenuto non HTML ({self.content_type})")
+            self.validators = {"etag": response.headers.get('etag'),
+                               "last_modified": response.headers.get('last-modified')}
+
+            if stream:
+                self._stream_page(response)
+            else:
+                html_content = response.text
+                self.content_hash = hashlib.sha256(html_content.encode('utf-8')).hexdigest()
+                if not (entry and entry["value"]["content_hash"] == self.content_hash):
+                    self.load_html(html_content)
+            self.page_headers = response.headers
+            self.page_version = http_version(response)
+            # Byte trasferiti della pagina, primo anello del percorso critico
+            try:
+                self.page_bytes = response.raw.tell()
+            except Exception:
+                self.page_bytes = None
+
+        if entry and entry["value"]["content_hash"] == self.content_hash:
+            self._use_cached_page(entry, "unchanged")
+        return response
+
+    def load_html(self, html_content):
+        """Imposta l'HTML da analizzare senza scaricarlo"""
+        self.html_content = html_content
+        self._page_secrets = None
+        self.content_hash = hashlib.sha256(html_content.encode('utf-8')).hexdigest()
+        # Indice costruito una sola volta, usato da tutte le sezioni
+        self.soup, self.dom = parse_document(html_content, self.parser,
+                                             capture_classes=(self.rules.regex('placeholder_class'),),
+                                             capture_text=self._placeholder_matcher().regex)
+
+    def _stream_page(self, response):
+        """Legge la risposta a blocchi alimentando il parser SAX, senza costruire l'albero"""
+        extractor = StreamingExtractor(capture_classes=(self.rules.regex('placeholder_class'),),
+                                       capture_text=self._placeholder_matcher().regex)
+        # Anche i secrets vengono cercati blocco per blocco: l'HTML non viene conservato
+        secrets = self.rules.secret_scanner().stream(self.base_url)
+        digest = hashlib.sha256()
+        response.encoding = response.encoding or 'utf-8'
+        for chunk in response.iter_content(chunk_size=65536, decode_unicode=True):
+            extractor.feed(chunk)
+            secrets.feed(chunk)
+            digest.update(chunk.encode('utf-8'))
+        self.html_content = None
+        self.content_hash = digest.hexdigest()
+        self.soup, self.dom = extractor.finish()
+        self._page_secrets = secrets.close()
+
+    def _cache_config(self):
+        """Opzioni che cambiano l'output delle sezioni: una voce salvata con opzioni diverse non vale"""
+        config = {"audit_version": self.audit_results["metadata"]["audit_version"],
+                  "scan_external_js": self.scan_external_js}
+        if len(self.section_specs) < len(AUDIT_SECTIONS):
+            config["sections"] = [spec.name for spec in self.section_specs]
+        if self.asset_budgets != DEFAULT_BUDGETS_KB:
+            config["asset_budgets"] = self.asset_budgets
+        if self.rules.fingerprint() is not None:
+            config["rules"] = self.rules.fingerprint()
+        return config
+
+    def _use_cached_page(self, entry, state):
+        self.cached_page = entry
+        self.content_hash = entry["value"]["content_hash"]
+        self.content_type = entry["value"].get("content_type", '')
+        self.cache_report["page"] = state
+
     def audit_links_and_routes(self):
         """Analizza tutti i link e le route"""
         results = {
@@ -51,7 +217,16 @@ class WebsiteAuditor:
             "status_codes": {}
         }
 
-        links = self.soup.find_all('a', href=True)
+        links = self.dom.with_attr('a', 'href')
+        # I probe dei primi MAX_LINK_PROBES URL distinti partono tutti subito e vengono
+        # consumati nell'ordine dei link: nessuna richiesta oltre il limite
+        probes = {}
+        for link in links:
+            if len(probes) >= MAX_LINK_PROBES:
+                break
+            full_url = urljoin(self.base_url, link['href'])
+            if full_url not in probes:
+                probes[full_url] = self.probe.request('HEAD', full_url, timeout=5)
         for link in links:
             href = link['href']
             full_url = urljoin(self.base_url, href)
@@ -70,9 +245,11 @@ class WebsiteAuditor:
                 })
 
             # Test connettività (limitiamo per performance)
-            if len(results["status_codes"]) < 20:  # Limita i test
+            if len(results["status_codes"]) < MAX_LINK_PROBES:
                 try:
-                    test_response = self.session.head(full_url, timeout=5)
+                    # Oltre i primi URL solo se qualcuno era irraggiungibile (non conta nel limite)
+                    probe = probes.get(full_url) or self.probe.request('HEAD', full_url, timeout=5)
+                    test_response = probe.result()
                     results["status_codes"][full_url] = test_response.status_code
                     if test_response.status_code >= 400:
                         results["broken_links"].append({
@@ -97,8 +274,8 @@ class WebsiteAuditor:
             "selectors": []
         }
 
-        anchors = self.soup.find_all('a')
-        existing_ids = set([elem.get('id') for elem in self.soup.find_all() if elem.get('id')])
+        anchors = self.dom.tags('a')
+        existing_ids = self.dom.ids
 
         for i, anchor in enumerate(anchors):
             href = anchor.get('href', '')
@@ -132,7 +309,7 @@ class WebsiteAuditor:
             "css_selectors": []
         }
 
-        buttons = self.soup.find_all(['button', 'input'])
+        buttons = self.dom.tags('button', 'input')
         for button in buttons:
             if button.name == 'input' and button.get('type') not in ['button', 'submit']:
                 continue
@@ -167,7 +344,20 @@ class WebsiteAuditor:
             "validation_issues": []
         }
 
-        forms = self.soup.find_all('form')
+        forms = self.dom.tags('form')
+
+        # Avvia in parallelo i test degli endpoint raggiungibili
+        pending = {}
+        for form in forms:
+            action = form.get('action', '')
+            method = form.get('method', 'get').lower()
+            if action and action != '#' and action.startswith(('http', '/')):
+                full_action = urljoin(self.base_url, action)
+                if method == 'post':
+                    pending[id(form)] = self.probe.request('POST', full_action, timeout=5, data={})
+                else:
+                    pending[id(form)] = self.probe.request('GET', full_action, timeout=5)
+
         for form in forms:
             action = form.get('action', '')
             method = form.get('method', 'get').lower()
@@ -184,10 +374,7 @@ class WebsiteAuditor:
                 full_action = urljoin(self.base_url, action)
                 try:
                     # Test con method appropriato
-                    if method == 'post':
-                        test_response = self.session.post(full_action, timeout=5, data={})
-                    else:
-                        test_response = self.session.get(full_action, timeout=5)
+                    test_response = pending[id(form)].result()
 
                     if test_response.status_code == 404:
                         results["unreachable_endpoints"].append({
@@ -216,29 +403,38 @@ class WebsiteAuditor:
             "total_size_kb": 0
         }
 
+        targets = []
+
         # CSS files
-        for link in self.soup.find_all('link', rel='stylesheet'):
+        for link in self.dom.with_attr('link', 'rel', 'stylesheet'):
             href = link.get('href')
             if href:
-                full_url = urljoin(self.base_url, href)
-                asset_info = self._test_asset(full_url, 'css')
-                results["css_files"].append(asset_info)
+                targets.append(("css_files", urljoin(self.base_url, href), 'css'))
 
         # JavaScript files
-        for script in self.soup.find_all('script', src=True):
+        for script in self.dom.with_attr('script', 'src'):
             src = script.get('src')
             if src:
-                full_url = urljoin(self.base_url, src)
-                asset_info = self._test_asset(full_url, 'js')
-                results["js_files"].append(asset_info)
+                targets.append(("js_files", urljoin(self.base_url, src), 'js'))
 
         # Images
-        for img in self.soup.find_all('img', src=True):
+        for img in self.dom.with_attr('img', 'src'):
             src = img.get('src')
             if src:
-                full_url = urljoin(self.base_url, src)
-                asset_info = self._test_asset(full_url, 'image')
-                results["images"].append(asset_info)
+                targets.append(("images", urljoin(self.base_url, src), 'image'))
+
+        # Tutti gli asset vengono testati in parallelo, i risultati restano in ordine;
+        # le GET di misura partono man mano che le HEAD rispondono
+        cached = [self.cache.get('asset', url) if self.cache else None for _, url, _ in targets]
+        pending = self.probe.map(
+            ('HEAD', url, self._asset_request_options(entry))
+            for (_, url, _), entry in zip(targets, cached)
+        )
+        self.asset_responses.update((url, future) for (_, url, _), future in zip(targets, pending))
+        weights = [self._weight_probe(url, asset_type, future, entry)
+                   for (_, url, asset_type), future, entry in zip(targets, pending, cached)]
+        for (category, full_url, asset_type), future, entry, weight in zip(targets, pending, cached, weights):
+            results[category].append(self._test_asset(full_url, asset_type, future, entry, weight))
 
         # Calculate total size
         for category in ['css_files', 'js_files', 'images', 'other_assets']:
@@ -246,20 +442,91 @@ class WebsiteAuditor:
                 if asset.get('size_kb'):
                     results["total_size_kb"] += asset['size_kb']
 
+        # Peso per tipo e budget della pagina
+        results["weight"], results["budget_violations"] = weight_summary(
+            {'css': results["css_files"], 'js': results["js_files"], 'image': results["images"]},
+            self.asset_budgets
+        )
         return results
 
-    def _test_asset(self, url, asset_type):
+    def _asset_request_options(self, entry):
+        # Le HEAD offrono anche brotli (probe_engine.HEAD_HEADERS): senza corpo si vede cosa negozia il server
+        options = {'timeout': 5}
+        if entry:
+            # Richiesta condizionale: un 304 conferma il risultato in cache
+            options['headers'] = self.cache.conditional_headers(entry)
+        return options
+
+    def _weight_probe(self, url, asset_type, pending, cached=None):
+        """
+        Future della GET di misura se la HEAD non basta a conoscere il peso
+        (HEAD rifiutata, risposta senza Content-Length o compressa), altrimenti None
+        """
+        try:
+            response = pending.result()
+        except Exception:
+            return None
+        if (response.status_code == 304 and cached) or not needs_measurement(response):
+            return None
+        # Il peso arriva dalla GET che altre sezioni fanno comunque: un solo download per asset
+        if asset_type == 'image':
+            return self._image_header(url)
+        if asset_type == 'js' and self.scan_external_js:
+            return self._script_probe(url)
+        return self._measure(url)
+
+    def _measure(self, url):
+        return self.probe.call(url, measure_weight, self.session, url, self.max_asset_bytes,
+                               cache_key=('WEIGHT', normalize_url(url)))
+
+    def _image_header(self, url):
+        """Primi byte dell'immagine (formato, dimensioni e peso totale), condivisi da asset e immagini"""
+        return self.probe.call(url, read_image_header, self.session, url,
+                               cache_key=('IMAGE', normalize_url(url)))
+
+    def _script_probe(self, url):
+        """Peso e secrets di un bundle JS, condivisi da asset e sicurezza"""
+        return self.probe.call(url, self._read_script, url, cache_key=('SCRIPT', normalize_url(url)))
+
+    def _test_asset(self, url, asset_type, pending=None, cached=None, weight=None):
         """Test singolo asset"""
         try:
-            response = self.session.head(url, timeout=5)
-            size_bytes = int(response.headers.get('content-length', 0))
-            return {
+            if pending is None:
+                pending = self.probe.request('HEAD', url, **self._asset_request_options(cached))
+            response = pending.result()
+            if response.status_code == 304 and cached:
+                self.cache_report["assets_revalidated"] += 1
+                return cached["value"]
+
+            if weight is None:
+                weight = self._weight_probe(url, asset_type, pending, cached)
+            if weight is not None:
+                measured = weight.result()
+                if asset_type == 'image':
+                    # Intestazione senza dimensione totale (o compressa): serve la GET in streaming
+                    measured = weight_from_range(measured) or self._measure(url).result()
+                status, content_type = measured["status"], measured["content_type"]
+                etag, last_modified = measured["etag"], measured["last_modified"]
+            else:
+                measured = weight_from_head(response)
+                status, content_type = response.status_code, response.headers.get('content-type', '')
+                etag, last_modified = response.headers.get('etag'), response.headers.get('last-modified')
+
+            decoded = measured["decoded_bytes"]
+            info = {
                 "url": url,
-                "status": response.status_code,
-                "size_kb": round(size_bytes / 1024, 2),
-                "content_type": response.headers.get('content-type', ''),
-                "accessible": response.status_code == 200
+                "status": status,
+                "size_kb": round(measured["transfer_bytes"] / 1024, 2),
+                "transfer_kb": round(measured["transfer_bytes"] / 1024, 2),
+                "decoded_kb": round(decoded / 1024, 2) if decoded is not None else None,
+                "measured": measured["measured"],
+                "truncated": measured["truncated"],
+                "content_type": content_type,
+                "accessible": status == 200
             }
+            if self.cache is not None and status == 200 and (etag or last_modified):
+                self.cache.put('asset', url, info, etag=etag, last_modified=last_modified)
+            return info
         except Exception as e:
             return {
                 "url": url,
@@ -269,42 +536,155 @@ class WebsiteAuditor:
                 "accessible": False
             }
 
+    def audit_images(self):
+        """Formato, dimensioni intrinseche e risparmi stimati di ogni immagine"""
+        # Solo i primi byte di ogni immagine, letti in parallelo
+        targets = []
+        for index, img in enumerate(self.dom.with_attr('img', 'src')):
+            src = img.get('src')
+            if not src or src.startswith('data:'):
+                continue
+            full_url = urljoin(self.base_url, src)
+            attrs = {key: img.get(key) for key in IMAGE_ATTRIBUTES}
+            attrs['src'] = full_url
+            future = self._image_header(full_url)
+            targets.append((index, attrs, future))
+
+        images = []
+        for index, attrs, future in targets:
+            try:
+                header = future.result()
+            except Exception as e:
+                images.append({"url": attrs['src'], "error": str(e), "issues": []})
+                continue
+            if header["status"] not in (200, 206):
+                # Le immagini non raggiungibili sono già in missing_assets
+                images.append({"url": attrs['src'], "status": header["status"], "issues": []})
+                continue
+            images.append(analyze_image(attrs, header, index))
+
+        return {"images": images, "summary": summarize_images(images)}
+
+    def audit_critical_path(self, sections):
+        """Risorse che bloccano il rendering, catena delle richieste critiche e round trip stimati"""
+        resources, preload, preconnect = find_critical_resources(self.dom, self.base_url)
+
+        # Pesi già misurati da missing_assets (HEAD o GET di misura)
+        sizes = {}
+        assets = sections["missing_assets"]
+        for category in ('css_files', 'js_files'):
+            for asset in assets[category]:
+                if asset.get("transfer_kb") is not None:
+                    sizes[asset["url"]] = int(asset["transfer_kb"] * 1024)
+
+        # I CSS bloccanti vengono scaricati (in parallelo) per seguire gli @import;
+        # la cache dei probe tiene solo testo e peso, non la Response
+        def fetch_css(url):
+            return self.probe.call(url, self._fetch_stylesheet, url,
+                                   cache_key=('CSS', normalize_url(url))).result()
+
+        for resource in resources:
+            if resource["type"] == "stylesheet":
+                self.probe.call(resource["url"], self._fetch_stylesheet, resource["url"],
+                                cache_key=('CSS', normalize_url(resource["url"])))
+
+        nodes = build_chain(resources, fetch_css, sizes, preload)
+        return analyze_chain(self.base_url, self.page_bytes, nodes, preconnect)
+
+    def _fetch_stylesheet(self, url):
+        """Testo e byte trasferiti (compressi, come arrivano dalla rete) di un foglio di stile"""
+        with self.session.get(url, timeout=5) as response:
+            response.raise_for_status()
+            text = response.text
+            try:
+                size = response.raw.tell()
+            except Exception:
+                size = None
+            if not size:
+                length = response.headers.get('content-length')
+                size = int(length) if length and length.isdigit() else len(response.content)
+            return text, size
+
+    def audit_response_headers(self, sections):
+        """Cache HTTP, compressione, Vary e versione HTTP della pagina e di ogni asset"""
+        resources = []
+        if self.page_headers is not None:
+            resources.append(analyze_response(self.base_url, 'document', 200, self.page_headers, self.page_version))
+
+        seen = set()
+        assets = sections["missing_assets"]
+        for category, resource_type in (('css_files', 'css'), ('js_files', 'js'), ('images', 'image')):
+            for asset in assets[category]:
+                url = asset["url"]
+                if url in seen or url not in self.asset_responses:
+                    continue
+                seen.add(url)
+                try:
+                    response = self.asset_responses[url].result()
+                except Exception as e:
+                    resources.append({"url": url, "type": resource_type, "status": "error", "error": str(e)})
+                    continue
+                if response.status_code not in (200, 304):
+                    # HEAD rifiutata o asset mancante: nessun header da valutare
+                    resources.append({"url": url, "type": resource_type, "status": response.status_code})
+                    continue
+                resources.append(analyze_response(url, resource_type, response.status_code,
+                                                  response.headers, http_version(response)))
+
+        return dict(summarize_headers(resources), resources=resources,
+                    accept_encoding=ACCEPT_ENCODING_PROBE)
+
     def audit_security(self):
         """Cerca problemi di sicurezza"""
         results = {
             "exposed_secrets": [],
             "api_keys": [],
-            "security_headers": {},
+            "security_headers": security_headers(self.page_headers or {}),
             "csp_violations": []
         }
 
-        # Pattern per secrets comuni
-        secret_patterns = [
-            (r'api[_-]?key["']?\s*[:=]\s*["']([^"'\s]{20,})', 'API Key'),
-            (r'secret[_-]?key["']?\s*[:=]\s*["']([^"'\s]{20,})', 'Secret Key'),
-            (r'password["']?\s*[:=]\s*["']([^"'\s]{8,})', 'Password'),
-            (r'token["']?\s*[:=]\s*["']([^"'\s]{20,})', 'Token'),
-            (r'sk-[a-zA-Z0-9]{48}', 'OpenAI API Key'),
-            (r'AIza[0-9A-Za-z\-_]{35}', 'Google API Key')
-        ]
-
-        # Scan del contenuto HTML e JS
-        content_to_scan = self.html_content
-        for script in self.soup.find_all('script'):
-            if script.string:
-                content_to_scan += script.string
-
-        for pattern, secret_type in secret_patterns:
-            matches = re.findall(pattern, content_to_scan, re.IGNORECASE)
-            for match in matches:
-                results["exposed_secrets"].append({
-                    "type": secret_type,
-                    "value": match[:10] + "..." if len(match) > 10 else match,
-                    "severity": "CRITICAL"
-                })
+        # Scan dell'HTML (script inline compresi) in una sola passata
+        if self._page_secrets is not None:
+            results["exposed_secrets"].extend(self._page_secrets)
+        else:
+            results["exposed_secrets"].extend(self.rules.secret_scanner().scan(self.html_content, self.base_url))
+
+        # Bundle JS esterni, letti in streaming e in parallelo
+        if self.scan_external_js:
+            urls = []
+            for script in self.dom.with_attr('script', 'src'):
+                if script.get('src'):
+                    full_url = urljoin(self.base_url, script['src'])
+                    if full_url not in urls:
+                        urls.append(full_url)
+            pending = [self._script_probe(url) for url in urls]
+            for future in pending:
+                try:
+                    results["exposed_secrets"].extend(future.result()["secrets"])
+                except Exception:
+                    pass
 
         return results
 
+    def _read_script(self, url):
+        """
+        Legge un bundle JS esterno una sola volta, in streaming: misura il peso
+        e cerca secrets nei primi MAX_SCRIPT_SCAN_CHARS caratteri
+        """
+        scan = self.rules.secret_scanner().stream(url)
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        scanned = [0]
+
+        def feed(chunk):
+            if scanned[0] < MAX_SCRIPT_SCAN_CHARS:
+                text = decoder.decode(chunk)
+                scan.feed(text)
+                scanned[0] += len(text)
+
+        measured = measure_weight(self.session, url, self.max_asset_bytes, on_chunk=feed)
+        measured["secrets"] = scan.close() if measured["status"] == 200 else []
+        return measured
+
     def audit_console_errors(self):
         """Cerca console.log e errori JS nel codice"""
         results = {
@@ -313,13 +693,14 @@ class WebsiteAuditor:
             "stack_traces": []
         }
 
-        scripts = self.soup.find_all('script')
-        for script in scripts:
+        console_patterns = self.rules.compiled('console_call')
+        catch_patterns = self.rules.compiled('catch_block')
+        for script in self.dom.scripts:
             if script.string:
                 content = script.string
 
                 # Console logs
-                console_matches = re.findall(r'console\.(log|error|warn|debug)\s*\([^)]*\)', content)
+                console_matches = [match for pattern in console_patterns for match in pattern.findall(content)]
                 for match in console_matches:
                     results["console_logs"].append({
                         "type": match,
@@ -329,7 +710,7 @@ class WebsiteAuditor:
 
                 # Possibili errori/try-catch
                 if 'try' in content and 'catch' in content:
-                    error_patterns = re.findall(r'catch\s*\([^)]*\)\s*{[^}]*}', content)
+                    error_patterns = [match for pattern in catch_patterns for match in pattern.findall(content)]
                     for pattern in error_patterns:
                         results["js_errors"].append({
                             "pattern": pattern[:150] + "...",
@@ -342,34 +723,23 @@ class WebsiteAuditor:
         """Trova testi placeholder e TODO"""
         results = {
             "placeholder_texts": [],
+            "placeholder_locations": [],
             "todo_items": [],
             "warning_elements": [],
             "selectors": []
         }
 
-        # Pattern per placeholder comuni
-        placeholder_patterns = [
-            r'caricamento\.\.\.?',
-            r'loading\.\.\.?',
-            r'todo',
-            r'⚠️',
-            r'placeholder',
-            r'lorem ipsum',
-            r'test\s+content',
-            r'coming\s+soon',
-            r'under\s+construction'
-        ]
-
-        all_text = self.soup.get_text()
-        for pattern in placeholder_patterns:
-            matches = re.findall(pattern, all_text, re.IGNORECASE)
-            if matches:
-                results["placeholder_texts"].extend(matches)
+        # Testi segnaposto e note TODO: una sola passata sui nodi di testo
+        for hit in scan_text_nodes(self.soup, self._placeholder_matcher(), self._generate_css_selector):
+            rule = hit.pop("rule")
+            if rule == 'todo_marker':
+                results["todo_items"].append(hit)
+            else:
+                results["placeholder_texts"].append(hit["text"])
+                results["placeholder_locations"].append(hit)
 
         # Cerca elementi con classi/ID specifici
-        placeholder_elements = self.soup.find_all(attrs={
-            'class': re.compile(r'(placeholder|loading|todo)', re.I)
-        })
+        placeholder_elements = self.dom.with_class_matching(self.rules.regex('placeholder_class'))
 
         for elem in placeholder_elements:
             results["warning_elements"].append({
@@ -382,6 +752,9 @@ class WebsiteAuditor:
 
         return results
 
+    def _placeholder_matcher(self):
+        return self.rules.matcher('placeholder_text', 'todo_marker')
+
     def _generate_css_selector(self, element):
         """Genera un CSS selector per l'elemento"""
         if element.get('id'):
@@ -405,7 +778,8 @@ class WebsiteAuditor:
             "cookie_policy": [r'cookie', r'biscotti']
         }
 
-        all_links = self.soup.find_all('a', href=True)
+        matches = []
+        all_links = self.dom.with_attr('a', 'href')
         for link in all_links:
             link_text = link.get_text().lower()
             href = link.get('href')
@@ -413,17 +787,20 @@ class WebsiteAuditor:
             for policy_type, patterns in policy_patterns.items():
                 for pattern in patterns:
                     if re.search(pattern, link_text):
-                        results[policy_type]["exists"] = True
-                        results[policy_type]["url"] = urljoin(self.base_url, href)
-
-                        # Test accessibilità
-                        try:
-                            resp = self.session.head(results[policy_type]["url"], timeout=5)
-                            results[policy_type]["accessible"] = resp.status_code == 200
-                        except:
-                            results[policy_type]["accessible"] = False
+                        matches.append((policy_type, urljoin(self.base_url, href)))
                         break
 
+        # Test accessibilità in parallelo, applicati nell'ordine dei link
+        pending = self.probe.map(('HEAD', url, {'timeout': 5}) for _, url in matches)
+        for (policy_type, url), future in zip(matches, pending):
+            results[policy_type]["exists"] = True
+            results[policy_type]["url"] = url
+            try:
+                resp = future.result()
+                results[policy_type]["accessible"] = resp.status_code == 200
+            except:
+                results[policy_type]["accessible"] = False
+
         return results
 
     def audit_seo(self):
@@ -437,7 +814,7 @@ class WebsiteAuditor:
         }
 
         # Title tag
-        title_tag = self.soup.find('title')
+        title_tag = self.dom.first('title')
         if title_tag:
             results["meta_title"] = {
                 "exists": True,
@@ -446,7 +823,7 @@ class WebsiteAuditor:
             }
 
         # Meta description
-        meta_desc = self.soup.find('meta', attrs={'name': 'description'})
+        meta_desc = next((meta for meta in self.dom.tags('meta') if meta.get('name') == 'description'), None)
         if meta_desc:
             content = meta_desc.get('content', '')
             results["meta_description"] = {
@@ -456,21 +833,22 @@ class WebsiteAuditor:
             }
 
         # H1 tags
-        h1_tags = self.soup.find_all('h1')
+        h1_tags = self.dom.tags('h1')
         results["h1_tags"] = {
             "count": len(h1_tags),
             "content": [h1.get_text(strip=True) for h1 in h1_tags]
         }
 
         # Open Graph tags
-        og_tags = self.soup.find_all('meta', property=re.compile(r'og:'))
+        og_pattern = self.rules.regex('og_property')
+        og_tags = [meta for meta in self.dom.tags('meta') if og_pattern.search(meta.get('property') or '')]
         results["og_tags"] = {
             "count": len(og_tags),
             "complete": len(og_tags) >= 4  # title, description, image, url
         }
 
         # JSON-LD
-        json_scripts = self.soup.find_all('script', type='application/ld+json')
+        json_scripts = self.dom.with_attr('script', 'type', 'application/ld+json')
         if json_scripts:
             results["json_ld"]["exists"] = True
             try:
@@ -485,72 +863,321 @@ class WebsiteAuditor:
     def run_full_audit(self):
         """Esegue l'audit completo"""
         print("🔍 Iniziando audit completo...")
+        if self.sink is not None:
+            self.sink.write({"type": "start", "mode": "page", "metadata": self.audit_results["metadata"]})
 
-        if not self.download_page():
-            return None
-
-        print("📄 Pagina scaricata, iniziando analisi...")
-
-        # Esegui tutte le verifiche
-        self.audit_results.update({
-            "routes_and_links": self.audit_links_and_routes(),
-            "broken_anchors": self.audit_broken_anchors(),
-            "non_functional_buttons": self.audit_buttons(),
-            "broken_forms": self.audit_forms(),
-            "missing_assets": self.audit_assets(),
-            "security_issues": self.audit_security(),
-            "console_errors": self.audit_console_errors(),
-            "placeholder_content": self.audit_placeholders(),
-            "policy_links": self.audit_policy_links(),
-            "seo_analysis": self.audit_seo()
-        })
+        self.profiler.start()
+        try:
+            if not self.download_page():
+                return None
+
+            print("📄 Pagina scaricata, iniziando analisi...")
+
+            # Esegui tutte le verifiche
+            self.audit_results.update(self.audit_sections())
+        finally:
+            self.profiler.stop()
+        self.audit_results["metadata"]["timings"] = self.profiler.report()
+        self.audit_results["metadata"]["probe_cache"] = self.probe.cache_stats()
+        if self.transport is not None:
+            self.audit_results["metadata"]["transport"] = self.transport.report()
+        if self.cache is not None:
+            self.audit_results["metadata"]["cache"] = dict(self.cache_report, **self.cache.stats())
+        if self.sink is not None:
+            self.sink.write({"type": "metadata", "metadata": self.audit_results["metadata"]})
 
         return self.audit_results
 
+    def audit_sections(self):
+        """Sezioni di audit, servite dalla cache persistente se la pagina non è cambiata"""
+        if self.cached_page is not None:
+            sections = self.cached_page["value"]["sections"]
+            self.cache_report["sections_from_cache"] = len(sections)
+            print(f"♻️  Pagina invariata, {len(sections)} sezioni servite dalla cache")
+            if self.sink is not None:
+                for name, data in sections.items():
+                    self.sink.write_section(self.base_url, name, data)
+            return sections
+
+        sections = self.run_audit_sections()
+        if self.cache is not None:
+            self.cache.put('page', self.base_url, {
+                "config": self._cache_config(),
+                "content_hash": self.content_hash,
+                "content_type": self.content_type,
+                "sections": sections
+            }, **self.validators)
+        return sections
+
+    def run_audit_sections(self):
+        """
+        Esegue le sezioni selezionate sull'HTML già caricato. Le sezioni di rete
+        si sovrappongono tra loro e con quelle di sola analisi del DOM; il
+        report mantiene comunque l'ordine di AUDIT_SECTIONS.
+        """
+        def execute(spec, results):
+            with self.profiler.measure(spec.name):
+                method = getattr(self, spec.method)
+                # Le sezioni con dipendenze ricevono l'output di quelle da cui dipendono
+                if spec.after:
+                    return method({name: results[name] for name in spec.after})
+                return method()
+
+        def completed(spec, data):
+            if self.sink is not None:
+                self.sink.write_section(self.base_url, spec.name, data)
+
+        scheduler = SectionScheduler(self.section_specs, max_workers=len(self.section_specs))
+        return scheduler.run(execute, completed, parallel=self.parallel_sections)
+
     def save_audit(self, filename='audit.json'):
         """Salva i risultati dell'audit"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.audit_results, f, indent=2, ensure_ascii=False)
-        print(f"✅ Audit salvato in {filename}")
+        save_report(self.audit_results, filename)
 
 
-if __name__ == "__main__":
-    import sys
-
-    if len(sys.argv) != 2:
-        print("Uso: python audit_script.py <URL>")
-        sys.exit(1)
-
-    url = sys.argv[1]
-    auditor = WebsiteAuditor(url)
-
-    results = auditor.run_full_audit()
-    if results:
-        auditor.save_audit()
-
-        # Genera report esecutivo
-        print("\n" + "="*50)
-        print("📊 EXECUTIVE SUMMARY")
-        print("="*50)
-
-        # Conta problemi per severità
-        critical = len(results.get('security_issues', {}).get('exposed_secrets', []))
-        high = (len(results.get('broken_forms', {}).get('unreachable_endpoints', [])) + 
-                len(results.get('missing_assets', {}).get('css_files', [])))
-        medium = (len(results.get('broken_anchors', {}).get('empty_href', [])) +
-                  len(results.get('console_errors', {}).get('console_logs', [])))
-        low = len(results.get('placeholder_content', {}).get('placeholder_texts', []))
-
-        print(f"🚨 CRITICI: {critical}")
-        print(f"⚠️  ALTI: {high}")  
-        print(f"📋 MEDI: {medium}")
-        print(f"💡 BASSI: {low}")
-
-        if critical > 0:
-            print("\n❌ ATTENZIONE: Trovati problemi di sicurezza CRITICI!")
-        if high > 0:
-            print(f"\n⚠️  {high} problemi ad ALTA priorità richiedono correzione immediata")
-
-        print(f"\n✅ Audit completato. Controlla audit.json per i dettagli completi.")
+def save_report(report, filename='audit.json'):
+    """Salva un report (audit singolo o crawl) in JSON"""
+    with open(filename, 'w', encoding='utf-8') as f:
+        if isinstance(report.get("pages", []), list):
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        else:
+            # Pagine in un FindingStore: decodificate e scritte una alla volta
+            from finding_store import write_report
+            write_report(report, f)
+    print(f"✅ Audit salvato in {filename}")
+
+
+def count_issues(results):
+    """Conta i problemi per severità in un audit di pagina"""
+    return {
+        "critical": len(results.get('security_issues', {}).get('exposed_secrets', [])),
+        "high": (len(results.get('broken_forms', {}).get('unreachable_endpoints', [])) +
+                 len(results.get('missing_assets', {}).get('css_files', []))),
+        "medium": (len(results.get('broken_anchors', {}).get('empty_href', [])) +
+                   len(results.get('console_errors', {}).get('console_logs', [])) +
+                   len(results.get('missing_assets', {}).get('budget_violations', []))),
+        "low": (len(results.get('placeholder_content', {}).get('placeholder_texts', [])) +
+                len(results.get('placeholder_content', {}).get('todo_items', [])) +
+                sum(1 for image in results.get('image_optimization', {}).get('images', []) if image["issues"]) +
+                len(results.get('critical_path', {}).get('render_blocking', [])))
+    }
+
+
+def print_executive_summary(counts, filename='audit.json'):
+    """Stampa il report esecutivo a partire dai conteggi per severità"""
+    print("\n" + "="*50)
+    print("📊 EXECUTIVE SUMMARY")
+    print("="*50)
+
+    print(f"🚨 CRITICI: {counts['critical']}")
+    print(f"⚠️  ALTI: {counts['high']}")
+    print(f"📋 MEDI: {counts['medium']}")
+    print(f"💡 BASSI: {counts['low']}")
+
+    if counts['critical'] > 0:
+        print("\n❌ ATTENZIONE: Trovati problemi di sicurezza CRITICI!")
+    if counts['high'] > 0:
+        print(f"\n⚠️  {counts['high']} problemi ad ALTA priorità richiedono correzione immediata")
+
+    print(f"\n✅ Audit completato. Controlla {filename} per i dettagli completi.")
+
+
+def _finish_output(report, output, sink):
+    """Chiude lo stream JSONL oppure salva il report JSON completo"""
+    if sink is None:
+        save_report(report, output)
+    else:
+        sink.close()
+        print(f"✅ Audit salvato in {output} ({sink.records} record)")
+
+
+def _record_history(path, report, output, sink):
+    """Aggiunge il report allo storico; con JSONL il dettaglio si rilegge dal file scritto"""
+    from audit_history import AuditHistory
+    history = AuditHistory(path)
+    try:
+        added = history.ingest(output) if sink is not None else history.ingest_report(report, output)
+    finally:
+        history.close()
+    if added is not None:
+        print(f"🗃️  Storico aggiornato: {added} campioni in {path}")
+
+
+def build_arg_parser():
+    """Argomenti da riga di comando"""
+    parser = argparse.ArgumentParser(
+        prog='website_auditor.py',
+        description="Audit automatizzato di funzionalità, SEO, accessibilità e sicurezza"
+    )
+    parser.add_argument('url', help="URL della pagina (o punto di partenza del crawl)")
+    parser.add_argument('-o', '--output', help="file di output (default audit.json, audit.jsonl con --format jsonl)")
+    parser.add_argument('--format', choices=['json', 'jsonl'], default='json',
+                        help="jsonl scrive ogni sezione appena completata (.gz/.zst per comprimere)")
+    parser.add_argument('--compress', choices=['gzip', 'zstd'], help="comprime l'output jsonl")
+    parser.add_argument('--workers', type=int, default=16, help="richieste di probing in parallelo")
+    parser.add_argument('--per-host', type=int, default=4, help="richieste in parallelo per host")
+    parser.add_argument('--no-js-scan', action='store_true',
+                        help="non scarica i bundle JS esterni per la ricerca di secrets")
+    parser.add_argument('--cache', metavar='FILE',
+                        help="cache persistente (SQLite) per audit incrementali con richieste condizionali")
+    parser.add_argument('--cache-ttl', type=float, default=24, help="validità delle voci in cache, in ore")
+    parser.add_argument('--cache-max-mb', type=float, default=200, help="dimensione massima della cache")
+    parser.add_argument('--parser', choices=BACKENDS, default='html.parser',
+                        help="backend di parsing HTML (auto sceglie lxml se installato)")
+    parser.add_argument('--sections', metavar='LIST',
+                        help=f"solo queste sezioni, separate da virgola ({', '.join(SECTION_NAMES)})")
+    parser.add_argument('--serial-sections', action='store_true',
+                        help="esegue le sezioni una alla volta invece che in parallelo")
+    parser.add_argument('--budget', nargs='+', metavar='TIPO=KB', default=[],
+                        help="budget di peso per pagina e tipo di asset, es. css=150 js=400 image=1000")
+    parser.add_argument('--max-asset-mb', type=float, default=MAX_ASSET_BYTES / 1024 / 1024,
+                        help="MB massimi letti per asset quando il peso va misurato con una GET")
+    parser.add_argument('--rules', metavar='FILE',
+                        help="regole JSON che estendono o sostituiscono i pattern di default (vedi audit_rules)")
+    parser.add_argument('--history', metavar='DB',
+                        help="aggiunge il report allo storico SQLite (vedi audit_history.py)")
+    add_transport_arguments(parser)
+
+    profiling = parser.add_argument_group('profiling')
+    profiling.add_argument('--profile', choices=PROFILERS, help="profila l'audit con cProfile o pyinstrument")
+    profiling.add_argument('--profile-output', metavar='FILE',
+                           help="file del profilo (default audit.prof, audit-profile.html per pyinstrument)")
+    profiling.add_argument('--trace', metavar='FILE', help="esporta le sezioni in formato Chrome trace (JSON)")
+    profiling.add_argument('--trace-memory', action='store_true',
+                           help="misura il picco di memoria allocata per sezione con tracemalloc (più lento)")
+
+    crawl = parser.add_argument_group('crawl')
+    crawl.add_argument('--crawl', action='store_true', help="segue i link interni ed esegue l'audit di ogni pagina")
+    crawl.add_argument('--max-depth', type=int, default=2, help="profondità massima del crawl")
+    crawl.add_argument('--max-pages', type=int,
+                       help="numero massimo di pagine (default 50 con --crawl, 50000 con --sitemap)")
+    crawl.add_argument('--page-workers', type=int, default=4, help="pagine scaricate in parallelo")
+    crawl.add_argument('--crawl-delay', type=float, default=0.5, help="secondi minimi tra due richieste di pagina allo stesso host")
+    crawl.add_argument('--ignore-robots', action='store_true', help="non applica robots.txt")
+    crawl.add_argument('--store-max-mb', type=float, default=256,
+                       help="memoria massima per i risultati delle pagine prima di spostarli su SQLite")
+    crawl.add_argument('--store-spill', metavar='FILE',
+                       help="file SQLite per i risultati spostati su disco (default file temporaneo)")
+
+    sitemap = parser.add_argument_group('sitemap')
+    sitemap.add_argument('--sitemap', action='store_true',
+                         help="analizza le pagine delle sitemap (robots.txt o /sitemap.xml) invece di seguire i link")
+    sitemap.add_argument('--sitemap-url', action='append', metavar='URL',
+                         help="sitemap o sitemap index da leggere (ripetibile, anche .gz)")
+    sitemap.add_argument('--previous', metavar='FILE',
+                         help="report del run precedente: le pagine non cambiate non vengono rianalizzate")
+    sitemap.add_argument('--max-age-days', type=float, default=7,
+                         help="oltre questa età i risultati precedenti non vengono riusati")
+    return parser
+
+
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    sections = parse_sections_arg(args.sections)
+    try:
+        select_sections(AUDIT_SECTIONS, sections)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        budgets = parse_budgets(args.budget)
+    except ValueError as e:
+        parser.error(str(e))
+    max_asset_bytes = int(args.max_asset_mb * 1024 * 1024)
+    try:
+        rules = load_rules(args.rules) if args.rules else None
+    except (OSError, ValueError) as e:
+        parser.error(f"--rules: {e}")
+
+    output = args.output or ('audit.jsonl' if args.format == 'jsonl' else 'audit.json')
+    if args.previous and args.format == 'jsonl' and os.path.abspath(args.previous) == os.path.abspath(output):
+        parser.error("--previous: con --format jsonl il report precedente verrebbe sovrascritto prima della lettura")
+    sink = None
+    if args.format == 'jsonl':
+        from audit_stream import JsonlSink
+        sink = JsonlSink(output, args.compress)
+
+    from http_transport import HttpTransport
+    transport = HttpTransport(**transport_options(args))
+
+    cache = None
+    if args.cache:
+        from audit_cache import AuditCache
+        cache = AuditCache(args.cache, ttl=args.cache_ttl * 3600,
+                           max_bytes=int(args.cache_max_mb * 1024 * 1024))
+
+    store = None
+    if args.crawl or args.sitemap or args.sitemap_url:
+        if sink is None:
+            # Con jsonl il dettaglio va già su file; altrimenti le pagine restano in forma compatta
+            from finding_store import FindingStore
+            store = FindingStore(max_memory_bytes=int(args.store_max_mb * 1024 * 1024),
+                                 spill_path=args.store_spill)
+        options = dict(
+            page_workers=args.page_workers,
+            crawl_delay=args.crawl_delay,
+            respect_robots=not args.ignore_robots,
+            max_workers=args.workers,
+            per_host_limit=args.per_host,
+            parser=args.parser,
+            scan_external_js=not args.no_js_scan,
+            cache=cache,
+            sink=sink,
+            transport=transport,
+            sections=sections,
+            parallel_sections=not args.serial_sections,
+            asset_budgets=budgets,
+            max_asset_bytes=max_asset_bytes,
+            rules=rules,
+            store=store
+        )
+        if args.sitemap or args.sitemap_url:
+            from sitemap_planner import MAX_SITEMAP_URLS, SitemapAuditor
+
+            crawler = SitemapAuditor(args.url, sitemaps=args.sitemap_url, previous=args.previous,
+                                     max_age_days=args.max_age_days,
+                                     max_urls=args.max_pages or MAX_SITEMAP_URLS, **options)
+        else:
+            from site_crawler import SiteCrawler
+
+            crawler = SiteCrawler(args.url, max_depth=args.max_depth, max_pages=args.max_pages or 50, **options)
+        report = crawler.crawl()
+        if report and report["pages"]:
+            _finish_output(report, output, sink)
+            if args.history:
+                _record_history(args.history, report, output, sink)
+            print_executive_summary(report["summary"]["issues"], output)
+            if store is not None:
+                store.close()
+            return 0
+        if store is not None:
+            store.close()
     else:
-        print("❌ Audit fallito. Impossibile accedere al sito.")
+        auditor = WebsiteAuditor(args.url, max_workers=args.workers,
+                                 per_host_limit=args.per_host, parser=args.parser,
+                                 scan_external_js=not args.no_js_scan, cache=cache, sink=sink,
+                                 transport=transport, profile=args.profile, trace_memory=args.trace_memory,
+                                 sections=sections, parallel_sections=not args.serial_sections,
+                                 asset_budgets=budgets, max_asset_bytes=max_asset_bytes, rules=rules)
+        results = auditor.run_full_audit()
+        if args.trace:
+            auditor.profiler.save_trace(args.trace)
+        if args.profile:
+            default = 'audit-profile.html' if auditor.profiler.profile == 'pyinstrument' else 'audit.prof'
+            auditor.profiler.save_profile(args.profile_output or default)
+        if results:
+            _finish_output(results, output, sink)
+            if args.history:
+                _record_history(args.history, results, output, sink)
+            print_executive_summary(count_issues(results), output)
+            return 0
+
+    if sink is not None:
+        sink.close()
+
+    print("❌ Audit fallito. Impossibile accedere al sito.")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())